@@ -0,0 +1,109 @@
+"""
+Runs the application in-process for the load benchmarks: the database dependencies point to the benchmark
+database and Redis is replaced by an in-memory stand-in, so no external services are needed.
+"""
+import time
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from main import app
+from src.database.cache import get_cache
+from src.database.db import get_db, get_session_maker, get_session_router, SessionRouter
+from src.services.user_cache import user_cache
+
+
+class MemoryCache:
+    """
+    The subset of Redis commands used by the application, kept in a dict. The rate limiter never limits.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.expires = {}
+
+    def _get(self, key):
+        expires_at = self.expires.get(key)
+
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+
+        return self.values.get(key)
+
+    async def get(self, key):
+        return self._get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False, **kwargs):
+        if nx and self._get(key) is not None:
+            return None
+
+        self.values[key] = value.encode() if isinstance(value, str) else value
+        self.expires.pop(key, None)
+
+        if px is not None:
+            ex = px / 1000
+
+        if ex is not None:
+            self.expires[key] = time.monotonic() + ex
+
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+
+        return len(keys)
+
+    async def incr(self, key):
+        value = int(self._get(key) or 0) + 1
+        self.values[key] = str(value).encode()
+
+        return value
+
+    async def expire(self, key, seconds, **kwargs):
+        self.expires.setdefault(key, time.monotonic() + seconds)
+
+        return True
+
+    async def hget(self, key, field):
+        return (self._get(key) or {}).get(field)
+
+    async def hset(self, key, field, value):
+        self.values.setdefault(key, {})[field] = str(value).encode()
+
+        return 1
+
+    async def publish(self, channel, message):
+        return 0
+
+    async def script_load(self, script):
+        return "memory"
+
+    async def evalsha(self, sha, numkeys, *args):
+        if sha == user_cache.release_lock_sha:
+            key, token = args
+            if self._get(key) == token.encode():
+                return await self.delete(key)
+            return 0
+
+        return [1, 0, 0]
+
+
+async def create_client(session_maker: async_sessionmaker) -> AsyncClient:
+    """
+    Creates an HTTP client bound to the application, with the dependencies overridden for the benchmark.
+    """
+    memory_cache = MemoryCache()
+
+    async def override_get_db():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_cache] = lambda: memory_cache
+    app.dependency_overrides[get_session_maker] = lambda: session_maker
+    app.dependency_overrides[get_session_router] = lambda: SessionRouter(session_maker)
+
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://benchmark")
@@ -0,0 +1,106 @@
+"""
+Measures the latency of GET /api/contacts while /api/auth/signin is being hammered, with bcrypt running
+inline on the event loop (the previous behaviour) and in the password hashing thread pool.
+
+Run from the hw-14 directory::
+
+    python -m benchmarks.auth_load --signin-concurrency 16 --duration 10
+"""
+import argparse
+import asyncio
+import datetime
+import time
+import uuid
+
+from sqlalchemy import insert
+
+from benchmarks.app import create_client
+from benchmarks.seed import DEFAULT_DB_URL, create_engine, reset_schema, seed_contacts
+from src.entity import User
+from src.services.auth import auth_service
+from src.services.password import password_hasher
+
+EMAIL = "load@example.com"
+PASSWORD = "12345678"
+
+
+async def run_inline(func, *args):
+    return func(*args)
+
+
+def percentile(timings: list[float], value: float) -> float:
+    return timings[min(int(len(timings) * value), len(timings) - 1)] * 1000
+
+
+async def hammer_signin(client, stop: asyncio.Event, counter: list):
+    while not stop.is_set():
+        response = await client.post("/api/auth/signin", json={"email": EMAIL, "password": PASSWORD})
+        counter.append(response.status_code)
+
+
+async def probe_contacts(client, headers: dict, duration: float) -> list[float]:
+    timings = []
+    deadline = time.perf_counter() + duration
+
+    while time.perf_counter() < deadline:
+        started_at = time.perf_counter()
+        response = await client.get("/api/contacts", params={"limit": 20}, headers=headers)
+        timings.append(time.perf_counter() - started_at)
+        response.raise_for_status()
+
+    return sorted(timings)
+
+
+async def measure(client, headers: dict, signin_concurrency: int, duration: float) -> tuple[list[float], int]:
+    stop = asyncio.Event()
+    signins = []
+    workers = [asyncio.create_task(hammer_signin(client, stop, signins)) for _ in range(signin_concurrency)]
+
+    timings = await probe_contacts(client, headers, duration)
+    stop.set()
+    await asyncio.gather(*workers)
+
+    return timings, len(signins)
+
+
+async def main(db_url: str, signin_concurrency: int, duration: float):
+    engine, session_maker = create_engine(db_url)
+    await reset_schema(engine)
+
+    user_id = uuid.uuid4()
+    now = datetime.datetime.now()
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [{
+            "id": user_id, "email": EMAIL, "password": await password_hasher.hash(PASSWORD),
+            "is_confirmed": True, "created_at": now, "updated_at": now,
+        }])
+    await seed_contacts(engine, [user_id], 1000)
+
+    client = await create_client(session_maker)
+    headers = {"Authorization": f"Bearer {auth_service.create_access_token(data={'sub': EMAIL})}"}
+    scenarios = [
+        ("no signin load", 0, password_hasher.run),
+        ("bcrypt inline", signin_concurrency, run_inline),
+        ("bcrypt thread pool", signin_concurrency, password_hasher.run),
+    ]
+
+    print(f"{'scenario':<20}{'requests':>10}{'signins':>10}{'p50, ms':>10}{'p95, ms':>10}{'p99, ms':>10}")
+    for name, concurrency, run in scenarios:
+        password_hasher.run = run
+        timings, signins = await measure(client, headers, concurrency, duration)
+        print(f"{name:<20}{len(timings):>10}{signins:>10}{percentile(timings, 0.5):>10.2f}"
+              f"{percentile(timings, 0.95):>10.2f}{percentile(timings, 0.99):>10.2f}")
+
+    await client.aclose()
+    password_hasher.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url", default=DEFAULT_DB_URL)
+    parser.add_argument("--signin-concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.db_url, args.signin_concurrency, args.duration))
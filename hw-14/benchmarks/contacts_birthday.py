@@ -0,0 +1,86 @@
+"""
+Compares GET /api/contacts/birthday queries on the indexed birthday_doy column against computing the
+month and day of every birthday on the fly.
+
+Run from the hw-14 directory::
+
+    python -m benchmarks.contacts_birthday --users 100 --contacts 1000000
+"""
+import argparse
+import asyncio
+import datetime
+import time
+
+from sqlalchemy import Select, select
+
+import src.repository.contact as contact_repository
+from benchmarks.seed import DEFAULT_DB_URL, create_engine, reset_schema, seed_users, seed_contacts
+from src.database.functions import month_day
+from src.entity import Contact
+
+REPEAT = 5
+WINDOWS = (7, 30, 90)
+
+
+def get_on_the_fly_query(birthday_days: int, user_id) -> Select:
+    today = datetime.date.today()
+    start = contact_repository.get_month_day(today)
+    end = contact_repository.get_month_day(today + datetime.timedelta(days=birthday_days))
+    birthday_month_day = month_day(Contact.birthday)
+
+    query = select(Contact).filter_by(user_id=user_id, deleted_at=None)
+
+    if start <= end:
+        return query.filter(birthday_month_day.between(start, end))
+
+    return query.filter((birthday_month_day >= start) | (birthday_month_day <= end))
+
+
+async def measure(session_maker, run) -> tuple[float, int]:
+    timings = []
+
+    for _ in range(REPEAT):
+        async with session_maker() as session:
+            started_at = time.perf_counter()
+            count = len(await run(session))
+            timings.append(time.perf_counter() - started_at)
+
+    return min(timings) * 1000, count
+
+
+async def main(db_url: str, users: int, contacts: int, seed: bool):
+    engine, session_maker = create_engine(db_url)
+
+    if seed:
+        await reset_schema(engine)
+        await seed_contacts(engine, await seed_users(engine, users), contacts)
+
+    async with session_maker() as session:
+        user_id = (await session.execute(select(Contact.user_id).limit(1))).scalar_one()
+
+    print(f"{'days':>6}{'rows':>8}{'on the fly, ms':>18}{'birthday_doy, ms':>20}")
+
+    for days in WINDOWS:
+        async def on_the_fly(session):
+            return (await session.execute(get_on_the_fly_query(days, user_id))).scalars().all()
+
+        async def indexed(session):
+            return await contact_repository.get_contacts_birthday(days, user_id, session)
+
+        on_the_fly_ms, rows = await measure(session_maker, on_the_fly)
+        indexed_ms, indexed_rows = await measure(session_maker, indexed)
+        assert rows == indexed_rows
+        print(f"{days:>6}{rows:>8}{on_the_fly_ms:>18.2f}{indexed_ms:>20.2f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url", default=DEFAULT_DB_URL)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--contacts", type=int, default=1_000_000)
+    parser.add_argument("--no-seed", dest="seed", action="store_false")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.db_url, args.users, args.contacts, args.seed))
@@ -0,0 +1,65 @@
+"""
+Measures the latency of a GET /api/contacts page query at increasing depths for offset and cursor (keyset)
+pagination. The total count query is left out, since it does not depend on the depth.
+
+Run from the hw-14 directory::
+
+    python -m benchmarks.contacts_pagination --contacts 1000000
+"""
+import argparse
+import asyncio
+import time
+
+import src.repository.contact as contact_repository
+from benchmarks.seed import DEFAULT_DB_URL, create_engine, reset_schema, seed_users, seed_contacts
+
+LIMIT = 50
+REPEAT = 5
+
+
+async def measure(session_maker, user_id, depth: int, after_id: int | None) -> float:
+    timings = []
+
+    for _ in range(REPEAT):
+        async with session_maker() as session:
+            started_at = time.perf_counter()
+            query = contact_repository.get_contacts_page_query(depth, LIMIT, "", user_id, after_id)
+            (await session.execute(query)).all()
+            timings.append(time.perf_counter() - started_at)
+
+    return min(timings) * 1000
+
+
+async def main(db_url: str, contacts: int, seed: bool):
+    engine, session_maker = create_engine(db_url)
+
+    if seed:
+        await reset_schema(engine)
+        user_ids = await seed_users(engine, 1)
+        await seed_contacts(engine, user_ids, contacts)
+
+    async with session_maker() as session:
+        contacts_page, total = await contact_repository.get_contacts(0, 1, "", None, session, with_user=True)
+        user_id = contacts_page[0].user_id
+
+    print(f"{'depth':>10}{'offset, ms':>14}{'cursor, ms':>14}")
+
+    depth = LIMIT
+    while depth < total:
+        # Contacts are seeded with consecutive ids, so the page at a given depth starts after id == depth.
+        offset_ms = await measure(session_maker, user_id, depth, None)
+        cursor_ms = await measure(session_maker, user_id, depth, depth)
+        print(f"{depth:>10}{offset_ms:>14.2f}{cursor_ms:>14.2f}")
+        depth *= 4
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url", default=DEFAULT_DB_URL)
+    parser.add_argument("--contacts", type=int, default=1_000_000)
+    parser.add_argument("--no-seed", dest="seed", action="store_false")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.db_url, args.contacts, args.seed))
@@ -0,0 +1,103 @@
+"""
+Compares the throughput of GET /api/contacts?limit=500 served through the response model (validation by
+FastAPI and the standard JSON encoder, the previous behaviour) and through the precompiled response
+serializer, and the CPU time of serializing a 500-row page alone.
+
+The response cache never stores anything here, so every request reads the page from the database.
+
+Run from the hw-14 directory::
+
+    python -m benchmarks.contacts_response --requests 200
+"""
+import argparse
+import asyncio
+import json
+import time
+import timeit
+
+from fastapi import Depends, Query
+
+import src.repository.contact as contact_repository
+from benchmarks.app import MemoryCache, create_client
+from benchmarks.seed import DEFAULT_DB_URL, create_engine, reset_schema, seed_users, seed_contacts
+from main import app
+from src.database.cache import get_cache
+from src.database.db import get_db
+from src.entity import User
+from src.schemas.base import ListResponseSchema
+from src.schemas.contacts import ContactSchema
+from src.schemas.serializers import contact_response_serializer
+from src.services.auth import auth_service
+from src.util.get_response_data import get_response_data
+
+LIMIT = 500
+
+
+class NoStoreCache(MemoryCache):
+    async def set(self, key, value, ex=None, **kwargs):
+        return True
+
+
+@app.get("/benchmark/contacts", response_model=ListResponseSchema[ContactSchema])
+async def get_contacts_through_response_model(
+        limit: int = Query(default=50),
+        current_user: User = Depends(auth_service.get_current_user),
+        db=Depends(get_db),
+):
+    contacts, total = await contact_repository.get_contacts(0, limit, "", current_user.id, db)
+
+    return get_response_data(contacts, total=total)
+
+
+async def measure(client, url: str, headers: dict, requests: int) -> float:
+    for _ in range(5):
+        await client.get(url, params={"limit": LIMIT}, headers=headers)
+
+    started_at = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(url, params={"limit": LIMIT}, headers=headers)
+        response.raise_for_status()
+
+    return requests / (time.perf_counter() - started_at)
+
+
+async def main(db_url: str, requests: int):
+    engine, session_maker = create_engine(db_url)
+    await reset_schema(engine)
+    user_ids = await seed_users(engine, 1)
+    await seed_contacts(engine, user_ids, LIMIT * 2)
+
+    client = await create_client(session_maker)
+    app.dependency_overrides[get_cache] = NoStoreCache
+    headers = {"Authorization": f"Bearer {auth_service.create_access_token(data={'sub': 'user0@example.com'})}"}
+
+    print(f"{'path':<30}{'req/s':>10}")
+    for name, url in [("response model", "/benchmark/contacts"), ("response serializer", "/api/contacts")]:
+        print(f"{name:<30}{await measure(client, url, headers, requests):>10.1f}")
+
+    async with session_maker() as session:
+        contacts, total = await contact_repository.get_contacts(0, LIMIT, "", user_ids[0], session)
+    response = get_response_data(contacts, total=total)
+    model = ListResponseSchema[ContactSchema]
+    serializers = [
+        ("validate + dump_python + json", lambda: json.dumps(
+            model.model_validate(response).model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")
+        ).encode()),
+        ("response serializer", lambda: contact_response_serializer.dump_list(response)),
+    ]
+
+    print(f"\n{'serializer, 500 rows':<30}{'ms':>10}")
+    for name, serialize in serializers:
+        print(f"{name:<30}{min(timeit.repeat(serialize, number=50, repeat=5)) / 50 * 1000:>10.3f}")
+
+    await client.aclose()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url", default=DEFAULT_DB_URL)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.db_url, args.requests))
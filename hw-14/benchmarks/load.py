@@ -0,0 +1,238 @@
+"""
+Load test of the contacts API: seeds users and contacts, drives a weighted mix of the auth, list, search,
+birthday and write endpoints from concurrent workers, and reports the throughput and latency percentiles of
+every endpoint as JSON.
+
+The application runs in-process (see benchmarks.app), so the numbers measure the application and the database,
+not the network. Save the report of a commit and pass it as the baseline of a later run to compare them::
+
+    python -m benchmarks.load --users 100 --contacts 100000 --concurrency 32 --duration 30 --output before.json
+    python -m benchmarks.load --users 100 --contacts 100000 --concurrency 32 --duration 30 --baseline before.json
+
+Run from the hw-14 directory. Pass ``--db-url postgresql+asyncpg://...`` to load a local Postgres instead of
+SQLite; the schema of that database is recreated.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+from collections import defaultdict
+
+from sqlalchemy import select
+
+from benchmarks.app import create_client
+from benchmarks.seed import DEFAULT_DB_URL, create_engine, reset_schema, seed_users, seed_contacts
+from src.entity import Contact
+from src.services.auth import auth_service
+from src.services.password import password_hasher
+
+PASSWORD = "12345678"
+
+# Relative share of every endpoint in the request mix.
+DEFAULT_MIX = {
+    "auth.signin": 5,
+    "contacts.list": 40,
+    "contacts.search": 20,
+    "contacts.birthday": 15,
+    "contacts.create": 10,
+    "contacts.update": 10,
+}
+
+
+class LoadUser:
+    def __init__(self, index: int, contact_ids: list[int]):
+        self.email = f"user{index}@example.com"
+        self.headers = {"Authorization": f"Bearer {auth_service.create_access_token(data={'sub': self.email})}"}
+        self.contact_ids = contact_ids
+
+
+async def signin(client, user: LoadUser, generator: random.Random):
+    return await client.post("/api/auth/signin", json={"email": user.email, "password": PASSWORD})
+
+
+async def list_contacts(client, user: LoadUser, generator: random.Random):
+    offset = generator.randrange(max(len(user.contact_ids) - 20, 1))
+
+    return await client.get("/api/contacts", params={"offset": offset, "limit": 20}, headers=user.headers)
+
+
+async def search_contacts(client, user: LoadUser, generator: random.Random):
+    search = f"name{generator.randrange(1000)}"
+
+    return await client.get("/api/contacts", params={"search": search, "limit": 20}, headers=user.headers)
+
+
+async def get_contacts_birthday(client, user: LoadUser, generator: random.Random):
+    return await client.get("/api/contacts/birthday", params={"birthday_days": 7}, headers=user.headers)
+
+
+async def create_contact(client, user: LoadUser, generator: random.Random):
+    index = generator.randrange(10 ** 9)
+    body = {
+        "name": f"load{index}", "surname": "load", "email": f"load{index}@example.com",
+        "phone": f"{index:09d}", "birthday": "1990-05-17",
+    }
+
+    return await client.post("/api/contacts", json=body, headers=user.headers)
+
+
+async def update_contact(client, user: LoadUser, generator: random.Random):
+    contact_id = generator.choice(user.contact_ids)
+
+    return await client.patch(
+        f"/api/contacts/{contact_id}", json={"phone": f"{generator.randrange(10 ** 9):09d}"}, headers=user.headers
+    )
+
+
+endpoints = {
+    "auth.signin": signin,
+    "contacts.list": list_contacts,
+    "contacts.search": search_contacts,
+    "contacts.birthday": get_contacts_birthday,
+    "contacts.create": create_contact,
+    "contacts.update": update_contact,
+}
+
+
+def percentile(timings: list[float], value: float) -> float:
+    return timings[min(int(len(timings) * value), len(timings) - 1)] * 1000
+
+
+async def run_worker(client, users: list[LoadUser], mix: dict[str, int], deadline: float, seed: int,
+                     timings: dict[str, list[float]], errors: dict[str, int]):
+    generator = random.Random(seed)
+    names = list(mix)
+    weights = list(mix.values())
+
+    while time.perf_counter() < deadline:
+        name = generator.choices(names, weights)[0]
+        started_at = time.perf_counter()
+        response = await endpoints[name](client, generator.choice(users), generator)
+        timings[name].append(time.perf_counter() - started_at)
+
+        if response.status_code >= 400:
+            errors[name] += 1
+
+
+def build_report(timings: dict[str, list[float]], errors: dict[str, int], duration: float) -> dict:
+    report = {}
+
+    for name in sorted(timings):
+        values = sorted(timings[name])
+        report[name] = {
+            "requests": len(values),
+            "errors": errors[name],
+            "rps": round(len(values) / duration, 1),
+            "p50_ms": round(percentile(values, 0.5), 2),
+            "p95_ms": round(percentile(values, 0.95), 2),
+            "p99_ms": round(percentile(values, 0.99), 2),
+        }
+
+    return report
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(report: dict, baseline: dict):
+    print(f"{'endpoint':<20}{'rps':>10}{'change':>10}{'p95, ms':>10}{'change':>10}{'p99, ms':>10}{'change':>10}")
+
+    for name, stats in report["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        row = f"{name:<20}"
+
+        for metric in ("rps", "p95_ms", "p99_ms"):
+            change = f"{(stats[metric] / before[metric] - 1) * 100:+.1f}%" if before and before[metric] else "-"
+            row += f"{stats[metric]:>10}{change:>10}"
+
+        print(row)
+
+
+async def load_contact_ids(session_maker, users: int) -> list[list[int]]:
+    contact_ids = defaultdict(list)
+
+    async with session_maker() as session:
+        rows = await session.execute(select(Contact.user_id, Contact.id).filter_by(deleted_at=None))
+        for user_id, contact_id in rows:
+            contact_ids[user_id].append(contact_id)
+
+    return contact_ids
+
+
+async def main(args):
+    engine, session_maker = create_engine(args.db_url)
+    await reset_schema(engine)
+    user_ids = await seed_users(engine, args.users, password=await password_hasher.hash(PASSWORD))
+    await seed_contacts(engine, user_ids, args.contacts)
+
+    contact_ids = await load_contact_ids(session_maker, args.users)
+    users = [LoadUser(index, contact_ids[user_id]) for index, user_id in enumerate(user_ids)]
+    mix = {name: weight for name, weight in DEFAULT_MIX.items() if not args.endpoints or name in args.endpoints}
+
+    client = await create_client(session_maker)
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+
+    # Warm up the caches and the connection pool before measuring.
+    await asyncio.gather(*(
+        run_worker(client, users, mix, time.perf_counter() + args.warmup, worker, defaultdict(list), defaultdict(int))
+        for worker in range(args.concurrency)
+    ))
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(
+        run_worker(client, users, mix, started_at + args.duration, args.seed + worker, timings, errors)
+        for worker in range(args.concurrency)
+    ))
+    duration = time.perf_counter() - started_at
+
+    report = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "db": engine.dialect.name,
+        "users": args.users,
+        "contacts": args.contacts,
+        "concurrency": args.concurrency,
+        "duration": round(duration, 2),
+        "total_rps": round(sum(len(values) for values in timings.values()) / duration, 1),
+        "endpoints": build_report(timings, errors, duration),
+    }
+
+    await client.aclose()
+    password_hasher.close()
+    await engine.dispose()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            print_comparison(report, json.load(file))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url", default=DEFAULT_DB_URL)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--contacts", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--endpoints", nargs="*", choices=list(DEFAULT_MIX), help="Endpoints to drive, all by default")
+    parser.add_argument("--output", help="File to write the JSON report to")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare with")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,70 @@
+"""
+Helpers shared by the benchmarks: a throwaway database engine and bulk seeding of users and contacts.
+"""
+import datetime
+import random
+import uuid
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine
+
+from src.entity import Base, Contact, User
+
+DEFAULT_DB_URL = "sqlite+aiosqlite:///./benchmark.db"
+BATCH_SIZE = 10_000
+
+
+def create_engine(db_url: str = DEFAULT_DB_URL) -> tuple[AsyncEngine, async_sessionmaker]:
+    engine = create_async_engine(db_url)
+
+    return engine, async_sessionmaker(bind=engine, expire_on_commit=False)
+
+
+async def reset_schema(engine: AsyncEngine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def seed_users(engine: AsyncEngine, count: int, password: str = "x") -> list[uuid.UUID]:
+    now = datetime.datetime.now()
+    users = [
+        {
+            "id": uuid.uuid4(),
+            "email": f"user{index}@example.com",
+            "password": password,
+            "is_confirmed": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for index in range(count)
+    ]
+
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), users)
+
+    return [user["id"] for user in users]
+
+
+async def seed_contacts(engine: AsyncEngine, user_ids: list[uuid.UUID], count: int, seed: int = 42):
+    generator = random.Random(seed)
+    now = datetime.datetime.now()
+    first_birthday = datetime.date(1960, 1, 1)
+
+    for start in range(0, count, BATCH_SIZE):
+        contacts = [
+            {
+                "name": f"name{index}",
+                "surname": f"surname{index}",
+                "email": f"contact{index}@example.com",
+                "phone": f"{index:09d}",
+                "birthday": first_birthday + datetime.timedelta(days=generator.randrange(365 * 45)),
+                "user_id": user_ids[index % len(user_ids)],
+                "created_at": now,
+                "updated_at": now,
+            }
+            for index in range(start, min(start + BATCH_SIZE, count))
+        ]
+
+        async with engine.begin() as conn:
+            await conn.execute(insert(Contact), contacts)
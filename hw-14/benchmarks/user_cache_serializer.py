@@ -0,0 +1,54 @@
+"""
+Compares the size and encode/decode time of the cached User snapshot against pickling the ORM instance.
+
+Run from the hw-14 directory::
+
+    python -m benchmarks.user_cache_serializer
+"""
+import pickle
+import timeit
+import uuid
+from datetime import datetime
+
+from src.database.cache_serializer import user_serializer
+from src.entity import User
+from src.entity.user import Role
+
+ITERATIONS = 20_000
+
+
+def make_user() -> User:
+    return User(
+        id=uuid.uuid4(),
+        email="alex.ivanov@gmail.com",
+        password="$2b$12$" + "x" * 53,
+        role=Role.user,
+        is_confirmed=True,
+        avatar="https://res.cloudinary.com/abc/image/upload/c_fill,h_250,w_250/v1/fastapi/alex.ivanov@gmail.com",
+        created_at=datetime.now(),
+        updated_at=datetime.now(),
+    )
+
+
+def measure(name: str, dumps, loads, user: User) -> dict:
+    data = dumps(user)
+    encode = timeit.timeit(lambda: dumps(user), number=ITERATIONS) / ITERATIONS
+    decode = timeit.timeit(lambda: loads(data), number=ITERATIONS) / ITERATIONS
+
+    return {"name": name, "size": len(data), "encode_us": encode * 1e6, "decode_us": decode * 1e6}
+
+
+def main():
+    user = make_user()
+    results = [
+        measure("pickle", pickle.dumps, pickle.loads, user),
+        measure(f"snapshot v{user_serializer.version}", user_serializer.dumps, user_serializer.loads, user),
+    ]
+
+    print(f"{'format':<14}{'bytes':>8}{'encode, us':>14}{'decode, us':>14}")
+    for result in results:
+        print(f"{result['name']:<14}{result['size']:>8}{result['encode_us']:>14.2f}{result['decode_us']:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
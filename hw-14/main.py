@@ -1,25 +1,43 @@
+import asyncio
+
 import uvicorn
 from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_limiter import FastAPILimiter
+from fastapi.staticfiles import StaticFiles
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.responses import JSONResponse, RedirectResponse
+from starlette.responses import JSONResponse, PlainTextResponse, RedirectResponse
 from contextlib import asynccontextmanager
 
 from src.config.constants import APIRoutes
-from src.database.cache import get_cache
-from src.database.db import get_db
+from src.config.config import config
+from src.database.cache import cache
+from src.database.db import get_db, get_pool_stats, DBSession, engine, replica_engine
 from src.routes.auth import auth_router
 from src.routes.contancts import contacts_router
 from src.routes.users import users_router
+from src.services.contacts_archiver import contacts_archiver
+from src.services.mail_worker import MailWorker
+from src.services.metrics import metrics, MetricsMiddleware
+from src.services.password import password_hasher
+from src.services.token_cache import token_cache
+from src.services.user_cache import user_cache
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    redis = await get_cache()
-    await FastAPILimiter.init(redis)
+    redis = cache.init()
+    tasks = [asyncio.create_task(user_cache.listen(redis)), asyncio.create_task(token_cache.listen(redis))]
+    if config.MAIL_WORKER_EMBEDDED:
+        tasks.append(asyncio.create_task(MailWorker(DBSession).run()))
+    if config.CONTACTS_ARCHIVE_EMBEDDED:
+        tasks.append(asyncio.create_task(contacts_archiver.run()))
     yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await cache.close()
+    password_hasher.close()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -36,12 +54,19 @@ app.add_middleware(
     allow_headers=['*'],
 )
 
+if config.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+    if replica_engine is not None:
+        metrics.instrument_engine(replica_engine)
+    app.add_middleware(MetricsMiddleware, server_timing=config.METRICS_SERVER_TIMING)
+
 
 @app.exception_handler(HTTPException)
 def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"message": exc.detail},
+        headers=exc.headers,
     )
 
 
@@ -57,6 +82,10 @@ app.include_router(contacts_router, prefix=APIRoutes.API_ROUTE_PREFIX)
 app.include_router(auth_router, prefix=APIRoutes.API_ROUTE_PREFIX)
 app.include_router(users_router, prefix=APIRoutes.API_ROUTE_PREFIX)
 
+if config.AVATAR_STORAGE == "local":
+    app.mount(config.AVATAR_LOCAL_URL, StaticFiles(directory=config.AVATAR_LOCAL_DIRECTORY, check_dir=False),
+              name="media")
+
 
 @app.get("/api/healthchecker")
 async def healthchecker(db: AsyncSession = Depends(get_db)):
@@ -68,12 +97,26 @@ async def healthchecker(db: AsyncSession = Depends(get_db)):
             raise HTTPException(
                 status_code=500, detail="Database is not configured correctly"
             )
-        return {"message": "Welcome to FastAPI!"}
+        return {"message": "Welcome to FastAPI!", "cache": cache.get_stats(), "db": get_pool_stats(),
+                "db_replica": get_pool_stats(replica_engine),
+                "password_hasher": password_hasher.get_stats(), "contacts_archive": contacts_archiver.get_stats()}
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail="Error connecting to the database")
 
 
+if config.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        return PlainTextResponse(
+            metrics.render({"db_pool": get_pool_stats(), "db_replica_pool": get_pool_stats(replica_engine),
+                            "redis_pool": cache.get_stats(),
+                            "password_hasher": password_hasher.get_stats(),
+                            "contacts_archive": contacts_archiver.get_stats()}),
+            media_type="text/plain; version=0.0.4",
+        )
+
+
 @app.get("/", include_in_schema=False)
 async def root():
     return RedirectResponse(url="/docs", status_code=302)
@@ -0,0 +1,33 @@
+"""added contacts trigram indexes
+
+Revision ID: 5a1f3c9e2b7d
+Revises: bf3db198d9dd
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a1f3c9e2b7d'
+down_revision: Union[str, None] = 'bf3db198d9dd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = ('name', 'surname', 'email')
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for column in SEARCH_COLUMNS:
+        op.create_index(f'ix_contacts_{column}_trgm', 'contacts', [column], unique=False,
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    for column in SEARCH_COLUMNS:
+        op.drop_index(f'ix_contacts_{column}_trgm', table_name='contacts', postgresql_using='gin')
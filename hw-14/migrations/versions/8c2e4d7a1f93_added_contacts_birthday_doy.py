@@ -0,0 +1,36 @@
+"""added contacts birthday_doy
+
+Revision ID: 8c2e4d7a1f93
+Revises: 5a1f3c9e2b7d
+Create Date: 2026-10-18 11:04:17.552081
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2e4d7a1f93'
+down_revision: Union[str, None] = '5a1f3c9e2b7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column(
+        'birthday_doy',
+        sa.Integer(),
+        sa.Computed(
+            'CAST(EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday) AS INTEGER)',
+            persisted=True,
+        ),
+        nullable=False,
+    ))
+    op.create_index('ix_contacts_user_id_birthday_doy', 'contacts', ['user_id', 'birthday_doy'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_doy', table_name='contacts')
+    op.drop_column('contacts', 'birthday_doy')
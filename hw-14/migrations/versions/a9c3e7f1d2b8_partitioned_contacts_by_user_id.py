@@ -0,0 +1,96 @@
+"""partitioned contacts by user_id
+
+Revision ID: a9c3e7f1d2b8
+Revises: f3a7c2d9e1b4
+Create Date: 2026-10-18 17:24:11.906534
+
+On PostgreSQL the contacts table is rebuilt as a table hash partitioned by user_id, so every per-user query
+only reads the partition of its user. The number of partitions can not be changed later without rebuilding
+the table again; it is 16 by default and can be set with::
+
+    alembic -x contacts_partitions=64 upgrade head
+
+The contacts are copied in one statement while the tables are locked, so run it in a maintenance window.
+All contacts must belong to a user: user_id becomes part of the primary key.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c3e7f1d2b8'
+down_revision: Union[str, None] = 'f3a7c2d9e1b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16
+SEARCH_COLUMNS = ('name', 'surname', 'email')
+ACTIVE = sa.text('deleted_at IS NULL')
+DELETED = sa.text('deleted_at IS NOT NULL')
+# The generated birthday_doy column is computed again on insert.
+COLUMNS = 'id, name, surname, email, phone, birthday, user_id, created_at, updated_at, deleted_at'
+
+
+def get_partitions() -> int:
+    return int(context.get_x_argument(as_dictionary=True).get('contacts_partitions', PARTITIONS))
+
+
+def create_indexes():
+    for column in SEARCH_COLUMNS:
+        op.create_index(f'ix_contacts_{column}_trgm', 'contacts', [column], unique=False,
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'}, postgresql_where=ACTIVE)
+
+    op.create_index('ix_contacts_user_id_birthday_doy', 'contacts', ['user_id', 'birthday_doy'], unique=False,
+                    postgresql_where=ACTIVE)
+    op.create_index('ix_contacts_user_id_id', 'contacts', ['user_id', 'id'], unique=False, postgresql_where=ACTIVE)
+    op.create_index('ix_contacts_deleted_at', 'contacts', ['deleted_at'], unique=False, postgresql_where=DELETED)
+
+
+def rebuild_contacts(partition_by: str | None, primary_key: list[str], partitions: int = 0):
+    """
+    Copies the contacts into a new contacts table, partitioned or not, and drops the old one with its indexes.
+    """
+    op.execute('ALTER TABLE contacts RENAME TO contacts_old')
+    op.execute(
+        'CREATE TABLE contacts (LIKE contacts_old INCLUDING DEFAULTS INCLUDING GENERATED)'
+        + (f' PARTITION BY {partition_by}' if partition_by else '')
+    )
+
+    for remainder in range(partitions):
+        op.execute(
+            f'CREATE TABLE contacts_p{remainder} PARTITION OF contacts '
+            f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+        )
+
+    op.execute(f'INSERT INTO contacts ({COLUMNS}) SELECT {COLUMNS} FROM contacts_old')
+    # The ids keep coming from the same sequence; it would be dropped together with the table owning it.
+    op.execute('ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id')
+    op.drop_table('contacts_old')
+
+    op.create_primary_key('contacts_pkey', 'contacts', primary_key)
+    op.create_foreign_key('contacts_user_id_fkey', 'contacts', 'users', ['user_id'], ['id'], ondelete='CASCADE')
+    create_indexes()
+    op.execute('ANALYZE contacts')
+
+
+def partition_contacts(partitions: int):
+    # Fails before copying anything if there are contacts without a user.
+    op.alter_column('contacts', 'user_id', nullable=False)
+    rebuild_contacts('HASH (user_id)', ['id', 'user_id'], partitions)
+
+
+def upgrade() -> None:
+    # Other databases keep the plain table.
+    if op.get_bind().dialect.name == 'postgresql':
+        partition_contacts(get_partitions())
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Dropping the partitioned table drops its partitions.
+    rebuild_contacts(None, ['id'])
+    op.alter_column('contacts', 'user_id', nullable=True)
@@ -0,0 +1,45 @@
+"""added mail outbox
+
+Revision ID: c4a9e2f17b3d
+Revises: 8c2e4d7a1f93
+Create Date: 2026-10-18 12:21:40.183927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a9e2f17b3d'
+down_revision: Union[str, None] = '8c2e4d7a1f93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'mail_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('recipient', sa.String(length=150), nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=False),
+        sa.Column('template', sa.String(length=50), nullable=False),
+        sa.Column('body', sa.JSON(), nullable=False),
+        sa.Column('status', sa.Enum('pending', 'sent', 'failed', name='mail_status'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_mail_outbox_status_next_attempt_at', 'mail_outbox', ['status', 'next_attempt_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_mail_outbox_status_next_attempt_at', table_name='mail_outbox')
+    op.drop_table('mail_outbox')
+    op.execute('DROP TYPE mail_status')
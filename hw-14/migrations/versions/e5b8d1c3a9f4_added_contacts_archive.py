@@ -0,0 +1,73 @@
+"""added contacts archive and partial indexes
+
+Revision ID: e5b8d1c3a9f4
+Revises: c4a9e2f17b3d
+Create Date: 2026-10-18 14:37:05.614297
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8d1c3a9f4'
+down_revision: Union[str, None] = 'c4a9e2f17b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = ('name', 'surname', 'email')
+ACTIVE = sa.text('deleted_at IS NULL')
+
+
+def create_search_indexes(where=None):
+    for column in SEARCH_COLUMNS:
+        op.create_index(f'ix_contacts_{column}_trgm', 'contacts', [column], unique=False,
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'}, postgresql_where=where)
+
+
+def drop_search_indexes():
+    for column in SEARCH_COLUMNS:
+        op.drop_index(f'ix_contacts_{column}_trgm', table_name='contacts', postgresql_using='gin')
+
+
+def upgrade() -> None:
+    drop_search_indexes()
+    create_search_indexes(where=ACTIVE)
+    op.drop_index('ix_contacts_user_id_birthday_doy', table_name='contacts')
+    op.create_index('ix_contacts_user_id_birthday_doy', 'contacts', ['user_id', 'birthday_doy'], unique=False,
+                    postgresql_where=ACTIVE)
+    op.create_index('ix_contacts_user_id_id', 'contacts', ['user_id', 'id'], unique=False, postgresql_where=ACTIVE)
+    op.create_index('ix_contacts_deleted_at', 'contacts', ['deleted_at'], unique=False,
+                    postgresql_where=sa.text('deleted_at IS NOT NULL'))
+
+    op.create_table(
+        'contacts_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('surname', sa.String(length=50), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=False),
+        sa.Column('birthday', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_contacts_archive_user_id', 'contacts_archive', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_archive_user_id', table_name='contacts_archive')
+    op.drop_table('contacts_archive')
+
+    op.drop_index('ix_contacts_deleted_at', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_id', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_birthday_doy', table_name='contacts')
+    op.create_index('ix_contacts_user_id_birthday_doy', 'contacts', ['user_id', 'birthday_doy'], unique=False)
+    drop_search_indexes()
+    create_search_indexes()
@@ -0,0 +1,42 @@
+"""added refresh token families
+
+Revision ID: f3a7c2d9e1b4
+Revises: e5b8d1c3a9f4
+Create Date: 2026-10-18 16:02:48.371205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a7c2d9e1b4'
+down_revision: Union[str, None] = 'e5b8d1c3a9f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'refresh_token_families',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_refresh_token_families_user_id', 'refresh_token_families', ['user_id'], unique=False
+    )
+    # Refresh tokens issued before the families carry no family and are rejected, so users sign in again.
+    op.drop_column('users', 'refresh_token')
+
+
+def downgrade() -> None:
+    op.add_column('users', sa.Column('refresh_token', sa.String(length=255), nullable=True))
+    op.drop_index('ix_refresh_token_families_user_id', table_name='refresh_token_families')
+    op.drop_table('refresh_token_families')
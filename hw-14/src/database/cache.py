@@ -1,7 +1,147 @@
+import asyncio
+import time
+from typing import Callable
+
 import redis.asyncio as redis
+from redis.exceptions import RedisError
 
 from src.config.config import config
+from src.services.metrics import request_timings
+
+
+class CachePool(redis.BlockingConnectionPool):
+    """
+    Blocking Redis connection pool that keeps track of how long callers wait for a connection.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def get_connection(self, *args, **kwargs):
+        started_at = time.perf_counter()
+
+        try:
+            return await super().get_connection(*args, **kwargs)
+        finally:
+            waited = time.perf_counter() - started_at
+            self.wait_count += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    def get_stats(self) -> dict:
+        """
+        Returns a snapshot of the pool utilisation.
+
+        :return: The pool size, in-use and idle connection counts and wait time statistics in milliseconds.
+        :rtype: dict
+        """
+        wait_time_avg = self.wait_time_total / self.wait_count if self.wait_count else 0.0
+
+        return {
+            "max_connections": self.max_connections,
+            "in_use": len(self._in_use_connections),
+            "idle": len(self._available_connections),
+            "wait_count": self.wait_count,
+            "wait_time_avg_ms": round(wait_time_avg * 1000, 3),
+            "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+        }
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    Redis client that measures the round-trips of the request being served, when it is sampled by the metrics.
+    """
+
+    async def execute_command(self, *args, **options):
+        timings = request_timings.get()
+
+        if timings is None:
+            return await super().execute_command(*args, **options)
+
+        started_at = time.perf_counter()
+
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            timings.add_redis(time.perf_counter() - started_at)
+
+
+class Cache:
+    """
+    Holds the application-wide Redis client backed by a single connection pool.
+    """
+
+    def __init__(self):
+        self.pool: CachePool | None = None
+        self.client: InstrumentedRedis | None = None
+
+    def init(self) -> redis.Redis:
+        if self.client is None:
+            self.pool = CachePool(
+                host=config.REDIS_HOST,
+                port=config.REDIS_PORT,
+                password=config.REDIS_PASSWORD,
+                max_connections=config.REDIS_MAX_CONNECTIONS,
+                timeout=config.REDIS_POOL_TIMEOUT,
+                socket_timeout=config.REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=config.REDIS_SOCKET_TIMEOUT,
+                health_check_interval=config.REDIS_HEALTH_CHECK_INTERVAL,
+            )
+            self.client = InstrumentedRedis.from_pool(self.pool)
+
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+        self.client = None
+        self.pool = None
+
+    def get_stats(self) -> dict | None:
+        if self.pool is None:
+            return None
+
+        return self.pool.get_stats()
+
+
+cache = Cache()
+
+
+def get_cache() -> redis.Redis:
+    """
+    Returns the shared Redis client. Used as a FastAPI dependency.
+
+    The client is created lazily on first use, so the pool is also available outside of the application lifespan.
+
+    :return: The Redis client bound to the application connection pool.
+    :rtype: redis.Redis
+    """
+    return cache.init()
+
+
+async def subscribe(client: redis.Redis, channel: str, on_message: Callable[[str], None], on_reset: Callable[[], None],
+                    reconnect_delay: float = 1):
+    """
+    Calls on_message with every message published on the channel. Runs until cancelled.
+
+    While the subscription is down messages are lost, so on_reset is called to let the subscriber drop the state
+    the lost messages could have invalidated.
+    """
+    while True:
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
 
+        try:
+            await pubsub.subscribe(channel)
 
-def get_cache():
-    return redis.Redis(host=config.REDIS_HOST, port=config.REDIS_PORT, password=config.REDIS_PASSWORD)
+            async for message in pubsub.listen():
+                on_message(message["data"].decode())
+        except RedisError as error:
+            print(error)
+            on_reset()
+            await asyncio.sleep(reconnect_delay)
+        finally:
+            await pubsub.aclose()
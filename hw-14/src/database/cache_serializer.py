@@ -0,0 +1,77 @@
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Callable
+
+from sqlalchemy.orm import attributes
+
+from src.entity import User
+from src.entity.user import Role
+
+
+class SnapshotField:
+    def __init__(self, name: str, encode: Callable[[Any], Any] = None, decode: Callable[[Any], Any] = None):
+        self.name = name
+        self.encode = encode
+        self.decode = decode
+
+
+def uuid_field(name: str) -> SnapshotField:
+    return SnapshotField(name, encode=str, decode=uuid.UUID)
+
+
+def datetime_field(name: str) -> SnapshotField:
+    return SnapshotField(name, encode=datetime.isoformat, decode=datetime.fromisoformat)
+
+
+class SnapshotSerializer:
+    """
+    Serializes an entity into a compact, versioned snapshot for the cache.
+
+    Only the listed fields are stored, positionally, as ``[version, value, ...]`` JSON. Any change of the
+    field list must bump the version: snapshots written with another version are treated as a cache miss,
+    so the entity is reloaded from the database and cached again in the new format.
+    """
+
+    def __init__(self, entity: type, version: int, fields: list[SnapshotField]):
+        self.entity = entity
+        self.version = version
+        self.fields = fields
+        self.manager = attributes.manager_of_class(entity)
+
+    def dumps(self, instance) -> bytes:
+        values = [self.version]
+
+        for field in self.fields:
+            value = getattr(instance, field.name)
+            values.append(field.encode(value) if value is not None and field.encode else value)
+
+        return json.dumps(values, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes):
+        try:
+            version, *values = json.loads(data)
+        except (ValueError, TypeError):
+            return None
+
+        if version != self.version or len(values) != len(self.fields):
+            return None
+
+        # Fill the instance dict directly, like the ORM does when loading a row, to skip attribute events.
+        instance = self.manager.new_instance()
+        instance.__dict__.update({
+            field.name: field.decode(value) if value is not None and field.decode else value
+            for field, value in zip(self.fields, values)
+        })
+
+        return instance
+
+
+user_serializer = SnapshotSerializer(User, version=1, fields=[
+    uuid_field("id"),
+    SnapshotField("email"),
+    SnapshotField("role", encode=lambda role: role.value, decode=Role),
+    SnapshotField("avatar"),
+    datetime_field("created_at"),
+    datetime_field("updated_at"),
+])
@@ -1,12 +1,116 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 
 from src.config.config import config
 
-engine = create_async_engine(config.DB_URL)
-DBSession = async_sessionmaker(autocommit=False, bind=engine)
+
+def get_engine_options(db_url: str) -> dict:
+    """
+    Builds the engine options from the config. Pool settings apply to server databases only, SQLite
+    keeps the SQLAlchemy defaults.
+    """
+    url = make_url(db_url)
+
+    if url.get_backend_name() == "sqlite":
+        return {}
+
+    options = {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "server_settings": {"statement_timeout": str(config.DB_STATEMENT_TIMEOUT_MS)}
+        }
+
+    return options
+
+
+class SessionRouter:
+    """
+    Routes read-only queries to the read replica, everything else goes to the primary.
+
+    The replica lags behind the primary, so a user who has just written would not see the write there. After a
+    write, the user is marked in Redis for DB_READ_YOUR_WRITES_WINDOW seconds, so the mark is seen by all workers,
+    and the reads of a marked user stay on the primary. Without a replica, Redis is not touched.
+    """
+
+    def __init__(self, primary: async_sessionmaker, replica: async_sessionmaker | None = None,
+                 sticky_window: float = 5):
+        self.primary = primary
+        self.replica = replica
+        self.sticky_window = sticky_window
+
+    @staticmethod
+    def get_sticky_key(key) -> str:
+        return f"db:sticky:{key}"
+
+    async def stick(self, key, cache: Redis):
+        """
+        Keeps the reads of the user on the primary for the read-your-writes window.
+
+        :param key: The user the reads are scoped to: the user ID for contacts, the email for the user itself.
+        :param cache: The Redis client.
+        :type cache: Redis
+        """
+        if self.replica is None:
+            return
+
+        try:
+            await cache.set(self.get_sticky_key(key), 1, px=int(self.sticky_window * 1000))
+        except RedisError as error:
+            print(error)
+
+    async def get_read_session_maker(self, key, cache: Redis) -> async_sessionmaker:
+        """
+        Returns the session factory for read-only queries of the user: the replica, unless the user wrote
+        recently or Redis is unavailable.
+
+        :param key: The user the reads are scoped to, as passed to stick.
+        :param cache: The Redis client.
+        :type cache: Redis
+        :return: The session factory of the replica or of the primary.
+        :rtype: async_sessionmaker
+        """
+        if self.replica is None:
+            return self.primary
+
+        try:
+            is_sticky = await cache.get(self.get_sticky_key(key))
+        except RedisError as error:
+            print(error)
+            return self.primary
+
+        return self.primary if is_sticky else self.replica
+
+
+engine = create_async_engine(config.DB_URL, **get_engine_options(config.DB_URL))
+DBSession = async_sessionmaker(autocommit=False, expire_on_commit=False, bind=engine)
+
+replica_engine = (
+    create_async_engine(config.DB_REPLICA_URL, **get_engine_options(config.DB_REPLICA_URL))
+    if config.DB_REPLICA_URL else None
+)
+ReplicaDBSession = (
+    async_sessionmaker(autocommit=False, expire_on_commit=False, bind=replica_engine) if replica_engine else None
+)
+
+session_router = SessionRouter(DBSession, ReplicaDBSession, config.DB_READ_YOUR_WRITES_WINDOW)
 
 
 async def get_db():
+    """
+    Yields the request-scoped session.
+
+    The session checks out a connection from the pool only when it runs its first statement, so requests
+    that are served from the cache (e.g. authentication of a cached user) never touch the pool.
+    """
     session = DBSession()
 
     try:
@@ -17,3 +121,46 @@ async def get_db():
         raise error
     finally:
         await session.close()
+
+
+def get_session_maker() -> async_sessionmaker:
+    """
+    Returns the session factory, for work that outlives the request-scoped session, e.g. streamed responses.
+    """
+    return DBSession
+
+
+def get_session_router() -> SessionRouter:
+    """
+    Returns the router choosing between the primary and the read replica for read-only queries.
+    """
+    return session_router
+
+
+def get_pool_stats(db_engine: AsyncEngine | None = engine) -> dict | None:
+    """
+    Returns a snapshot of the connection pool utilisation, or None for pools that do not keep connections
+    and for an engine that is not configured (e.g. no read replica).
+    """
+    if db_engine is None:
+        return None
+
+    pool = db_engine.pool
+
+    if not hasattr(pool, "checkedout"):
+        return None
+
+    return {
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "in_use": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+
+def is_postgresql(db: AsyncSession) -> bool:
+    """
+    Checks whether the session is bound to PostgreSQL, to enable PostgreSQL-only query features.
+    """
+    return db.get_bind().dialect.name == "postgresql"
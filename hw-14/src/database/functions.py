@@ -0,0 +1,26 @@
+from sqlalchemy import Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class month_day(FunctionElement):
+    """
+    Month and day of a date as a MMDD integer, e.g. 229 for the 29th of February.
+
+    Used for the generated birthday_doy column, so it has to be immutable on every dialect.
+    """
+
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(month_day)
+def compile_month_day(element, compiler, **kw):
+    value = compiler.process(element.clauses, **kw)
+
+    return f"CAST(EXTRACT(MONTH FROM {value}) * 100 + EXTRACT(DAY FROM {value}) AS INTEGER)"
+
+
+@compiles(month_day, "sqlite")
+def compile_month_day_sqlite(element, compiler, **kw):
+    return f"CAST(strftime('%m%d', {compiler.process(element.clauses, **kw)}) AS INTEGER)"
@@ -1,5 +1,7 @@
 from .base import Base
-from .contact import Contact
+from .contact import Contact, ContactArchive
+from .mail import MailOutbox
+from .refresh_token import RefreshTokenFamily
 from .user import User
 
-__all__ = ["Base", "Contact", "User"]
+__all__ = ["Base", "Contact", "ContactArchive", "MailOutbox", "RefreshTokenFamily", "User"]
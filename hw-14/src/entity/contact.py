@@ -1,11 +1,33 @@
 from sqlalchemy.orm import mapped_column, Mapped, relationship
-from sqlalchemy import String, Date, DateTime, ForeignKey
+from sqlalchemy import String, Date, DateTime, ForeignKey, Index, Integer, Computed, column, text
 from datetime import datetime, date
+from src.database.functions import month_day
 from src.entity.base import Base
 
 
+# Every read filters out soft-deleted contacts, so the indexes of the reads only cover the live rows.
+ACTIVE = text("deleted_at IS NULL")
+
+
 class Contact(Base):
     __tablename__ = "contacts"
+    # On PostgreSQL the table is hash partitioned by user_id (see the a9c3e7f1d2b8 migration), so its primary key
+    # there is (id, user_id), not id as declared here. The IDs are still unique, they all come from one sequence.
+    # Alembic autogenerate does not compare primary keys, so the difference does not show up in new revisions.
+    __table_args__ = (
+        Index("ix_contacts_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+              postgresql_where=ACTIVE),
+        Index("ix_contacts_surname_trgm", "surname", postgresql_using="gin",
+              postgresql_ops={"surname": "gin_trgm_ops"}, postgresql_where=ACTIVE),
+        Index("ix_contacts_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"},
+              postgresql_where=ACTIVE),
+        Index("ix_contacts_user_id_birthday_doy", "user_id", "birthday_doy", postgresql_where=ACTIVE,
+              sqlite_where=ACTIVE),
+        Index("ix_contacts_user_id_id", "user_id", "id", postgresql_where=ACTIVE, sqlite_where=ACTIVE),
+        # The soft-deleted rows, for the archiving job.
+        Index("ix_contacts_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL"),
+              sqlite_where=text("deleted_at IS NOT NULL")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(50))
@@ -13,9 +35,10 @@ class Contact(Base):
     email: Mapped[str]
     phone: Mapped[str] = mapped_column(String(20))
     birthday: Mapped[date] = mapped_column(Date())
+    birthday_doy: Mapped[int] = mapped_column(Integer, Computed(month_day(column("birthday")), persisted=True))
 
     user_id = mapped_column(
-        "user_id", ForeignKey("users.id", ondelete="CASCADE"), default=None
+        "user_id", ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
     user = relationship("User", backref="contacts")
 
@@ -24,3 +47,22 @@ class Contact(Base):
         DateTime, default=datetime.now(), onupdate=datetime.now
     )
     deleted_at: Mapped[datetime | None] = mapped_column(DateTime, default=None)
+
+
+class ContactArchive(Base):
+    """
+    Contacts soft-deleted longer than the retention period, moved out of the contacts table by the archiving job.
+    """
+    __tablename__ = "contacts_archive"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(50))
+    surname: Mapped[str] = mapped_column(String(50))
+    email: Mapped[str]
+    phone: Mapped[str] = mapped_column(String(20))
+    birthday: Mapped[date] = mapped_column(Date())
+    user_id = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, default=None)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    updated_at: Mapped[datetime] = mapped_column(DateTime)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime)
@@ -0,0 +1,33 @@
+import enum
+from datetime import datetime
+
+from sqlalchemy import Integer, String, DateTime, Enum, JSON, Text, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class MailStatus(enum.Enum):
+    pending = "pending"
+    sent = "sent"
+    failed = "failed"
+
+
+class MailOutbox(Base):
+    __tablename__ = "mail_outbox"
+    __table_args__ = (
+        Index("ix_mail_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    recipient = mapped_column(String(150), nullable=False)
+    subject = mapped_column(String(255), nullable=False)
+    template = mapped_column(String(50), nullable=False)
+    body = mapped_column(JSON, nullable=False)
+    status = mapped_column("status", Enum(MailStatus, name="mail_status"), default=MailStatus.pending,
+                           nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, nullable=False)
+    last_error = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime, default=None)
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import String, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class RefreshTokenFamily(Base):
+    """
+    A chain of rotated refresh tokens started by one sign-in, i.e. one device of the user.
+
+    The current token of an active family lives in Redis only; the rows are the durable record of the families,
+    written when a family is created or revoked.
+    """
+    __tablename__ = "refresh_token_families"
+
+    id = mapped_column(String(32), primary_key=True)
+    user_id = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    revoked_at: Mapped[datetime | None] = mapped_column(DateTime, default=None)
@@ -22,7 +22,6 @@ class User(Base):
     )
     email = mapped_column(String(150), nullable=False, unique=True)
     password = mapped_column(String(255), nullable=False)
-    refresh_token = mapped_column(String(255), nullable=True)
     role = mapped_column("role", Enum(Role), default=Role.user)
     is_confirmed = mapped_column(Boolean(), default=False)
     avatar = mapped_column(String(), nullable=True)
@@ -1,52 +1,184 @@
+import calendar
 import datetime
 
-from sqlalchemy import select, func
+from typing import AsyncIterator
+
+from sqlalchemy import Row, Select, DateTime, select, func, text, insert, update, delete, literal
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from src.entity import Contact
-from src.schemas.contacts import ContactBaseSchema, ContactSchema
+from src.database.db import is_postgresql
+from src.entity import Contact, ContactArchive
+from src.schemas.contacts import ContactBaseSchema, ContactSchema, ContactUpdateSchema
 from src.util.is_string import is_string
 
+# Listings only need the columns of the response schema, selected as plain rows instead of ORM entities.
+CONTACT_COLUMNS = tuple(getattr(Contact, name) for name in ContactSchema.model_fields)
+
+# The columns moved between the contacts and the archive.
+ARCHIVED_FIELDS = (
+    "id", "name", "surname", "email", "phone", "birthday", "user_id", "created_at", "updated_at", "deleted_at"
+)
+
+
+def get_month_day(value: datetime.date) -> int:
+    """
+    Returns the month and day of a date as a MMDD integer, the format of Contact.birthday_doy.
+
+    In non-leap years the 28th of February also stands for the 29th, so that those birthdays are not skipped.
+
+    :param value: The date to convert.
+    :type value: datetime.date
+    :return: The MMDD integer.
+    :rtype: int
+    """
+    if value.month == 2 and value.day == 28 and not calendar.isleap(value.year):
+        return 229
+
+    return value.month * 100 + value.day
+
 
 async def get_contacts_birthday(
     birthday_days: int, user_id: str, db: AsyncSession
-) -> list[ContactSchema]:
+) -> list[Row]:
     """
     Retrieves contacts with birthdays occurring within the next specified number of days for a given user.
 
+    Only the month and day of a birthday are compared, using the indexed ``birthday_doy`` column, so the
+    range may wrap around the end of the year. Contacts are ordered by the upcoming birthday.
+
     :param birthday_days: The number of days from today to check for birthdays.
     :type birthday_days: int
     :param user_id: The ID of the user whose contacts to retrieve.
     :type user_id: str
     :param db: The SQLAlchemy asynchronous database session.
     :type db: AsyncSession
-    :return: A list of ContactSchema objects representing contacts with upcoming birthdays.
-    :rtype: list[ContactSchema]
+    :return: A list of rows with the ContactSchema columns of the contacts with upcoming birthdays.
+    :rtype: list[Row]
     """
     today = datetime.date.today()
+    start = today.month * 100 + today.day
 
-    query = (
-        select(Contact)
-        .filter_by(user_id=user_id, deleted_at=None)
-        .filter(
-            Contact.birthday.between(
-                today, today + datetime.timedelta(days=birthday_days)
-            )
-        )
-    )
+    query = select(*CONTACT_COLUMNS).filter_by(user_id=user_id, deleted_at=None)
+
+    if birthday_days < 365:
+        end = get_month_day(today + datetime.timedelta(days=birthday_days))
+
+        if start <= end:
+            query = query.filter(Contact.birthday_doy.between(start, end))
+        else:
+            query = query.filter((Contact.birthday_doy >= start) | (Contact.birthday_doy <= end))
+
+    query = query.order_by(Contact.birthday_doy < start, Contact.birthday_doy, Contact.id)
 
     contacts = await db.execute(query)
 
-    return contacts.scalars().all()
+    return contacts.all()
+
+
+def get_search_filter(search: str):
+    """
+    Builds the filter matching contacts whose name, surname or email contains the search string.
+
+    On PostgreSQL the ``ILIKE '%...%'`` clauses are served by the pg_trgm GIN indexes of these columns.
+    """
+    pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+    return (
+        Contact.name.ilike(pattern, escape="\\")
+        | Contact.surname.ilike(pattern, escape="\\")
+        | Contact.email.ilike(pattern, escape="\\")
+    )
+
+
+def get_search_rank(search: str):
+    """
+    Builds the pg_trgm relevance of a contact for the search string (PostgreSQL only).
+    """
+    return func.greatest(
+        func.similarity(Contact.name, search),
+        func.similarity(Contact.surname, search),
+        func.similarity(Contact.email, search),
+    )
+
+
+def filter_contacts(query: Select, search: str, user_id: str | None) -> Select:
+    """
+    Applies the listing filters: not deleted, owned by the user (or by anyone for admins), matching the search.
+    """
+    query = query.filter_by(deleted_at=None)
+
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    else:
+        query = query.filter(Contact.user_id.is_not(None))
+
+    if is_string(search):
+        query = query.filter(get_search_filter(search))
+
+    return query
+
+
+def get_contacts_page_query(
+    offset: int,
+    limit: int,
+    search: str,
+    user_id: str | None,
+    after_id: int | None = None,
+    order_by_relevance: bool = False,
+    with_user: bool = False,
+) -> Select:
+    """
+    Builds the query of a single page of contacts, ordered by ID.
+
+    See :func:`get_contacts` for the meaning of the parameters. With ``order_by_relevance``, offset pages
+    of a search are ordered by trigram similarity to the search string first.
+
+    :return: The SELECT statement for the page.
+    :rtype: Select
+    """
+    if with_user:
+        query = select(Contact).options(joinedload(Contact.user))
+    else:
+        query = select(*CONTACT_COLUMNS)
+
+    query = filter_contacts(query, search, user_id).limit(limit)
+
+    if after_id is not None:
+        query = query.filter(Contact.id > after_id)
+    else:
+        query = query.offset(offset)
+
+    if is_string(search) and order_by_relevance and after_id is None:
+        query = query.order_by(get_search_rank(search).desc())
+
+    return query.order_by(Contact.id)
 
 
 async def get_contacts(
-    offset: int, limit: int, search: str, user_id: str | None, db: AsyncSession
-) -> (int, list[ContactSchema]):
+    offset: int,
+    limit: int,
+    search: str,
+    user_id: str | None,
+    db: AsyncSession,
+    after_id: int | None = None,
+    with_total: bool = True,
+    with_user: bool = False,
+) -> (list[Row] | list[Contact], int | None):
     """
     Retrieves a list of contacts with pagination and optional search filtering.
 
     Allows filtering by user ID and searching across name, surname, and email.
+    Contacts are ordered by ID. When ``after_id`` is given, keyset pagination is used instead of the offset:
+    only contacts with a greater ID are returned, so the cost of a page does not depend on its depth.
+    On PostgreSQL, offset pages of a search are ordered by relevance instead.
+
+    For offset pages the total is computed with a window function in the same query as the page.
+    A separate count query is only issued for cursor pages and for offsets past the last contact.
+
+    Only the columns of ContactSchema are selected, so rows are returned instead of Contact entities.
+    With ``with_user``, Contact entities are loaded together with their owners in a single joined query,
+    instead of a lazy load per contact.
 
     :param offset: The number of records to skip (for pagination).
     :type offset: int
@@ -58,31 +190,81 @@ async def get_contacts(
     :type user_id: str | None
     :param db: The SQLAlchemy asynchronous database session.
     :type db: AsyncSession
-    :return: A tuple containing the total count of matching contacts and a list of ContactSchema objects.
-    :rtype: (int, list[ContactSchema])
+    :param after_id: The ID of the last contact of the previous page (for cursor pagination).
+    :type after_id: int | None
+    :param with_total: Whether to count the matching contacts, e.g. False when the total is cached.
+    :type with_total: bool
+    :param with_user: Whether to load Contact entities with their owners (admin listing).
+    :type with_user: bool
+    :return: A tuple containing the rows (or Contact entities with ``with_user``) of the page and the total
+        count of matching contacts (None if not requested).
+    :rtype: (list[Row] | list[Contact], int | None)
     """
-    count_query = select(func.count(Contact.id)).filter_by(deleted_at=None)
+    query = get_contacts_page_query(
+        offset, limit, search, user_id, after_id, order_by_relevance=is_postgresql(db), with_user=with_user
+    )
+    with_window_total = with_total and after_id is None
 
-    query = select(Contact).filter_by(deleted_at=None).limit(limit).offset(offset)
+    if with_window_total:
+        query = query.add_columns(func.count().over().label("total"))
 
-    if user_id is not None:
-        query = query.filter_by(user_id=user_id)
-        count_query = count_query.filter_by(user_id=user_id)
-    else:
-        query = query.filter(Contact.user_id.is_not(None))
-        count_query = count_query.filter(Contact.user_id.is_not(None))
+    rows = (await db.execute(query)).all()
+    contacts = [row[0] for row in rows] if with_user else rows
 
-    if is_string(search):
-        query = query.filter(
-            Contact.name.ilike(f"%{search}%")
-            | Contact.surname.ilike(f"%{search}%")
-            | Contact.email.ilike(f"%{search}%")
-        )
+    if not with_total:
+        return contacts, None
 
-    count = await db.execute(count_query)
-    contacts = await db.execute(query)
+    if with_window_total:
+        if rows:
+            return contacts, rows[0].total
+
+        if offset == 0:
+            return contacts, 0
+
+    return contacts, await count_contacts(search, user_id, db)
+
+
+async def count_contacts(search: str, user_id: str | None, db: AsyncSession) -> int:
+    """
+    Counts the contacts matching the listing filters.
+
+    :param search: Optional search string to filter contacts by name, surname, or email.
+    :type search: str
+    :param user_id: The ID of the user whose contacts to count, or None for all contacts (admin).
+    :type user_id: str | None
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    :return: The number of matching contacts.
+    :rtype: int
+    """
+    count = await db.execute(filter_contacts(select(func.count(Contact.id)), search, user_id))
+
+    return count.scalar_one()
 
-    return contacts.scalars().all(), count.scalar_one_or_none()
+
+async def estimate_contacts_total(db: AsyncSession) -> int | None:
+    """
+    Returns the planner estimate of the number of rows in the contacts table.
+
+    The estimate is read from pg_class statistics, so it is cheap on very large tables but only as fresh
+    as the last ANALYZE, and it includes deleted contacts. The statistics are kept per partition, so the
+    estimates of the partitions of a partitioned table are summed.
+
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    :return: The estimated row count, or None if the database is not PostgreSQL or the table was never analyzed.
+    :rtype: int | None
+    """
+    if not is_postgresql(db):
+        return None
+
+    estimate = await db.execute(text(
+        "SELECT SUM(c.reltuples)::bigint FROM pg_partition_tree('contacts') AS tree "
+        "JOIN pg_class AS c ON c.oid = tree.relid WHERE tree.isleaf AND c.reltuples >= 0"
+    ))
+    total = estimate.scalar_one_or_none()
+
+    return total if total is not None and total >= 0 else None
 
 
 async def get_contact(contact_id: int, user_id: str, db: AsyncSession):
@@ -124,14 +306,68 @@ async def create_contact(body: ContactBaseSchema, user_id: str, db: AsyncSession
     return contact
 
 
+async def create_contacts(bodies: list[ContactBaseSchema], user_id: str, db: AsyncSession) -> list[int]:
+    """
+    Creates a batch of contacts for a specific user with a multi-row INSERT ... RETURNING.
+
+    :param bodies: The Pydantic schemas containing contact data.
+    :type bodies: list[ContactBaseSchema]
+    :param user_id: The ID of the user who will own the contacts.
+    :type user_id: str
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    :return: The IDs of the created contacts.
+    :rtype: list[int]
+    """
+    if not bodies:
+        return []
+
+    result = await db.execute(
+        insert(Contact).returning(Contact.id),
+        [{**body.model_dump(), "user_id": user_id} for body in bodies],
+    )
+    ids = result.scalars().all()
+    await db.commit()
+
+    return ids
+
+
+async def stream_contacts(user_id: str, db: AsyncSession, batch_size: int = 1000) -> AsyncIterator[Row]:
+    """
+    Iterates over all contacts of a user through a server-side cursor, fetching them in batches.
+
+    :param user_id: The ID of the user whose contacts to retrieve.
+    :type user_id: str
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    :param batch_size: The number of rows fetched from the cursor at once.
+    :type batch_size: int
+    :return: An asynchronous iterator over rows with the ContactSchema columns, ordered by ID.
+    :rtype: AsyncIterator[Row]
+    """
+    query = (
+        select(*CONTACT_COLUMNS)
+        .filter_by(user_id=user_id, deleted_at=None)
+        .order_by(Contact.id)
+        .execution_options(yield_per=batch_size)
+    )
+    contacts = await db.stream(query)
+
+    async for contact in contacts:
+        yield contact
+
+
 async def update_contact(
-    body: ContactBaseSchema, contact_id: int, user_id: str, db: AsyncSession
+    body: ContactUpdateSchema, contact_id: int, user_id: str, db: AsyncSession
 ):
     """
     Updates an existing contact record in the database for a specific user.
 
+    Only the fields set in the body are changed. The contact is updated and returned by a single
+    ``UPDATE ... RETURNING`` statement, without loading it first.
+
     :param body: The Pydantic schema containing updated contact data.
-    :type body: ContactBaseSchema
+    :type body: ContactUpdateSchema
     :param contact_id: The ID of the contact to update.
     :type contact_id: int
     :param user_id: The ID of the user who owns the contact.
@@ -141,18 +377,9 @@ async def update_contact(
     :return: The updated Contact database model if found and updated, otherwise None.
     :rtype: Optional[Contact]
     """
-    contact = await get_contact(contact_id, user_id, db)
+    values = body.model_dump(exclude_unset=True, exclude_none=True)
 
-    if contact:
-        contact.name = body.name
-        contact.surname = body.surname
-        contact.phone = body.phone
-        contact.email = body.email
-        contact.birthday = body.birthday
-        await db.commit()
-        await db.refresh(contact)
-
-    return contact
+    return await update_contact_values(contact_id, user_id, values, db)
 
 
 async def delete_contact(contact_id: int, user_id: str, db: AsyncSession):
@@ -168,11 +395,110 @@ async def delete_contact(contact_id: int, user_id: str, db: AsyncSession):
     :return: The deleted Contact database model if found and marked as deleted, otherwise None.
     :rtype: Optional[Contact]
     """
-    contact = await get_contact(contact_id, user_id, db)
+    return await update_contact_values(
+        contact_id, user_id, {"deleted_at": datetime.datetime.utcnow()}, db
+    )
+
+
+async def update_contact_values(contact_id: int, user_id: str, values: dict, db: AsyncSession):
+    """
+    Updates a not deleted contact of a user with ``UPDATE ... WHERE ... RETURNING`` and commits.
+
+    ``updated_at`` is always refreshed, so an empty ``values`` only touches the contact.
+
+    :return: The updated Contact database model, or None if no contact matched.
+    :rtype: Optional[Contact]
+    """
+    query = (
+        update(Contact)
+        .filter_by(id=contact_id, user_id=user_id, deleted_at=None)
+        .values(**values, updated_at=datetime.datetime.now())
+        .returning(Contact)
+        .execution_options(synchronize_session=False)
+    )
+    contact = await db.execute(query)
+    contact = contact.scalar_one_or_none()
+    await db.commit()
+
+    return contact
+
+
+async def archive_contacts(deleted_before: datetime.datetime, limit: int, db: AsyncSession) -> int:
+    """
+    Moves a batch of contacts soft-deleted before the given time into the archive and commits.
+
+    The batch is claimed with ``FOR UPDATE SKIP LOCKED``, so concurrent archiving jobs move disjoint batches.
+
+    :param deleted_before: Contacts deleted before this time are archived.
+    :type deleted_before: datetime.datetime
+    :param limit: The maximum number of contacts to move.
+    :type limit: int
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    :return: The number of archived contacts.
+    :rtype: int
+    """
+    ids = await db.execute(
+        select(Contact.id)
+        .filter(Contact.deleted_at < deleted_before)
+        .order_by(Contact.deleted_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    ids = ids.scalars().all()
+
+    if not ids:
+        return 0
+
+    archived_at = literal(datetime.datetime.utcnow(), DateTime)
+    await db.execute(
+        insert(ContactArchive).from_select(
+            [*ARCHIVED_FIELDS, "archived_at"],
+            select(*(getattr(Contact, name) for name in ARCHIVED_FIELDS), archived_at).filter(Contact.id.in_(ids)),
+        )
+    )
+    await db.execute(delete(Contact).filter(Contact.id.in_(ids)).execution_options(synchronize_session=False))
+    await db.commit()
+
+    return len(ids)
+
+
+async def restore_contact(contact_id: int, db: AsyncSession):
+    """
+    Restores a deleted contact, whether it is only soft-deleted or already archived, and commits.
+
+    :param contact_id: The ID of the contact to restore.
+    :type contact_id: int
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    :return: The restored Contact database model, or None if no deleted contact has this ID.
+    :rtype: Optional[Contact]
+    """
+    contact = await db.execute(
+        update(Contact)
+        .filter(Contact.id == contact_id, Contact.deleted_at.is_not(None))
+        .values(deleted_at=None, updated_at=datetime.datetime.now())
+        .returning(Contact)
+        .execution_options(synchronize_session=False)
+    )
+    contact = contact.scalar_one_or_none()
 
-    if contact:
-        contact.deleted_at = datetime.datetime.utcnow()
-        await db.commit()
-        await db.refresh(contact)
+    if contact is None:
+        archived = await db.execute(
+            delete(ContactArchive)
+            .filter_by(id=contact_id)
+            .returning(*(getattr(ContactArchive, name) for name in ARCHIVED_FIELDS))
+        )
+        archived = archived.one_or_none()
+
+        if archived is not None:
+            contact = await db.execute(
+                insert(Contact)
+                .values(**{**archived._asdict(), "deleted_at": None, "updated_at": datetime.datetime.now()})
+                .returning(Contact)
+            )
+            contact = contact.scalar_one()
+
+    await db.commit()
 
     return contact
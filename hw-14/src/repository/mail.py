@@ -0,0 +1,114 @@
+import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.entity import MailOutbox
+from src.entity.mail import MailStatus
+
+
+async def create_mail(values: dict, db: AsyncSession, commit: bool = True):
+    """
+    Adds a message to the mail outbox.
+
+    :param values: The recipient, subject, template and template body of the message.
+    :type values: dict
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    :param commit: Whether to commit; if not, the message is written with the next commit of the session.
+    :type commit: bool
+    :return: The queued MailOutbox database model.
+    :rtype: MailOutbox
+    """
+    mail = MailOutbox(**values)
+
+    db.add(mail)
+
+    if commit:
+        await db.commit()
+
+    return mail
+
+
+async def claim_mails(limit: int, lease_seconds: float, db: AsyncSession):
+    """
+    Claims a batch of pending messages that are due for delivery.
+
+    The claimed messages are postponed by the lease time, so they are not picked up by other workers while
+    being sent, and are retried after the lease if the worker dies before reporting the result.
+
+    :param limit: The maximum number of messages to claim.
+    :type limit: int
+    :param lease_seconds: For how long the messages are reserved for the caller.
+    :type lease_seconds: float
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    :return: The claimed MailOutbox database models, with the attempts counter already increased.
+    :rtype: list[MailOutbox]
+    """
+    now = datetime.datetime.now()
+    query = (
+        select(MailOutbox)
+        .filter(MailOutbox.status == MailStatus.pending, MailOutbox.next_attempt_at <= now)
+        .order_by(MailOutbox.next_attempt_at, MailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    mails = (await db.execute(query)).scalars().all()
+
+    for mail in mails:
+        mail.attempts += 1
+        mail.next_attempt_at = now + datetime.timedelta(seconds=lease_seconds)
+
+    await db.commit()
+
+    return mails
+
+
+async def set_mails_sent(mail_ids: list[int], db: AsyncSession):
+    """
+    Marks messages as delivered.
+
+    :param mail_ids: The IDs of the delivered messages.
+    :type mail_ids: list[int]
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    """
+    if not mail_ids:
+        return
+
+    query = (
+        update(MailOutbox)
+        .filter(MailOutbox.id.in_(mail_ids))
+        .values(status=MailStatus.sent, sent_at=datetime.datetime.now(), last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+
+    await db.execute(query)
+    await db.commit()
+
+
+async def set_mail_failed(mail_id: int, error: str, next_attempt_at: datetime.datetime | None, db: AsyncSession):
+    """
+    Records a failed delivery attempt.
+
+    :param mail_id: The ID of the message.
+    :type mail_id: int
+    :param error: The delivery error.
+    :type error: str
+    :param next_attempt_at: When to retry the delivery, or None to give up on the message.
+    :type next_attempt_at: Optional[datetime.datetime]
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    """
+    values = {"last_error": error}
+
+    if next_attempt_at is None:
+        values["status"] = MailStatus.failed
+    else:
+        values["next_attempt_at"] = next_attempt_at
+
+    query = update(MailOutbox).filter_by(id=mail_id).values(**values).execution_options(synchronize_session=False)
+
+    await db.execute(query)
+    await db.commit()
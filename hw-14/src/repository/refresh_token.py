@@ -0,0 +1,68 @@
+import datetime
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.entity import RefreshTokenFamily
+
+
+async def create_family(family_id: str, user_id, expires_at: datetime.datetime, db: AsyncSession):
+    """
+    Records a new refresh token family.
+
+    :param family_id: The ID of the family, carried by all its tokens.
+    :type family_id: str
+    :param user_id: The ID of the user who signed in.
+    :param expires_at: When the family expires, in UTC.
+    :type expires_at: datetime.datetime
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    :return: The created RefreshTokenFamily database model.
+    :rtype: RefreshTokenFamily
+    """
+    family = RefreshTokenFamily(id=family_id, user_id=user_id, expires_at=expires_at)
+
+    db.add(family)
+    await db.commit()
+
+    return family
+
+
+async def revoke_family(family_id: str, db: AsyncSession):
+    """
+    Revokes a refresh token family, e.g. on sign-out or when a rotated token is reused.
+
+    :param family_id: The ID of the family.
+    :type family_id: str
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    """
+    query = (
+        update(RefreshTokenFamily)
+        .filter(RefreshTokenFamily.id == family_id, RefreshTokenFamily.revoked_at.is_(None))
+        .values(revoked_at=datetime.datetime.utcnow())
+    )
+    await db.execute(query)
+    await db.commit()
+
+
+async def revoke_user_families(user_id, db: AsyncSession) -> list[str]:
+    """
+    Revokes all refresh token families of a user, i.e. signs the user out on every device.
+
+    :param user_id: The ID of the user.
+    :param db: The SQLAlchemy asynchronous database session.
+    :type db: AsyncSession
+    :return: The IDs of the revoked families.
+    :rtype: list[str]
+    """
+    query = (
+        update(RefreshTokenFamily)
+        .filter(RefreshTokenFamily.user_id == user_id, RefreshTokenFamily.revoked_at.is_(None))
+        .values(revoked_at=datetime.datetime.utcnow())
+        .returning(RefreshTokenFamily.id)
+    )
+    family_ids = (await db.execute(query)).scalars().all()
+    await db.commit()
+
+    return list(family_ids)
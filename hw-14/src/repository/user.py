@@ -60,36 +60,6 @@ async def get_user_by_email(email: str, db: AsyncSession):
     return user.scalar_one_or_none()
 
 
-async def set_refresh_token(user: User, refresh_token: str, db: AsyncSession):
-    """
-    Sets the refresh token for a user.
-
-    :param user: The User database model to update.
-    :type user: User
-    :param refresh_token: The refresh token string.
-    :type refresh_token: str
-    :param db: The SQLAlchemy asynchronous database session.
-    :type db: AsyncSession
-    """
-    user.refresh_token = refresh_token
-    await db.commit()
-    await db.refresh(user)
-
-
-async def reset_refresh_token(user: User, db: AsyncSession):
-    """
-    Resets (sets to None) the refresh token for a user.
-
-    :param user: The User database model to update.
-    :type user: User
-    :param db: The SQLAlchemy asynchronous database session.
-    :type db: AsyncSession
-    """
-    user.refresh_token = None
-    await db.commit()
-    await db.refresh(user)
-
-
 async def confirm_user(user: User, db: AsyncSession):
     """
     Confirms a user's account by setting the is_confirmed flag to True.
@@ -1,20 +1,25 @@
 from pathlib import Path
 
-from fastapi import APIRouter, Depends, HTTPException, status, Security, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Security, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from dataclasses import dataclass
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 import src.repository.user as user_repository
 from src.config.constants import APIRoutes, Messages
-from src.database.db import get_db
+from src.database.cache import get_cache
+from src.database.db import SessionRouter, get_db, get_session_router
 from src.schemas.base import SingleResponseSchema
 from src.schemas.user import UserInputSchema, UserSchema, ResetPasswordInputSchema, RequestEmailInputSchema
 from src.schemas.auth import AuthTokenSchema
 from src.services.auth import auth_service
 from src.util.get_response_data import get_response_data
 from src.services.mail import mail_service, EmailTypeEnum
+from src.services.refresh_tokens import refresh_token_store
+from src.services.token_cache import token_cache
+from src.services.user_cache import user_cache
 
 auth_router = APIRouter(prefix=APIRoutes.API_AUTH_ROUTE_PREFIX, tags=["auth"])
 security = HTTPBearer()
@@ -29,19 +34,18 @@ class TokenResponse:
     refresh_token: str
 
 
-def get_token_response(email: str):
+def get_token_response(email: str, refresh_token: str):
     """
-    Generates access and refresh tokens for a given email.
+    Generates an access token for a given email and pairs it with the refresh token.
 
-    :param email: The email address to encode in the tokens.
+    :param email: The email address to encode in the access token.
     :type email: str
-    :return: An object containing the generated access and refresh tokens.
+    :param refresh_token: The refresh token issued by the refresh token store.
+    :type refresh_token: str
+    :return: An object containing the generated access token and the refresh token.
     :rtype: TokenResponse
     """
-    data = {"sub": email}
-
-    access_token = auth_service.create_access_token(data)
-    refresh_token = auth_service.create_refresh_token(data)
+    access_token = auth_service.create_access_token({"sub": email})
 
     return TokenResponse(access_token, refresh_token)
 
@@ -51,14 +55,13 @@ def get_token_response(email: str):
     response_model=SingleResponseSchema[UserSchema],
     status_code=status.HTTP_201_CREATED,
 )
-async def signup(body: UserInputSchema, request: Request, background_tasks: BackgroundTasks,
-                 db: AsyncSession = Depends(get_db)):
+async def signup(body: UserInputSchema, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Registers a new user.
 
     Checks if a user with the given email already exists. If not, creates a new user,
-    hashes the password, generates an email confirmation token, and sends a confirmation email
-    using background tasks.
+    hashes the password, generates an email confirmation token, and queues a confirmation email
+    in the mail outbox.
 
     :param body: The input data for user registration.
     :type body: UserInputSchema
@@ -73,33 +76,36 @@ async def signup(body: UserInputSchema, request: Request, background_tasks: Back
             status_code=status.HTTP_409_CONFLICT, detail=Messages.ACCOUNT_EXIST
         )
 
+    token = auth_service.create_email_token({"sub": body.email})
+    mail_body = {'host': str(request.base_url), 'token': token}
+    # Committed together with the user, so a user is never created without its confirmation email.
+    await mail_service.queue_mail(subject='Confirm registration', email=body.email, body=mail_body,
+                                  email_type=EmailTypeEnum.CONFIRM_EMAIL, db=db, commit=False)
+
     new_user = await user_repository.create_user(
         {
             "email": body.email,
-            "password": auth_service.get_password_hash(body.password),
+            "password": await auth_service.get_password_hash(body.password),
         },
         db,
     )
 
-    token = auth_service.create_email_token({"sub": new_user.email})
-    body = {'host': str(request.base_url), 'token': token}
-    background_tasks.add_task(func=mail_service.send_mail, subject='Confirm registration', email=new_user.email,
-                              body=body, email_type=EmailTypeEnum.CONFIRM_EMAIL)
-
     return get_response_data(new_user, detail="User successfully created. Check your email for confirmation.")
 
 
 @auth_router.post("/signin", response_model=SingleResponseSchema[AuthTokenSchema])
-async def signin(body: UserInputSchema, db: AsyncSession = Depends(get_db)):
+async def signin(body: UserInputSchema, db: AsyncSession = Depends(get_db), cache: Redis = Depends(get_cache)):
     """
     Authenticates a user and provides access and refresh tokens.
 
-    Verifies the user's email and password. If valid and confirmed, generates JWT access and refresh tokens
-    and stores the refresh token in the database.
+    Verifies the user's email and password. If valid and confirmed, generates a JWT access token and starts
+    a new refresh token family, so every device of the user has its own refresh token. A password hashed with
+    outdated bcrypt parameters is rehashed.
 
     :param body: The input data for user sign-in (email and password).
     :type body: UserInputSchema
     :raises HTTPException: 401 Unauthorized if credentials are invalid or user is not confirmed.
+    :raises HTTPException: 503 Service Unavailable if the password hashing queue is full.
     :return: An object containing access and refresh tokens.
     :rtype: SingleResponseSchema[AuthTokenSchema]
     """
@@ -115,16 +121,19 @@ async def signin(body: UserInputSchema, db: AsyncSession = Depends(get_db)):
             status_code=status.HTTP_401_UNAUTHORIZED, detail=Messages.EMAIL_NOT_CONFIRMED
         )
 
-    if not auth_service.verify_password(body.password, user.password):
+    is_valid, new_password_hash = await auth_service.verify_and_update_password(body.password, user.password)
+
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=Messages.INVALID_CREDENTIALS
         )
 
-    token_response = get_token_response(user.email)
+    if new_password_hash is not None:
+        await user_repository.set_password(user, new_password_hash, db)
 
-    await user_repository.set_refresh_token(user, token_response.refresh_token, db)
+    refresh_token = await refresh_token_store.create_family(user, db, cache)
 
-    return get_response_data(token_response)
+    return get_response_data(get_token_response(user.email, refresh_token))
 
 
 @auth_router.post(
@@ -133,36 +142,54 @@ async def signin(body: UserInputSchema, db: AsyncSession = Depends(get_db)):
 async def refresh_token(
         credentials: HTTPAuthorizationCredentials = Security(security),
         db: AsyncSession = Depends(get_db),
+        cache: Redis = Depends(get_cache),
 ):
     """
     Refreshes access and refresh tokens using a valid refresh token.
 
-    Validates the provided refresh token. If valid, generates new access and refresh tokens
-    and updates the refresh token in the database.
+    Validates the provided refresh token and rotates it: the new refresh token replaces it in its family, which
+    is kept in Redis, so a refresh does not write to the database. Reuse of an already rotated refresh token
+    revokes its family and the issued access tokens.
 
-    :raises HTTPException: 401 Unauthorized if the refresh token is invalid or expired.
+    :raises HTTPException: 401 Unauthorized if the refresh token is invalid, expired, revoked or reused.
     :return: An object containing new access and refresh tokens.
     :rtype: SingleResponseSchema[AuthTokenSchema]
     """
-    token = credentials.credentials
-    email = auth_service.decode_refresh_token(token)
-    user = await user_repository.get_user_by_email(email, db)
+    email, new_refresh_token = await refresh_token_store.rotate(credentials.credentials, db, cache)
+    user = await user_cache.get_or_load(email, cache, lambda: user_repository.get_user_by_email(email, db))
 
-    if user is None or user.refresh_token != token:
-        await user_repository.reset_refresh_token(user, db)
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token"
         )
 
-    token_response = get_token_response(user.email)
+    return get_response_data(get_token_response(user.email, new_refresh_token))
+
 
-    await user_repository.set_refresh_token(user, token_response.refresh_token, db)
+@auth_router.post('/logout')
+async def logout(
+        credentials: HTTPAuthorizationCredentials = Security(security),
+        db: AsyncSession = Depends(get_db),
+        cache: Redis = Depends(get_cache),
+):
+    """
+    Signs out the device holding the refresh token by revoking its refresh token family.
+
+    The refresh tokens of the other devices of the user stay valid. Access tokens already issued to the device
+    are not revoked: they stay valid until they expire.
+
+    :raises HTTPException: 401 Unauthorized if the refresh token is invalid or expired.
+    :return: A message indicating successful sign-out.
+    :rtype: SingleResponseSchema[None]
+    """
+    await refresh_token_store.revoke(credentials.credentials, db, cache)
 
-    return get_response_data(token_response)
+    return get_response_data(None, detail="Signed out")
 
 
 @auth_router.get('/confirm-email/{token}')
-async def confirm_email(token: str, db: AsyncSession = Depends(get_db)):
+async def confirm_email(token: str, db: AsyncSession = Depends(get_db), cache: Redis = Depends(get_cache),
+                        session_router: SessionRouter = Depends(get_session_router)):
     """
     Confirms a user's email address using a confirmation token.
 
@@ -185,17 +212,20 @@ async def confirm_email(token: str, db: AsyncSession = Depends(get_db)):
 
     if not user.is_confirmed:
         await user_repository.confirm_user(user, db)
+        # Stick before invalidating, so a concurrent miss cannot cache the old row from the replica.
+        await session_router.stick(user.email, cache)
+        await user_cache.invalidate(user.email, cache)
 
     return get_response_data(None, detail="Email confirmed")
 
 
 @auth_router.post('/request-confirm-email')
-async def request_confirm_email(body: RequestEmailInputSchema, background_tasks: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_db)):
+async def request_confirm_email(body: RequestEmailInputSchema, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Requests a new email confirmation link for a user.
 
     Checks if a user with the given email exists and is not already confirmed. If so, generates a new
-    email confirmation token and sends a confirmation email using background tasks.
+    email confirmation token and queues a confirmation email in the mail outbox.
 
     :param body: The schema containing the user's email.
     :type body: RequestEmailInputSchema
@@ -210,19 +240,19 @@ async def request_confirm_email(body: RequestEmailInputSchema, background_tasks:
     if user:
         token = auth_service.create_email_token({"sub": user.email})
         body = {'host': str(request.base_url), 'token': token}
-        background_tasks.add_task(func=mail_service.send_mail, subject='Confirm registration', email=user.email,
-                                  body=body, email_type=EmailTypeEnum.CONFIRM_EMAIL)
+        await mail_service.queue_mail(subject='Confirm registration', email=user.email, body=body,
+                                      email_type=EmailTypeEnum.CONFIRM_EMAIL, db=db)
 
     return get_response_data(None, detail="Check your email for confirmation.")
 
 
 @auth_router.post('/request-reset-password')
-async def reset_password(body: RequestEmailInputSchema, background_tasks: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_db)):
+async def reset_password(body: RequestEmailInputSchema, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Requests a password reset link for a user.
 
     Checks if a user with the given email exists and is confirmed. If so, generates a password reset token
-    and sends a reset password email using background tasks.
+    and queues a reset password email in the mail outbox.
 
     :param body: The schema containing the user's email.
     :type body: RequestEmailInputSchema
@@ -239,18 +269,21 @@ async def reset_password(body: RequestEmailInputSchema, background_tasks: Backgr
 
     token = auth_service.create_email_token({"sub": user.email})
     body = {'host': str(request.base_url), 'token': token}
-    background_tasks.add_task(func=mail_service.send_mail, subject='Reset password', email=user.email,
-                              body=body, email_type=EmailTypeEnum.RESET_PASSWORD)
+    await mail_service.queue_mail(subject='Reset password', email=user.email, body=body,
+                                  email_type=EmailTypeEnum.RESET_PASSWORD, db=db)
 
     return get_response_data(None, detail="Check your email for resetting password")
 
 
 @auth_router.post('/reset-password/{token}')
-async def reset_password(token: str, body: ResetPasswordInputSchema, db: AsyncSession = Depends(get_db)):
+async def reset_password(token: str, body: ResetPasswordInputSchema, db: AsyncSession = Depends(get_db),
+                         cache: Redis = Depends(get_cache),
+                         session_router: SessionRouter = Depends(get_session_router)):
     """
     Resets the user's password using a reset token.
 
     Validates the password reset token and the new password. If valid and the user is confirmed, updates the user's password.
+    The access tokens issued to the user before the reset are revoked, and the user is signed out on all devices.
 
     :param token: The password reset token from the reset link.
     :type token: str
@@ -268,8 +301,12 @@ async def reset_password(token: str, body: ResetPasswordInputSchema, db: AsyncSe
             status_code=status.HTTP_400_BAD_REQUEST, detail="Verification error"
         )
 
-    hashed_password = auth_service.get_password_hash(body.password)
+    hashed_password = await auth_service.get_password_hash(body.password)
     await user_repository.set_password(user, hashed_password, db)
+    await session_router.stick(user.email, cache)
+    await user_cache.invalidate(user.email, cache)
+    await token_cache.revoke(user.email, cache)
+    await refresh_token_store.revoke_all(user, db, cache)
 
     return get_response_data(None, detail="Your password has been reset")
 
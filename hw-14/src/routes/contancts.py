@@ -1,61 +1,157 @@
-from fastapi import APIRouter, Depends, Path, HTTPException, status, Query
-from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.ext.asyncio import AsyncSession
+import datetime
+
+from fastapi import APIRouter, Depends, Path, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 import src.repository.contact as contact_repository
 from src.config.constants import APIRoutes
-from src.database.db import get_db
+from src.database.cache import get_cache
+from src.database.db import SessionRouter, get_db, get_session_maker, get_session_router
 from src.entity import User
 from src.entity.user import Role
 from src.schemas.base import SingleResponseSchema, ListResponseSchema
-from src.schemas.contacts import ContactSchema, ContactBaseSchema, ContactAdminSchema
+from src.schemas.contacts import ContactSchema, ContactBaseSchema, ContactAdminSchema, ContactUpdateSchema, \
+    BulkImportSchema
+from src.schemas.serializers import contact_response_serializer
 from src.services.access import Access
 from src.services.auth import auth_service
+from src.services.contacts_count import contacts_count_cache
+from src.services.contacts_io import ContactsFormatEnum, media_types, get_format, import_contacts, export_contacts
+from src.services.contacts_response_cache import contacts_response_cache
+from src.services.rate_limiter import rate_limit
+from src.util.cursor import encode_cursor, decode_cursor
 from src.util.get_response_data import get_response_data
+from src.util.is_string import is_string
 
 contacts_router = APIRouter(prefix=APIRoutes.API_CONTACTS_ROUTE_PREFIX, tags=["contacts"])
 is_user_admin = Access([Role.admin])
 
 
+def get_cursor_after_id(cursor: str | None) -> int | None:
+    """
+    Extracts the ID of the last contact of the previous page from a pagination cursor.
+
+    :param cursor: The cursor received in meta.next_cursor, an empty string to start cursor pagination
+        from the first page, or None for offset pagination.
+    :type cursor: str | None
+    :raises HTTPException: 400 Bad Request if the cursor is malformed or tampered with.
+    :return: The ID to continue after, or None.
+    :rtype: int | None
+    """
+    if cursor is None:
+        return None
+
+    if cursor == "":
+        return 0
+
+    data = decode_cursor(cursor)
+
+    if data is None or not isinstance(data.get("id"), int):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+    return data["id"]
+
+
+def get_next_cursor(contacts: list, limit: int, search: str, after_id: int | None) -> str | None:
+    """
+    Builds the cursor of the next page, or None when the current page is the last one.
+
+    Offset pages of a search may be ordered by relevance rather than by ID, so they get no cursor.
+    """
+    if after_id is None and is_string(search):
+        return None
+
+    if not contacts or len(contacts) < limit:
+        return None
+
+    return encode_cursor({"id": contacts[-1].id})
+
+
+async def invalidate_contacts_cache(user_id, cache: Redis, session_router: SessionRouter):
+    """
+    Drops the cached totals and responses of the user's contacts after a write, and keeps the user's contact
+    reads on the primary database until the read replica catches up, so the caches are not refilled with stale
+    contacts. The totals are cached per version of the responses, so a new version drops both.
+    """
+    await session_router.stick(user_id, cache)
+    await contacts_response_cache.invalidate(user_id, cache)
+
+
+async def get_read_db(
+        current_user: User = Depends(auth_service.get_current_user),
+        cache: Redis = Depends(get_cache),
+        router: SessionRouter = Depends(get_session_router),
+):
+    """
+    Yields the request-scoped session for read-only contact queries: on the read replica, unless the current user
+    has written recently.
+    """
+    session_maker = await router.get_read_session_maker(current_user.id, cache)
+
+    async with session_maker() as session:
+        yield session
+
+
 @contacts_router.get("/birthday", response_model=ListResponseSchema[ContactSchema],
-                     dependencies=[Depends(RateLimiter(times=15, seconds=30))])
+                     dependencies=[Depends(rate_limit("contacts_read"))])
 async def get_contacts_birthday(
-        birthday_days: int = Query(description="Number of days"),
+        request: Request,
+        birthday_days: int = Query(description="Number of days", ge=0, le=366),
         current_user: User = Depends(auth_service.get_current_user),
-        db: AsyncSession = Depends(get_db),
+        db: AsyncSession = Depends(get_read_db),
+        cache: Redis = Depends(get_cache),
 ):
     """
     Retrieves contacts with upcoming birthdays for the current user.
 
     Filters contacts whose birthdays fall within the next specified number of days.
+    The response is cached until the user's contacts change or the day changes, and supports ETag / If-None-Match.
 
     :param birthday_days: The number of days from today to check for birthdays.
     :type birthday_days: int
     :return: A list of contacts with upcoming birthdays and their total count.
     :rtype: ListResponseSchema[ContactSchema]
     """
-    contacts = await contact_repository.get_contacts_birthday(
-        birthday_days, current_user.id, db
-    )
+    async def load():
+        contacts = await contact_repository.get_contacts_birthday(
+            birthday_days, current_user.id, db
+        )
+
+        return get_response_data(contacts, total=len(contacts))
 
-    return get_response_data(contacts, total=len(contacts))
+    return await contacts_response_cache.respond(
+        request, current_user.id, cache, load, contact_response_serializer.dump_list,
+        extra=datetime.date.today().isoformat(),
+    )
 
 
 @contacts_router.get("", response_model=ListResponseSchema[ContactSchema],
-                     dependencies=[Depends(RateLimiter(times=15, seconds=30))])
+                     dependencies=[Depends(rate_limit("contacts_read"))])
 async def get_contacts(
+        request: Request,
         search: str = Query(
             description="Search by text in - name, surname, email", default=""
         ),
         offset: int = 0,
         limit: int = 50,
+        cursor: str | None = Query(
+            description="Cursor from meta.next_cursor of the previous page (empty for the first page), replaces offset",
+            default=None
+        ),
         current_user: User = Depends(auth_service.get_current_user),
-        db: AsyncSession = Depends(get_db),
+        db: AsyncSession = Depends(get_read_db),
+        cache: Redis = Depends(get_cache),
 ):
     """
     Retrieves a list of contacts for the current user with pagination and search capabilities.
 
     Allows filtering contacts by name, surname, or email using the search query parameter.
+    The total is cached per user and search string for a short time. The response is cached until the user's
+    contacts change, and supports ETag / If-None-Match.
 
     :param search: Optional search string to filter contacts.
     :type search: str
@@ -63,21 +159,41 @@ async def get_contacts(
     :type offset: int
     :param limit: The maximum number of records to return (for pagination).
     :type limit: int
+    :param cursor: Cursor of the next page returned in meta.next_cursor; when given, offset is ignored.
+    :type cursor: str | None
+    :raises HTTPException: 400 Bad Request if the cursor is invalid.
     :return: A list of contacts with total count for pagination.
     :rtype: ListResponseSchema[ContactSchema]
     """
-    contacts, total = await contact_repository.get_contacts(
-        offset, limit, search, current_user.id, db
-    )
+    after_id = get_cursor_after_id(cursor)
+
+    async def load():
+        # Read before counting, so a total counted before a write is never cached under a version after it.
+        version = await contacts_response_cache.get_version(current_user.id, cache)
+        cached_total = await contacts_count_cache.get(current_user.id, version, search, cache)
+        contacts, total = await contact_repository.get_contacts(
+            offset, limit, search, current_user.id, db, after_id=after_id, with_total=cached_total is None
+        )
+
+        if cached_total is None:
+            await contacts_count_cache.set(current_user.id, version, search, total, cache)
+        else:
+            total = cached_total
 
-    return get_response_data(contacts, total=total)
+        next_cursor = get_next_cursor(contacts, limit, search, after_id)
+
+        return get_response_data(contacts, total=total, next_cursor=next_cursor)
+
+    return await contacts_response_cache.respond(
+        request, current_user.id, cache, load, contact_response_serializer.dump_list
+    )
 
 
 @contacts_router.get(
     "/all",
     response_model=ListResponseSchema[ContactAdminSchema],
     dependencies=[Depends(auth_service.get_current_user), Depends(is_user_admin),
-                  Depends(RateLimiter(times=15, seconds=30))],
+                  Depends(rate_limit("contacts_read"))],
 )
 async def get_contacts_all(
         search: str = Query(
@@ -85,7 +201,16 @@ async def get_contacts_all(
         ),
         offset: int = 0,
         limit: int = 50,
-        db: AsyncSession = Depends(get_db),
+        cursor: str | None = Query(
+            description="Cursor from meta.next_cursor of the previous page (empty for the first page), replaces offset",
+            default=None
+        ),
+        estimate_total: bool = Query(
+            description="Return the planner estimate of the table size in meta.total_estimate instead of "
+                        "counting the contacts (PostgreSQL only, ignores the search)",
+            default=False
+        ),
+        db: AsyncSession = Depends(get_read_db),
 ):
     """
     Retrieves a list of all contacts (admin access required) with pagination and search capabilities.
@@ -99,52 +224,94 @@ async def get_contacts_all(
     :type offset: int
     :param limit: The maximum number of records to return (for pagination).
     :type limit: int
+    :param cursor: Cursor of the next page returned in meta.next_cursor; when given, offset is ignored.
+    :type cursor: str | None
+    :param estimate_total: Whether to skip the exact count and return the estimated table size instead.
+    :type estimate_total: bool
+    :raises HTTPException: 400 Bad Request if the cursor is invalid.
     :return: A list of all contacts with total count for pagination.
     :rtype: ListResponseSchema[ContactAdminSchema]
     """
+    after_id = get_cursor_after_id(cursor)
+    total_estimate = await contact_repository.estimate_contacts_total(db) if estimate_total else None
     contacts, total = await contact_repository.get_contacts(
-        offset, limit, search, None, db
+        offset, limit, search, None, db, after_id=after_id, with_total=total_estimate is None, with_user=True
     )
+    next_cursor = get_next_cursor(contacts, limit, search, after_id)
+
+    return get_response_data(contacts, total=total, next_cursor=next_cursor, total_estimate=total_estimate)
+
+
+@contacts_router.get("/export", dependencies=[Depends(rate_limit("contacts_io"))])
+async def export_contacts_file(
+        contacts_format: ContactsFormatEnum = Query(alias="format", default=ContactsFormatEnum.NDJSON),
+        current_user: User = Depends(auth_service.get_current_user),
+        session_maker: async_sessionmaker = Depends(get_session_maker),
+):
+    """
+    Exports all contacts of the current user as NDJSON or CSV.
+
+    The contacts are streamed from a server-side cursor, so they are never all loaded into memory.
 
-    return get_response_data(contacts, total=total)
+    :param contacts_format: The export format, ``ndjson`` or ``csv``.
+    :type contacts_format: ContactsFormatEnum
+    :return: The streamed file.
+    :rtype: StreamingResponse
+    """
+    return StreamingResponse(
+        export_contacts(current_user.id, contacts_format, session_maker),
+        media_type=media_types[contacts_format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{contacts_format.value}"'},
+    )
 
 
 @contacts_router.get(
     "/{contact_id}", response_model=SingleResponseSchema[ContactSchema],
-    dependencies=[Depends(RateLimiter(times=15, seconds=30))]
+    dependencies=[Depends(rate_limit("contacts_read"))]
 )
 async def get_contact(
+        request: Request,
         contact_id: int = Path(description="id of the contact", gt=0),
         current_user: User = Depends(auth_service.get_current_user),
-        db: AsyncSession = Depends(get_db),
+        db: AsyncSession = Depends(get_read_db),
+        cache: Redis = Depends(get_cache),
 ):
     """
     Retrieves a single contact by its ID for the current user.
 
+    The response is cached until the user's contacts change, and supports ETag / If-None-Match.
+
     :param contact_id: The ID of the contact to retrieve.
     :type contact_id: int
     :raises HTTPException: 404 Not Found if the contact is not found or does not belong to the user.
     :return: The requested contact data.
     :rtype: SingleResponseSchema[ContactSchema]
     """
-    contact = await contact_repository.get_contact(contact_id, current_user.id, db)
+    async def load():
+        contact = await contact_repository.get_contact(contact_id, current_user.id, db)
 
-    if contact is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Contact is not found"
-        )
+        if contact is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Contact is not found"
+            )
 
-    return get_response_data(contact)
+        return get_response_data(contact)
+
+    return await contacts_response_cache.respond(
+        request, current_user.id, cache, load, contact_response_serializer.dump_single
+    )
 
 
 @contacts_router.post(
     "", response_model=SingleResponseSchema[ContactSchema], status_code=status.HTTP_201_CREATED,
-    dependencies=[Depends(RateLimiter(times=15, seconds=30))]
+    dependencies=[Depends(rate_limit("contacts_write"))]
 )
 async def create_contact(
         body: ContactBaseSchema,
         current_user: User = Depends(auth_service.get_current_user),
         db: AsyncSession = Depends(get_db),
+        cache: Redis = Depends(get_cache),
+        session_router: SessionRouter = Depends(get_session_router),
 ):
     """
     Creates a new contact for the current user.
@@ -155,23 +322,66 @@ async def create_contact(
     :rtype: ContactSchema
     """
     new_contact = await contact_repository.create_contact(body, current_user.id, db)
+    await invalidate_contacts_cache(current_user.id, cache, session_router)
 
     return get_response_data(new_contact)
 
 
+@contacts_router.post(
+    "/bulk", response_model=SingleResponseSchema[BulkImportSchema], status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("contacts_io"))]
+)
+async def create_contacts_bulk(
+        request: Request,
+        current_user: User = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db),
+        cache: Redis = Depends(get_cache),
+        session_router: SessionRouter = Depends(get_session_router),
+):
+    """
+    Creates contacts for the current user from a NDJSON (application/x-ndjson) or CSV (text/csv) request body.
+
+    The body is read as a stream and validated line by line; valid contacts are inserted in batches,
+    invalid lines are skipped and reported with their line numbers.
+
+    :raises HTTPException: 415 Unsupported Media Type if the body is neither NDJSON nor CSV, 413 Request Entity
+        Too Large if a line exceeds CONTACTS_IMPORT_MAX_LINE_LENGTH; the batches inserted before it are kept.
+    :return: The number of created contacts and the errors of the skipped lines.
+    :rtype: SingleResponseSchema[BulkImportSchema]
+    """
+    contacts_format = get_format(request.headers.get("content-type"))
+
+    if contacts_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Content-Type must be application/x-ndjson or text/csv",
+        )
+
+    try:
+        result = await import_contacts(request.stream(), contacts_format, current_user.id, db)
+    finally:
+        await invalidate_contacts_cache(current_user.id, cache, session_router)
+
+    return get_response_data(result, detail=f"{result['created']} contacts created")
+
+
 @contacts_router.patch("/{contact_id}", response_model=SingleResponseSchema[ContactSchema],
-                       dependencies=[Depends(RateLimiter(times=15, seconds=30))])
+                       dependencies=[Depends(rate_limit("contacts_write"))])
 async def updated_contact(
-        body: ContactBaseSchema,
+        body: ContactUpdateSchema,
         contact_id: int = Path(description="id of the contact", gt=0),
         current_user: User = Depends(auth_service.get_current_user),
         db: AsyncSession = Depends(get_db),
+        cache: Redis = Depends(get_cache),
+        session_router: SessionRouter = Depends(get_session_router),
 ):
     """
     Updates an existing contact for the current user.
 
+    Only the fields present in the body are changed.
+
     :param body: The updated data for the contact.
-    :type body: ContactBaseSchema
+    :type body: ContactUpdateSchema
     :param contact_id: The ID of the contact to update.
     :type contact_id: int
     :raises HTTPException: 404 Not Found if the contact is not found or does not belong to the user.
@@ -187,15 +397,19 @@ async def updated_contact(
             status_code=status.HTTP_404_NOT_FOUND, detail="Contact is not found"
         )
 
+    await invalidate_contacts_cache(current_user.id, cache, session_router)
+
     return get_response_data(contact)
 
 
 @contacts_router.delete("/{contact_id}", response_model=SingleResponseSchema[ContactSchema],
-                        dependencies=[Depends(RateLimiter(times=15, seconds=30))])
+                        dependencies=[Depends(rate_limit("contacts_write"))])
 async def delete_contact(
         contact_id: int = Path(description="id of the contact", gt=0),
         current_user: User = Depends(auth_service.get_current_user),
         db: AsyncSession = Depends(get_db),
+        cache: Redis = Depends(get_cache),
+        session_router: SessionRouter = Depends(get_session_router),
 ):
     """
     Deletes a contact for the current user (soft delete).
@@ -215,4 +429,40 @@ async def delete_contact(
             status_code=status.HTTP_404_NOT_FOUND, detail="Contact is not found"
         )
 
+    await invalidate_contacts_cache(current_user.id, cache, session_router)
+
+    return get_response_data(contact)
+
+
+@contacts_router.post(
+    "/{contact_id}/restore", response_model=SingleResponseSchema[ContactSchema],
+    dependencies=[Depends(auth_service.get_current_user), Depends(is_user_admin),
+                  Depends(rate_limit("contacts_write"))],
+)
+async def restore_contact(
+        contact_id: int = Path(description="id of the contact", gt=0),
+        db: AsyncSession = Depends(get_db),
+        cache: Redis = Depends(get_cache),
+        session_router: SessionRouter = Depends(get_session_router),
+):
+    """
+    Restores a deleted contact of any user (admin access required).
+
+    Both soft-deleted contacts and contacts already moved to the archive are restored.
+
+    :param contact_id: The ID of the contact to restore.
+    :type contact_id: int
+    :raises HTTPException: 404 Not Found if there is no deleted contact with this ID.
+    :return: The restored contact data.
+    :rtype: ContactSchema
+    """
+    contact = await contact_repository.restore_contact(contact_id, db)
+
+    if contact is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Deleted contact is not found"
+        )
+
+    await invalidate_contacts_cache(contact.user_id, cache, session_router)
+
     return get_response_data(contact)
@@ -6,6 +6,8 @@ DataType = TypeVar("DataType")
 
 class MetaSchema(BaseModel):
     total: int | None
+    next_cursor: str | None = None
+    total_estimate: int | None = None
 
 
 class SingleResponseSchema(BaseModel, Generic[DataType]):
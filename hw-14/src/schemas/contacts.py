@@ -8,12 +8,22 @@ from src.schemas.user import UserSchema
 class ContactBaseSchema(BaseModel):
     name: str = Field(max_length=50)
     surname: str = Field(max_length=50)
-    email: str = EmailStr()
+    email: EmailStr
     phone: str
     birthday: date
 
 
+class ContactUpdateSchema(BaseModel):
+    name: str | None = Field(default=None, max_length=50)
+    surname: str | None = Field(default=None, max_length=50)
+    email: EmailStr | None = None
+    phone: str | None = None
+    birthday: date | None = None
+
+
 class ContactSchema(ContactBaseSchema):
+    # Rows stored before the emails were validated are still returned.
+    email: str
     id: int
     created_at: datetime = None
     updated_at: datetime = None
@@ -27,3 +37,13 @@ class ContactAdminSchema(ContactSchema):
 
     class Config:
         from_attributes = True
+
+
+class BulkImportErrorSchema(BaseModel):
+    line: int
+    detail: str
+
+
+class BulkImportSchema(BaseModel):
+    created: int
+    errors: list[BulkImportErrorSchema]
@@ -1,31 +1,34 @@
-import pickle
 from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.ext.asyncio import AsyncSession
+from redis.asyncio import Redis
 from starlette import status
 
 import src.repository.user as user_repository
 from src.config.config import config
 from src.database.cache import get_cache
-from src.database.db import get_db
+from src.database.db import SessionRouter, get_session_router
+from src.services.password import password_hasher
+from src.services.token_cache import token_cache
+from src.services.user_cache import user_cache
 
 
 class Auth:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
     SECRET_KEY = config.JWT_SECRET_KEY
     ALGORITHM = config.JWT_ALGORITHM
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/signin")
 
-    def verify_password(self, plain_password, hashed_password):
-        return self.pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password, hashed_password):
+        return await password_hasher.verify(plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
-        return self.pwd_context.hash(password)
+    async def verify_and_update_password(self, plain_password, hashed_password):
+        return await password_hasher.verify_and_update(plain_password, hashed_password)
+
+    async def get_password_hash(self, password: str):
+        return await password_hasher.hash(password)
 
     # define a function to generate a new access token
     def create_access_token(self, data: dict, expires_delta_seconds: Optional[float] = None):
@@ -66,14 +69,13 @@ class Auth:
 
         return jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
 
-    def decode_refresh_token(self, refresh_token: str):
+    def decode_refresh_token(self, refresh_token: str) -> dict:
         try:
             payload = jwt.decode(
                 refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM]
             )
             if payload["scope"] == "refresh_token":
-                email = payload["sub"]
-                return email
+                return payload
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid scope for token",
@@ -85,7 +87,10 @@ class Auth:
             )
 
     async def get_current_user(
-        self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+        self,
+        token: str = Depends(oauth2_scheme),
+        session_router: SessionRouter = Depends(get_session_router),
+        cache: Redis = Depends(get_cache),
     ):
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -93,35 +98,39 @@ class Auth:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-        try:
-            # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+        email = token_cache.get(token)
 
-            if payload["scope"] == "access_token":
-                email = payload["sub"]
-                if email is None:
+        if email is None:
+            try:
+                # Decode JWT
+                payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+
+                if payload["scope"] == "access_token":
+                    email = payload["sub"]
+                    if email is None:
+                        raise credentials_exception
+                else:
                     raise credentials_exception
-            else:
+            except JWTError:
+                raise credentials_exception
+
+            if await token_cache.is_revoked(email, payload["iat"], cache):
                 raise credentials_exception
-        except JWTError:
-            raise credentials_exception
 
-        cache = get_cache()
+            token_cache.set(token, email, payload["exp"])
 
-        cached_user = await cache.get(email)
+        async def load_user():
+            # Only a cache miss opens a session: on the read replica, unless the user has just been changed.
+            session_maker = await session_router.get_read_session_maker(email, cache)
 
-        if cached_user:
-            print(pickle.loads(cached_user).avatar)
-            return pickle.loads(cached_user);
+            async with session_maker() as session:
+                return await user_repository.get_user_by_email(email, session)
 
-        user = await user_repository.get_user_by_email(email, db)
+        user = await user_cache.get_or_load(email, cache, load_user)
 
         if user is None:
             raise credentials_exception
 
-        await cache.set(email, pickle.dumps(user))
-        await cache.expire(email, 300)
-
         return user
 
     def get_email_from_token(self, token: str):
@@ -0,0 +1,54 @@
+import asyncio
+import hashlib
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile
+from starlette import status
+
+from src.config.config import config
+from src.services.storage import AvatarStorage
+
+
+class Avatar:
+    CHUNK_SIZE = 64 * 1024
+
+    @classmethod
+    def get_content_hash(cls, file: BinaryIO) -> str:
+        digest = hashlib.sha256()
+
+        file.seek(0)
+        while chunk := file.read(cls.CHUNK_SIZE):
+            digest.update(chunk)
+        file.seek(0)
+
+        return digest.hexdigest()
+
+    async def upload(self, file: UploadFile, storage: AvatarStorage) -> str:
+        """
+        Stores an avatar image and returns its URL.
+
+        Images are stored under the hash of their content, so uploading an image that is already stored is
+        skipped. Hashing and the blocking storage calls run in worker threads, off the event loop.
+
+        :param file: The uploaded image.
+        :type file: UploadFile
+        :param storage: The storage backend.
+        :type storage: AvatarStorage
+        :raises HTTPException: 413 Request Entity Too Large if the image exceeds AVATAR_MAX_SIZE.
+        :return: The URL of the avatar.
+        :rtype: str
+        """
+        if file.size is not None and file.size > config.AVATAR_MAX_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Avatar image is too large"
+            )
+
+        key = f'avatars/{await asyncio.to_thread(self.get_content_hash, file.file)}'
+
+        if not await asyncio.to_thread(storage.exists, key):
+            await asyncio.to_thread(storage.save, key, file.file)
+
+        return storage.get_url(key)
+
+
+avatar_service = Avatar()
@@ -0,0 +1,107 @@
+"""
+Moves contacts soft-deleted longer than CONTACTS_ARCHIVE_RETENTION_DAYS from the contacts table into
+contacts_archive, so the live table and its scans do not keep growing with deleted rows.
+
+The job runs inside the application when CONTACTS_ARCHIVE_EMBEDDED is set, or as a separate process::
+
+    python -m src.services.contacts_archiver          # runs until stopped
+    python -m src.services.contacts_archiver --once   # a single pass, e.g. from cron
+"""
+import argparse
+import asyncio
+import datetime
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import src.repository.contact as contact_repository
+from src.config.config import config
+from src.database.db import DBSession
+
+
+class ContactsArchiver:
+    """
+    Archives deleted contacts in bounded batches, each in its own short transaction, pausing between batches
+    so the job never holds many row locks or saturates the database.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self.session_maker = session_maker
+        self.runs = 0
+        self.batches = 0
+        self.archived_total = 0
+        self.last_run_archived = 0
+        self.last_run_at: datetime.datetime | None = None
+        self.last_run_duration = 0.0
+        self.running = False
+
+    async def archive(self) -> int:
+        """
+        Archives all contacts past the retention period, batch by batch.
+
+        :return: The number of archived contacts.
+        :rtype: int
+        """
+        deleted_before = datetime.datetime.utcnow() - datetime.timedelta(days=config.CONTACTS_ARCHIVE_RETENTION_DAYS)
+        started_at = time.perf_counter()
+        archived = 0
+        self.running = True
+        self.last_run_archived = 0
+
+        try:
+            while True:
+                async with self.session_maker() as session:
+                    count = await contact_repository.archive_contacts(
+                        deleted_before, config.CONTACTS_ARCHIVE_BATCH_SIZE, session
+                    )
+
+                archived += count
+                self.batches += count > 0
+                self.archived_total += count
+                self.last_run_archived = archived
+
+                if count < config.CONTACTS_ARCHIVE_BATCH_SIZE:
+                    return archived
+
+                await asyncio.sleep(config.CONTACTS_ARCHIVE_BATCH_PAUSE)
+        finally:
+            self.running = False
+            self.runs += 1
+            self.last_run_at = datetime.datetime.now()
+            self.last_run_duration = time.perf_counter() - started_at
+
+    async def run(self):
+        """
+        Archives deleted contacts every CONTACTS_ARCHIVE_INTERVAL seconds until cancelled.
+        """
+        while True:
+            try:
+                await self.archive()
+            except Exception as error:
+                print(error)
+
+            await asyncio.sleep(config.CONTACTS_ARCHIVE_INTERVAL)
+
+    def get_stats(self) -> dict:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "batches": self.batches,
+            "archived_total": self.archived_total,
+            "last_run_archived": self.last_run_archived,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_run_duration_ms": round(self.last_run_duration * 1000, 3),
+        }
+
+
+contacts_archiver = ContactsArchiver(DBSession)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+
+    if parser.parse_args().once:
+        print(f"Archived {asyncio.run(contacts_archiver.archive())} contacts")
+    else:
+        asyncio.run(contacts_archiver.run())
@@ -0,0 +1,34 @@
+from redis.asyncio import Redis
+
+from src.config.config import config
+from src.services.metrics import metrics
+
+
+class ContactsCountCache:
+    """
+    Caches the total number of a user's contacts per search string.
+
+    All totals of a user live in one Redis hash per version of the user's contacts (see ContactsResponseCache),
+    so a write moves the user to a new hash, and a total counted before the write can not end up in a response
+    cached after it. The hash expires a short time after its first total is stored, which bounds how stale
+    a total can get.
+    """
+
+    @staticmethod
+    def get_key(user_id, version: str) -> str:
+        return f"contacts:count:{user_id}:{version}"
+
+    async def get(self, user_id, version: str, search: str, cache: Redis) -> int | None:
+        total = await cache.hget(self.get_key(user_id, version), search)
+        metrics.record_cache("contacts_count", total is not None)
+
+        return int(total) if total is not None else None
+
+    async def set(self, user_id, version: str, search: str, total: int, cache: Redis):
+        key = self.get_key(user_id, version)
+
+        await cache.hset(key, search, total)
+        await cache.expire(key, config.CONTACTS_COUNT_CACHE_TTL, nx=True)
+
+
+contacts_count_cache = ContactsCountCache()
@@ -0,0 +1,188 @@
+import csv
+import io
+import json
+from enum import Enum
+from typing import AsyncIterator
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import src.repository.contact as contact_repository
+from src.config.config import config
+from src.schemas.contacts import ContactBaseSchema, ContactSchema
+
+
+class ContactsFormatEnum(str, Enum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
+media_types = {
+    ContactsFormatEnum.NDJSON: 'application/x-ndjson',
+    ContactsFormatEnum.CSV: 'text/csv',
+}
+
+CSV_FIELDS = list(ContactSchema.model_fields)
+MAX_REPORTED_ERRORS = 100
+EXPORT_CHUNK_SIZE = 500
+
+
+def get_format(content_type: str | None) -> ContactsFormatEnum | None:
+    """
+    Detects the import format from the Content-Type header of the request.
+    """
+    media_type = (content_type or '').split(';')[0].strip().lower()
+
+    for contacts_format, format_media_type in media_types.items():
+        if media_type == format_media_type:
+            return contacts_format
+
+    return None
+
+
+def get_line_too_long_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Lines must not be longer than {config.CONTACTS_IMPORT_MAX_LINE_LENGTH} bytes",
+    )
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Splits a stream of byte chunks into lines without reading the whole stream into memory.
+
+    :raises HTTPException: 413 Request Entity Too Large if a line exceeds CONTACTS_IMPORT_MAX_LINE_LENGTH.
+    """
+    max_line_length = config.CONTACTS_IMPORT_MAX_LINE_LENGTH
+    buffer = b''
+
+    async for chunk in stream:
+        # Only the new chunk is split, the buffer holds no line break.
+        *lines, rest = chunk.split(b'\n')
+
+        if lines:
+            lines[0] = buffer + lines[0]
+            buffer = rest
+        else:
+            buffer += rest
+
+        for line in lines:
+            if len(line) > max_line_length:
+                raise get_line_too_long_exception()
+
+            yield line.decode(errors='replace').rstrip('\r')
+
+        if len(buffer) > max_line_length:
+            raise get_line_too_long_exception()
+
+    if buffer:
+        yield buffer.decode(errors='replace').rstrip('\r')
+
+
+async def parse_contacts(
+        stream: AsyncIterator[bytes], contacts_format: ContactsFormatEnum
+) -> AsyncIterator[tuple[int, ContactBaseSchema | None, str | None]]:
+    """
+    Parses and validates contacts from a NDJSON or CSV stream, one line at a time.
+
+    CSV input must start with a header row; quoted values spanning several lines are not supported.
+
+    :return: An asynchronous iterator of (line number, contact, error) tuples, where either the contact or
+        the error is None. Empty lines are skipped.
+    """
+    header = None
+    line_number = 0
+
+    async for line in iter_lines(stream):
+        line_number += 1
+
+        if not line.strip():
+            continue
+
+        try:
+            if contacts_format == ContactsFormatEnum.CSV:
+                values = next(csv.reader([line]))
+
+                if header is None:
+                    header = [value.strip() for value in values]
+                    continue
+
+                data = dict(zip(header, values))
+            else:
+                data = json.loads(line)
+
+            yield line_number, ContactBaseSchema.model_validate(data), None
+        except ValidationError as error:
+            yield line_number, None, '; '.join(
+                f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+            )
+        except ValueError as error:
+            yield line_number, None, str(error)
+
+
+async def import_contacts(
+        stream: AsyncIterator[bytes], contacts_format: ContactsFormatEnum, user_id: str, db: AsyncSession
+) -> dict:
+    """
+    Imports contacts from a stream, inserting valid ones in batches and collecting the errors of invalid ones.
+
+    :return: The number of created contacts and the first MAX_REPORTED_ERRORS errors.
+    :rtype: dict
+    """
+    created = 0
+    errors = []
+    batch = []
+
+    async for line, contact, error in parse_contacts(stream, contacts_format):
+        if error is not None:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'line': line, 'detail': error})
+            continue
+
+        batch.append(contact)
+
+        if len(batch) >= config.CONTACTS_BULK_BATCH_SIZE:
+            created += len(await contact_repository.create_contacts(batch, user_id, db))
+            batch = []
+
+    created += len(await contact_repository.create_contacts(batch, user_id, db))
+
+    return {'created': created, 'errors': errors}
+
+
+def serialize_contacts(contacts: list, contacts_format: ContactsFormatEnum) -> str:
+    if contacts_format == ContactsFormatEnum.CSV:
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator='\n')
+        for contact in contacts:
+            writer.writerow(ContactSchema.model_validate(contact).model_dump(mode='json').values())
+        return output.getvalue()
+
+    return ''.join(ContactSchema.model_validate(contact).model_dump_json() + '\n' for contact in contacts)
+
+
+async def export_contacts(
+        user_id: str, contacts_format: ContactsFormatEnum, session_maker: async_sessionmaker
+) -> AsyncIterator[str]:
+    """
+    Streams all contacts of a user as NDJSON or CSV, reading them through a server-side cursor.
+
+    A separate session is opened because the response body is produced after the request-scoped
+    session has already been closed.
+    """
+    if contacts_format == ContactsFormatEnum.CSV:
+        yield ','.join(CSV_FIELDS) + '\n'
+
+    async with session_maker() as session:
+        chunk = []
+
+        async for contact in contact_repository.stream_contacts(user_id, session):
+            chunk.append(contact)
+
+            if len(chunk) >= EXPORT_CHUNK_SIZE:
+                yield serialize_contacts(chunk, contacts_format)
+                chunk = []
+
+        if chunk:
+            yield serialize_contacts(chunk, contacts_format)
@@ -0,0 +1,108 @@
+import hashlib
+import uuid
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+from redis.asyncio import Redis
+from starlette import status
+
+from src.config.config import config
+from src.services.metrics import metrics
+
+
+class ContactsResponseCache:
+    """
+    Caches the serialized responses of a user's contact reads and answers conditional requests.
+
+    Cache keys include a per-user version that is replaced with a random one on every write, so a write invalidates
+    all cached responses of the user with a single SET; entries of older versions are left to expire. The version
+    expires too, but only after every response cached under it: a user without a version gets version 0, which
+    is never set by a write. Every response
+    carries an ETag derived from its body, and a request whose If-None-Match matches it gets an empty 304.
+    """
+
+    CACHE_CONTROL = "private, no-cache"
+
+    @staticmethod
+    def get_version_key(user_id) -> str:
+        return f"contacts:version:{user_id}"
+
+    @staticmethod
+    def get_key(user_id, version: str, request: Request, extra: str = "") -> str:
+        params = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+        digest = hashlib.sha1(f"{request.url.path}?{params}#{extra}".encode()).hexdigest()
+
+        return f"contacts:response:{user_id}:{version}:{digest}"
+
+    @staticmethod
+    def get_etag(body: bytes) -> bytes:
+        return b'"' + hashlib.sha1(body).hexdigest().encode() + b'"'
+
+    @staticmethod
+    def is_not_modified(request: Request, etag: bytes) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+
+        if not if_none_match:
+            return False
+
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+
+        return "*" in tags or etag.decode() in tags
+
+    async def get_version(self, user_id, cache: Redis) -> str:
+        version = await cache.get(self.get_version_key(user_id))
+
+        return version.decode() if version is not None else "0"
+
+    async def respond(
+            self,
+            request: Request,
+            user_id,
+            cache: Redis,
+            load: Callable[[], Awaitable[dict]],
+            serialize: Callable[[dict], bytes],
+            extra: str = "",
+    ) -> Response:
+        """
+        Returns the cached response for the request, loading and caching it on a miss.
+
+        :param request: The incoming request; its path and query parameters are part of the cache key.
+        :type request: Request
+        :param user_id: The ID of the user the response belongs to.
+        :param cache: The Redis client.
+        :type cache: Redis
+        :param load: Loads the response data on a cache miss.
+        :type load: Callable[[], Awaitable[dict]]
+        :param serialize: Serializes the loaded response data into JSON.
+        :type serialize: Callable[[dict], bytes]
+        :param extra: Additional input the response depends on, e.g. the current date.
+        :type extra: str
+        :return: The JSON response, or an empty 304 response if the client already has it.
+        :rtype: Response
+        """
+        key = self.get_key(user_id, await self.get_version(user_id, cache), request, extra)
+        entry = await cache.get(key)
+        metrics.record_cache("contacts_response", entry is not None)
+
+        if entry is not None:
+            etag, body = entry.split(b"\n", 1)
+        else:
+            body = serialize(await load())
+            etag = self.get_etag(body)
+            await cache.set(key, etag + b"\n" + body, ex=config.CONTACTS_RESPONSE_CACHE_TTL)
+
+        headers = {"ETag": etag.decode(), "Cache-Control": self.CACHE_CONTROL}
+
+        if self.is_not_modified(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def invalidate(self, user_id, cache: Redis):
+        # Twice the response TTL: by the time the user is back at version 0, the responses cached under version 0
+        # before the write, also by requests that were still running, have expired.
+        version_ttl = 2 * config.CONTACTS_RESPONSE_CACHE_TTL
+        await cache.set(self.get_version_key(user_id), uuid.uuid4().hex, ex=version_ttl)
+
+
+contacts_response_cache = ContactsResponseCache()
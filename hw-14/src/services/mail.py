@@ -1,9 +1,15 @@
-from fastapi_mail import FastMail, MessageSchema, MessageType
-from pydantic import EmailStr
-from pathlib import Path
-from fastapi_mail import ConnectionConfig
+from email.message import EmailMessage
+from email.utils import formataddr
 from enum import Enum
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from pydantic import EmailStr
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import src.repository.mail as mail_repository
 from src.config.config import config
+from src.entity import MailOutbox
 
 
 class EmailTypeEnum(str, Enum):
@@ -16,37 +22,67 @@ email_templates = {
     EmailTypeEnum.RESET_PASSWORD: 'reset_password_email.html',
 }
 
-mail_config = ConnectionConfig(
-    MAIL_USERNAME=config.MAIL_USERNAME,
-    MAIL_PASSWORD=config.MAIL_PASSWORD,
-    MAIL_FROM=config.MAIL_USERNAME,
-    MAIL_PORT=config.MAIL_PORT,
-    MAIL_SERVER=config.MAIL_SERVER,
-    MAIL_FROM_NAME="FASTAPI Application",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=False,
-    TEMPLATE_FOLDER=Path(__file__).parent.parent / 'templates' / 'emails',
+MAIL_FROM_NAME = "FASTAPI Application"
+
+# Templates are compiled once and kept in memory; they are not checked for changes on disk.
+templates = Environment(
+    loader=FileSystemLoader(Path(__file__).parent.parent / 'templates' / 'emails'),
+    autoescape=select_autoescape(),
+    auto_reload=False,
 )
 
 
 class Mail:
     @staticmethod
-    async def send_mail(subject: str, email: EmailStr, body: dict, email_type: EmailTypeEnum):
-        try:
-            message = MessageSchema(
-                subject=subject,
-                recipients=[email],
-                template_body=body,
-                subtype=MessageType.html
-            )
+    async def queue_mail(subject: str, email: EmailStr, body: dict, email_type: EmailTypeEnum, db: AsyncSession,
+                         commit: bool = True):
+        """
+        Stores a message in the mail outbox. It is delivered by the mail worker, so it survives restarts and
+        is retried if the SMTP server is unavailable.
+
+        :param subject: The subject of the message.
+        :type subject: str
+        :param email: The recipient email address.
+        :type email: EmailStr
+        :param body: The variables of the message template.
+        :type body: dict
+        :param email_type: The kind of the message, which defines its template.
+        :type email_type: EmailTypeEnum
+        :param db: The SQLAlchemy asynchronous database session.
+        :type db: AsyncSession
+        :param commit: Whether to commit; pass False to write the message in the transaction of the caller.
+        :type commit: bool
+        :return: The queued MailOutbox database model.
+        :rtype: MailOutbox
+        """
+        return await mail_repository.create_mail(
+            {'recipient': email, 'subject': subject, 'template': email_type.value, 'body': body}, db, commit
+        )
+
+    @staticmethod
+    def compile_templates():
+        for template_name in email_templates.values():
+            templates.get_template(template_name)
+
+    @staticmethod
+    def render_message(mail: MailOutbox) -> EmailMessage:
+        """
+        Builds the email message of a queued mail from its template.
+
+        :param mail: The queued mail.
+        :type mail: MailOutbox
+        :return: The message ready to be sent.
+        :rtype: EmailMessage
+        """
+        template = templates.get_template(email_templates[EmailTypeEnum(mail.template)])
 
-            fm = FastMail(mail_config)
+        message = EmailMessage()
+        message['From'] = formataddr((MAIL_FROM_NAME, config.MAIL_USERNAME))
+        message['To'] = mail.recipient
+        message['Subject'] = mail.subject
+        message.set_content(template.render(**mail.body), subtype='html')
 
-            await fm.send_message(message, template_name=email_templates[email_type])
-        except ConnectionError as error:
-            print(error)
+        return message
 
 
-mail_service = Mail()
\ No newline at end of file
+mail_service = Mail()
@@ -0,0 +1,143 @@
+"""
+Delivers the messages of the mail outbox.
+
+The worker runs inside the application when MAIL_WORKER_EMBEDDED is set, or as a separate process::
+
+    python -m src.services.mail_worker
+
+For local development and tests it can be pointed to an SMTP stand-in, e.g. aiosmtpd::
+
+    python -m aiosmtpd -n -l localhost:8025
+    MAIL_SERVER=localhost MAIL_PORT=8025 MAIL_SSL_TLS=false MAIL_USE_CREDENTIALS=false \
+        python -m src.services.mail_worker
+"""
+import asyncio
+import datetime
+
+from aiosmtplib import SMTP, SMTPException, SMTPServerDisconnected
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import src.repository.mail as mail_repository
+from src.config.config import config
+from src.database.db import DBSession
+from src.services.mail import mail_service
+
+
+class MailWorker:
+    """
+    Sends queued messages in batches over a single SMTP connection, which is kept open until the outbox is
+    empty. Failed messages are retried with exponential backoff until MAIL_MAX_ATTEMPTS is reached.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self.session_maker = session_maker
+        self.smtp: SMTP | None = None
+
+    @staticmethod
+    def get_retry_delay(attempts: int) -> float:
+        return min(config.MAIL_RETRY_BASE_DELAY * 2 ** (attempts - 1), config.MAIL_RETRY_MAX_DELAY)
+
+    async def connect(self) -> SMTP:
+        if self.smtp is None or not self.smtp.is_connected:
+            credentials = {}
+
+            if config.MAIL_USE_CREDENTIALS:
+                credentials = {'username': config.MAIL_USERNAME, 'password': config.MAIL_PASSWORD}
+
+            self.smtp = SMTP(
+                hostname=config.MAIL_SERVER,
+                port=config.MAIL_PORT,
+                use_tls=config.MAIL_SSL_TLS,
+                start_tls=config.MAIL_STARTTLS,
+                validate_certs=config.MAIL_VALIDATE_CERTS,
+                **credentials,
+            )
+            await self.smtp.connect()
+
+        return self.smtp
+
+    async def disconnect(self):
+        if self.smtp is not None and self.smtp.is_connected:
+            try:
+                await self.smtp.quit()
+            except SMTPException as error:
+                print(error)
+                self.smtp.close()
+
+        self.smtp = None
+
+    async def send_batch(self) -> int:
+        """
+        Claims and sends one batch of due messages.
+
+        :return: The number of claimed messages.
+        :rtype: int
+        """
+        async with self.session_maker() as session:
+            mails = await mail_repository.claim_mails(
+                config.MAIL_OUTBOX_BATCH_SIZE, config.MAIL_OUTBOX_LEASE_SECONDS, session
+            )
+
+            if not mails:
+                return 0
+
+            sent = []
+
+            for mail in mails:
+                try:
+                    message = mail_service.render_message(mail)
+                except Exception as error:
+                    # A message that cannot be rendered fails the same way on every attempt.
+                    print(error)
+                    await mail_repository.set_mail_failed(mail.id, str(error), None, session)
+                    continue
+
+                try:
+                    smtp = await self.connect()
+                    await smtp.send_message(message)
+                    sent.append(mail.id)
+                except (SMTPException, OSError) as error:
+                    print(error)
+
+                    if isinstance(error, (SMTPServerDisconnected, OSError)):
+                        self.smtp = None
+
+                    next_attempt_at = None
+
+                    if mail.attempts < config.MAIL_MAX_ATTEMPTS:
+                        next_attempt_at = datetime.datetime.now() + datetime.timedelta(
+                            seconds=self.get_retry_delay(mail.attempts)
+                        )
+
+                    await mail_repository.set_mail_failed(mail.id, str(error), next_attempt_at, session)
+
+            await mail_repository.set_mails_sent(sent, session)
+
+            return len(mails)
+
+    async def run(self):
+        """
+        Sends queued messages until cancelled, polling the outbox when it is empty.
+        """
+        mail_service.compile_templates()
+
+        try:
+            while True:
+                try:
+                    claimed = await self.send_batch()
+
+                    if claimed == config.MAIL_OUTBOX_BATCH_SIZE:
+                        continue
+
+                    if claimed == 0:
+                        await self.disconnect()
+                except Exception as error:
+                    print(error)
+
+                await asyncio.sleep(config.MAIL_OUTBOX_POLL_INTERVAL)
+        finally:
+            await self.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(MailWorker(DBSession).run())
@@ -0,0 +1,245 @@
+import random
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config.config import config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """
+    Cumulative histogram in the Prometheus format.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_cumulative_counts(self) -> list[tuple[str, int]]:
+        result = []
+        total = 0
+
+        for bucket, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            result.append((str(bucket), total))
+
+        return result
+
+
+class RequestTimings:
+    """
+    Database and Redis work done while serving a single sampled request.
+    """
+
+    __slots__ = ("db_count", "db_time", "redis_count", "redis_time")
+
+    def __init__(self):
+        self.db_count = 0
+        self.db_time = 0.0
+        self.redis_count = 0
+        self.redis_time = 0.0
+
+    def add_redis(self, duration: float):
+        self.redis_count += 1
+        self.redis_time += duration
+
+    def get_server_timing(self, total: float) -> str:
+        return (
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.db_count} statements", '
+            f'redis;dur={self.redis_time * 1000:.2f};desc="{self.redis_count} commands", '
+            f'total;dur={total * 1000:.2f}'
+        )
+
+
+# The timings of the request being served, None when the request is not sampled.
+request_timings: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+class RouteTotals:
+    __slots__ = ("requests", "db_count", "db_time", "redis_count", "redis_time")
+
+    def __init__(self):
+        self.requests = 0
+        self.db_count = 0
+        self.db_time = 0.0
+        self.redis_count = 0
+        self.redis_time = 0.0
+
+    def add(self, timings: RequestTimings):
+        self.requests += 1
+        self.db_count += timings.db_count
+        self.db_time += timings.db_time
+        self.redis_count += timings.redis_count
+        self.redis_time += timings.redis_time
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def format_labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+class Metrics:
+    """
+    In-process request metrics, exposed in the Prometheus text format.
+
+    The latency of every request is recorded. The database and Redis work is only measured for a sampled
+    share of the requests, which bounds the overhead of the instrumentation in production.
+    Routes are labelled with their path template, so the number of series does not grow with the IDs in the URLs.
+    """
+
+    def __init__(self, sample_rate: float = config.METRICS_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.latency: dict[tuple[str, str, int], Histogram] = defaultdict(Histogram)
+        self.routes: dict[tuple[str, str], RouteTotals] = defaultdict(RouteTotals)
+        self.cache: dict[tuple[str, str], int] = defaultdict(int)
+
+    def is_sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def observe_request(self, method: str, route: str, status_code: int, duration: float,
+                        timings: RequestTimings | None):
+        self.latency[method, route, status_code].observe(duration)
+
+        if timings is not None:
+            self.routes[method, route].add(timings)
+
+    def record_cache(self, name: str, hit: bool):
+        """
+        Counts a cache lookup, for the hit rate of the cache.
+
+        :param name: The name of the cache.
+        :type name: str
+        :param hit: Whether the value was found.
+        :type hit: bool
+        """
+        self.cache[name, "hit" if hit else "miss"] += 1
+
+    def instrument_engine(self, engine: AsyncEngine):
+        """
+        Measures the statements executed by the engine while serving sampled requests.
+        """
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if request_timings.get() is not None:
+                conn.info.setdefault("metrics_started_at", []).append(time.perf_counter())
+
+        @event.listens_for(engine.sync_engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            timings = request_timings.get()
+            started_at = conn.info.get("metrics_started_at")
+
+            if timings is not None and started_at:
+                timings.db_count += 1
+                timings.db_time += time.perf_counter() - started_at.pop()
+
+    def render(self, gauges: dict[str, dict | None] | None = None) -> str:
+        """
+        Renders the collected metrics in the Prometheus text exposition format.
+
+        :param gauges: Snapshots of resource statistics by group, e.g. the connection pools; numeric values
+            are exported as gauges named ``app_<group>_<name>``.
+        :type gauges: dict[str, dict | None] | None
+        :return: The metrics.
+        :rtype: str
+        """
+        lines = [
+            "# HELP app_request_duration_seconds Request latency.",
+            "# TYPE app_request_duration_seconds histogram",
+        ]
+
+        for (method, route, status_code), histogram in sorted(self.latency.items()):
+            labels = {"method": method, "route": route, "status": status_code}
+            for bucket, count in histogram.get_cumulative_counts():
+                lines.append(f"app_request_duration_seconds_bucket{format_labels(**labels, le=bucket)} {count}")
+            lines.append(f"app_request_duration_seconds_sum{format_labels(**labels)} {histogram.sum}")
+            lines.append(f"app_request_duration_seconds_count{format_labels(**labels)} {histogram.count}")
+
+        route_counters = [
+            ("app_sampled_requests_total", "Requests whose database and Redis work was measured.", "requests"),
+            ("app_db_statements_total", "Database statements executed by sampled requests.", "db_count"),
+            ("app_db_duration_seconds_total", "Time spent in database statements by sampled requests.", "db_time"),
+            ("app_redis_commands_total", "Redis round-trips of sampled requests.", "redis_count"),
+            ("app_redis_duration_seconds_total", "Time spent in Redis round-trips by sampled requests.", "redis_time"),
+        ]
+
+        for name, description, attribute in route_counters:
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+            for (method, route), totals in sorted(self.routes.items()):
+                lines.append(f"{name}{format_labels(method=method, route=route)} {getattr(totals, attribute)}")
+
+        lines += ["# HELP app_cache_requests_total Cache lookups by result.", "# TYPE app_cache_requests_total counter"]
+        for (name, result), count in sorted(self.cache.items()):
+            lines.append(f"app_cache_requests_total{format_labels(cache=name, result=result)} {count}")
+
+        for group, stats in (gauges or {}).items():
+            for name, value in (stats or {}).items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines += [f"# TYPE app_{group}_{name} gauge", f"app_{group}_{name} {value}"]
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    """
+    Records the latency of every HTTP request and the database and Redis work of the sampled ones.
+
+    Sampled responses get a ``Server-Timing`` header with the time spent in the database and Redis until the
+    response started, which browsers show in their developer tools.
+    """
+
+    def __init__(self, app: ASGIApp, request_metrics: Metrics = metrics, server_timing: bool = True):
+        self.app = app
+        self.metrics = request_metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        timings = RequestTimings() if self.metrics.is_sampled() else None
+        token = request_timings.set(timings)
+        status_code = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+                if timings is not None and self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.get_server_timing(time.perf_counter() - started_at))
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timings.reset(token)
+            self.metrics.observe_request(
+                scope["method"], getattr(scope.get("route"), "path", "unmatched"), status_code,
+                time.perf_counter() - started_at, timings,
+            )
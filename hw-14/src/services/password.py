@@ -0,0 +1,137 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette import status
+
+from src.config.config import config
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded thread pool, off the event loop.
+
+    bcrypt releases the GIL while hashing, so the worker threads run in parallel with the event loop. Calls
+    beyond the workers wait in a bounded queue; once it is full new calls are rejected with 503 instead of
+    piling up behind each other.
+    """
+
+    RETRY_AFTER_SECONDS = 1
+
+    def __init__(self, rounds: int, max_workers: int, max_pending: int):
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.executor = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.run_time_total = 0.0
+        self.run_time_max = 0.0
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hasher")
+
+        return self.executor
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    @staticmethod
+    def timed(queued_at: float, func: Callable, *args):
+        started_at = time.perf_counter()
+        result = func(*args)
+
+        return result, started_at - queued_at, time.perf_counter() - started_at
+
+    async def run(self, func: Callable, *args):
+        if self.in_flight >= self.max_workers + self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, try again later",
+                headers={"Retry-After": str(self.RETRY_AFTER_SECONDS)},
+            )
+
+        self.in_flight += 1
+
+        try:
+            result, wait_time, run_time = await asyncio.get_running_loop().run_in_executor(
+                self.get_executor(), self.timed, time.perf_counter(), func, *args
+            )
+        finally:
+            self.in_flight -= 1
+
+        self.completed += 1
+        self.wait_time_total += wait_time
+        self.wait_time_max = max(self.wait_time_max, wait_time)
+        self.run_time_total += run_time
+        self.run_time_max = max(self.run_time_max, run_time)
+
+        return result
+
+    async def hash(self, password: str) -> str:
+        """
+        Hashes a password with the configured bcrypt cost.
+
+        :param password: The plain password.
+        :type password: str
+        :return: The password hash.
+        :rtype: str
+        """
+        return await self.run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """
+        Checks a password against its hash.
+
+        :param password: The plain password.
+        :type password: str
+        :param hashed_password: The stored password hash.
+        :type hashed_password: str
+        :return: True if the password matches the hash.
+        :rtype: bool
+        """
+        return await self.run(self.context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """
+        Checks a password against its hash and rehashes it if the hash was made with outdated parameters.
+
+        :param password: The plain password.
+        :type password: str
+        :param hashed_password: The stored password hash.
+        :type hashed_password: str
+        :return: Whether the password matches, and the new hash to store or None if the stored one is current.
+        :rtype: tuple[bool, Optional[str]]
+        """
+        return await self.run(self.context.verify_and_update, password, hashed_password)
+
+    def get_stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "queue_depth": max(self.in_flight - self.max_workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_time_avg_ms": round(self.wait_time_total / self.completed * 1000, 3) if self.completed else 0,
+            "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+            "run_time_avg_ms": round(self.run_time_total / self.completed * 1000, 3) if self.completed else 0,
+            "run_time_max_ms": round(self.run_time_max * 1000, 3),
+        }
+
+
+password_hasher = PasswordHasher(
+    rounds=config.PASSWORD_BCRYPT_ROUNDS,
+    max_workers=config.PASSWORD_HASH_WORKERS,
+    max_pending=config.PASSWORD_HASH_MAX_PENDING,
+)
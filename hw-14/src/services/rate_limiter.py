@@ -0,0 +1,174 @@
+import hashlib
+import math
+import time
+
+from fastapi import Depends, HTTPException, status
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError, RedisError
+
+from src.config.config import config
+from src.database.cache import get_cache
+from src.entity import User
+from src.services.auth import auth_service
+from src.util.ttl_cache import TTLCache
+
+# Checks and counts a request in one round-trip. Returns {allowed, remaining, retry after in milliseconds}.
+# The time is taken from the Redis server, so all workers share the same clock.
+RATE_LIMIT_SCRIPT = """
+local key = KEYS[1]
+local algorithm = ARGV[1]
+local limit = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+if algorithm == 'token_bucket' then
+    local state = redis.call('HMGET', key, 'tokens', 'updated_at')
+    local rate = limit / period
+    local tokens = tonumber(state[1]) or limit
+    local updated_at = tonumber(state[2]) or now
+    tokens = math.min(limit, tokens + math.max(0, now - updated_at) * rate)
+
+    if tokens < 1 then
+        return {0, 0, math.ceil((1 - tokens) / rate)}
+    end
+
+    tokens = tokens - 1
+    redis.call('HSET', key, 'tokens', tokens, 'updated_at', now)
+    redis.call('PEXPIRE', key, period)
+
+    return {1, math.floor(tokens), 0}
+end
+
+-- Sliding window counter: the count of the previous fixed window is weighted by its overlap with the
+-- sliding window.
+local window = math.floor(now / period)
+local elapsed = now - window * period
+local state = redis.call('HMGET', key, 'window', 'current', 'previous')
+local stored_window = tonumber(state[1])
+local current = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+
+if stored_window ~= window then
+    if stored_window == window - 1 then
+        previous = current
+    else
+        previous = 0
+    end
+    current = 0
+end
+
+local count = previous * (period - elapsed) / period + current
+
+if count + 1 > limit then
+    local retry_after = period - elapsed
+    if current + 1 <= limit and previous > 0 then
+        retry_after = math.ceil(period * (previous - limit + 1 + current) / previous) - elapsed
+    end
+    return {0, 0, math.max(retry_after, 1)}
+end
+
+redis.call('HSET', key, 'window', window, 'current', current + 1, 'previous', previous)
+redis.call('PEXPIRE', key, period * 2)
+
+return {1, math.floor(limit - count - 1), 0}
+"""
+
+
+class RateLimiter:
+    """
+    Limits the requests of every user per route group, with a token bucket or a sliding window kept in Redis.
+
+    A request costs a single EVALSHA. When Redis rejects a request, the user is blocked in-process until the
+    returned retry time, so further requests of an over-limit client are rejected without touching Redis.
+    If Redis is unavailable, requests are let through.
+    """
+
+    ALGORITHMS = ("sliding_window", "token_bucket")
+
+    def __init__(self, limits: dict[str, tuple[int, int]], algorithm: str = "sliding_window",
+                 local_max_size: int = 10_000):
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+
+        self.limits = limits
+        self.algorithm = algorithm
+        self.script_sha = hashlib.sha1(RATE_LIMIT_SCRIPT.encode()).hexdigest()
+        longest_period = max((seconds for _, seconds in limits.values()), default=1)
+        self.blocked = TTLCache(max_size=local_max_size, ttl=longest_period)
+
+    def get_key(self, group: str, user_id) -> str:
+        return f"rate:{self.algorithm}:{group}:{user_id}"
+
+    async def evaluate(self, key: str, times: int, seconds: int, cache: Redis) -> list[int]:
+        args = (self.algorithm, times, seconds * 1000)
+
+        try:
+            return await cache.evalsha(self.script_sha, 1, key, *args)
+        except NoScriptError:
+            await cache.script_load(RATE_LIMIT_SCRIPT)
+            return await cache.evalsha(self.script_sha, 1, key, *args)
+
+    async def check(self, group: str, user_id, cache: Redis):
+        """
+        Counts a request of the user in the route group.
+
+        :param group: The route group, a key of the configured limits.
+        :type group: str
+        :param user_id: The ID of the authenticated user.
+        :param cache: The Redis client.
+        :type cache: Redis
+        :raises HTTPException: 429 Too Many Requests, with Retry-After, if the user is over the limit.
+        """
+        times, seconds = self.limits[group]
+        key = self.get_key(group, user_id)
+        blocked_until = self.blocked.get(key)
+
+        if blocked_until is not None:
+            raise self.get_exception(blocked_until - time.monotonic())
+
+        try:
+            allowed, _, retry_after_ms = await self.evaluate(key, times, seconds, cache)
+        except RedisError as error:
+            print(error)
+            return
+
+        if not allowed:
+            retry_after = retry_after_ms / 1000
+            self.blocked.set(key, time.monotonic() + retry_after, ttl=retry_after)
+            raise self.get_exception(retry_after)
+
+    @staticmethod
+    def get_exception(retry_after: float) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too Many Requests",
+            headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+        )
+
+
+rate_limiter = RateLimiter(
+    config.RATE_LIMITS, config.RATE_LIMIT_ALGORITHM, config.RATE_LIMIT_LOCAL_MAX_SIZE
+)
+
+
+def rate_limit(group: str):
+    """
+    Builds the dependency limiting the requests of the current user in a route group.
+
+    The user comes from the already verified access token; FastAPI resolves get_current_user once per request,
+    so the route gets the same user without authenticating it twice.
+
+    :param group: The route group, a key of Config.RATE_LIMITS.
+    :type group: str
+    :return: The FastAPI dependency.
+    """
+    if group not in rate_limiter.limits:
+        raise ValueError(f"No rate limit configured for {group}")
+
+    async def check_rate_limit(current_user: User = Depends(auth_service.get_current_user),
+                               cache: Redis = Depends(get_cache)):
+        if config.RATE_LIMIT_ENABLED:
+            await rate_limiter.check(group, current_user.id, cache)
+
+    return check_rate_limit
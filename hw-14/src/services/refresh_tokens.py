@@ -0,0 +1,207 @@
+import datetime
+import hashlib
+import secrets
+import uuid
+
+from fastapi import HTTPException, status
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError, RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import src.repository.refresh_token as refresh_token_repository
+from src.config.config import config
+from src.entity import User
+from src.services.auth import auth_service
+from src.services.token_cache import token_cache
+
+ROTATED = 1
+UNKNOWN = 0
+REUSED = -1
+
+# Swaps the current token of a family in one round-trip. Returns {ROTATED, remaining family TTL in milliseconds},
+# {REUSED, 0} for an already rotated token, which also deletes the family, or {UNKNOWN, 0} for a family that is
+# not in Redis.
+ROTATE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+
+if not current then
+    return {0, 0}
+end
+
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return {-1, 0}
+end
+
+redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+
+return {1, redis.call('PTTL', KEYS[1])}
+"""
+
+
+class RefreshTokenStore:
+    """
+    Rotating refresh tokens, grouped in families: every sign-in starts a family, i.e. a device, and every refresh
+    replaces the token of the family by a new one.
+
+    The ID of the current token of each family is kept in Redis, so a refresh is a single EVALSHA and never writes
+    to the database. Presenting a token that was already rotated means it leaked: the whole family is revoked and
+    the access tokens of the user with it. Signing out deletes one key.
+
+    The families are also recorded in the database when created or revoked, but not their current token: without
+    Redis a rotated token can not be told from the current one. If Redis is unavailable or lost a family, the
+    family is revoked and the device has to sign in again.
+    """
+
+    def __init__(self, token_ttl: int, family_ttl: int):
+        self.token_ttl = token_ttl
+        self.family_ttl = family_ttl
+        self.script_sha = hashlib.sha1(ROTATE_SCRIPT.encode()).hexdigest()
+
+    @staticmethod
+    def get_key(family_id: str) -> str:
+        return f"refresh:family:{family_id}"
+
+    @staticmethod
+    def get_invalid_token_exception() -> HTTPException:
+        return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+
+    def issue(self, email: str, family_id: str, jti: str, family_expires_at: datetime.datetime) -> str:
+        """
+        Creates a refresh token of the family, expiring no later than the family.
+        """
+        remaining = (family_expires_at - datetime.datetime.utcnow()).total_seconds()
+
+        return auth_service.create_refresh_token(
+            {"sub": email, "fid": family_id, "jti": jti}, expires_delta_seconds=max(min(self.token_ttl, remaining), 1)
+        )
+
+    async def store(self, family_id: str, jti: str, family_expires_at: datetime.datetime, cache: Redis):
+        ttl = family_expires_at - datetime.datetime.utcnow()
+
+        try:
+            await cache.set(self.get_key(family_id), jti, px=max(int(ttl.total_seconds() * 1000), 1))
+        except RedisError as error:
+            print(error)
+
+    async def evaluate(self, family_id: str, jti: str, new_jti: str, cache: Redis) -> list[int]:
+        key = self.get_key(family_id)
+
+        try:
+            return await cache.evalsha(self.script_sha, 1, key, jti, new_jti)
+        except NoScriptError:
+            await cache.script_load(ROTATE_SCRIPT)
+            return await cache.evalsha(self.script_sha, 1, key, jti, new_jti)
+
+    async def create_family(self, user: User, db: AsyncSession, cache: Redis) -> str:
+        """
+        Starts a refresh token family for a signed in user.
+
+        :param user: The signed in user.
+        :type user: User
+        :param db: The SQLAlchemy asynchronous database session.
+        :type db: AsyncSession
+        :param cache: The Redis client.
+        :type cache: Redis
+        :return: The first refresh token of the family.
+        :rtype: str
+        """
+        family_id = uuid.uuid4().hex
+        jti = secrets.token_urlsafe(16)
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.family_ttl)
+
+        await refresh_token_repository.create_family(family_id, user.id, expires_at, db)
+        await self.store(family_id, jti, expires_at, cache)
+
+        return self.issue(user.email, family_id, jti, expires_at)
+
+    async def rotate(self, refresh_token: str, db: AsyncSession, cache: Redis) -> tuple[str, str]:
+        """
+        Replaces a refresh token by the next token of its family.
+
+        :param refresh_token: The presented refresh token.
+        :type refresh_token: str
+        :param db: The SQLAlchemy asynchronous database session, used only to revoke the family.
+        :type db: AsyncSession
+        :param cache: The Redis client.
+        :type cache: Redis
+        :raises HTTPException: 401 Unauthorized if the token is invalid, its family is revoked or expired, the
+            token was already rotated, or Redis is unavailable or does not know the family.
+        :return: The email of the user and the new refresh token.
+        :rtype: tuple[str, str]
+        """
+        claims = auth_service.decode_refresh_token(refresh_token)
+        email, family_id, jti = claims["sub"], claims.get("fid"), claims.get("jti")
+
+        if family_id is None or jti is None:
+            raise self.get_invalid_token_exception()
+
+        new_jti = secrets.token_urlsafe(16)
+
+        try:
+            result, ttl_ms = await self.evaluate(family_id, jti, new_jti, cache)
+        except RedisError as error:
+            print(error)
+            result, ttl_ms = UNKNOWN, 0
+
+        if result == REUSED:
+            await refresh_token_repository.revoke_family(family_id, db)
+            await token_cache.revoke(email, cache)
+            raise self.get_invalid_token_exception()
+
+        if result == UNKNOWN:
+            # The token may be one that was rotated already, so the family ends here.
+            await refresh_token_repository.revoke_family(family_id, db)
+            raise self.get_invalid_token_exception()
+
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(milliseconds=ttl_ms)
+
+        return email, self.issue(email, family_id, new_jti, expires_at)
+
+    async def revoke(self, refresh_token: str, db: AsyncSession, cache: Redis):
+        """
+        Revokes the family of a refresh token, i.e. signs out the device that holds it.
+
+        :param refresh_token: The refresh token of the device.
+        :type refresh_token: str
+        :param db: The SQLAlchemy asynchronous database session.
+        :type db: AsyncSession
+        :param cache: The Redis client.
+        :type cache: Redis
+        :raises HTTPException: 401 Unauthorized if the token is invalid.
+        """
+        family_id = auth_service.decode_refresh_token(refresh_token).get("fid")
+
+        if family_id is None:
+            raise self.get_invalid_token_exception()
+
+        await refresh_token_repository.revoke_family(family_id, db)
+
+        try:
+            await cache.delete(self.get_key(family_id))
+        except RedisError as error:
+            print(error)
+
+    async def revoke_all(self, user: User, db: AsyncSession, cache: Redis):
+        """
+        Revokes all refresh token families of a user, e.g. after a password reset.
+
+        :param user: The user.
+        :type user: User
+        :param db: The SQLAlchemy asynchronous database session.
+        :type db: AsyncSession
+        :param cache: The Redis client.
+        :type cache: Redis
+        """
+        family_ids = await refresh_token_repository.revoke_user_families(user.id, db)
+
+        if not family_ids:
+            return
+
+        try:
+            await cache.delete(*(self.get_key(family_id) for family_id in family_ids))
+        except RedisError as error:
+            print(error)
+
+
+refresh_token_store = RefreshTokenStore(config.REFRESH_TOKEN_TTL, config.REFRESH_TOKEN_FAMILY_TTL)
@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO
+
+import cloudinary
+import cloudinary.api
+import cloudinary.uploader
+from cloudinary.exceptions import Error, NotFound
+
+from src.config.config import config
+from src.util.ttl_cache import TTLCache
+
+
+class AvatarStorage(ABC):
+    """
+    Storage backend of the avatar images. The methods are blocking and are called from a worker thread.
+    """
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def save(self, key: str, file: BinaryIO):
+        ...
+
+    @abstractmethod
+    def get_url(self, key: str) -> str:
+        ...
+
+
+class CloudinaryStorage(AvatarStorage):
+    """
+    Stores avatars in Cloudinary, which also resizes them when they are delivered.
+
+    The Admin API that tells whether an avatar exists is rate limited, so the keys known to exist are
+    remembered, and an avatar whose existence cannot be checked is uploaded; the upload never overwrites it.
+    """
+
+    AVATAR_SIZE = 250
+    KNOWN_KEYS_MAX_SIZE = 10_000
+    KNOWN_KEYS_TTL = 60 * 60
+
+    def __init__(self):
+        cloudinary.config(
+            cloud_name=config.CLOUDINARY_CLOUD_NAME,
+            api_key=config.CLOUDINARY_API_KEY,
+            api_secret=config.CLOUDINARY_API_SECRET,
+            secure=True
+        )
+        self.known_keys = TTLCache(max_size=self.KNOWN_KEYS_MAX_SIZE, ttl=self.KNOWN_KEYS_TTL)
+        self.known_keys_lock = threading.Lock()
+
+    def remember(self, key: str):
+        with self.known_keys_lock:
+            self.known_keys.set(key, True)
+
+    def exists(self, key: str) -> bool:
+        with self.known_keys_lock:
+            if key in self.known_keys:
+                return True
+
+        try:
+            cloudinary.api.resource(key)
+        except NotFound:
+            return False
+        except Error as error:
+            print(error)
+            return False
+
+        self.remember(key)
+
+        return True
+
+    def save(self, key: str, file: BinaryIO):
+        cloudinary.uploader.upload(file=file, public_id=key, overwrite=False)
+        self.remember(key)
+
+    def get_url(self, key: str) -> str:
+        return cloudinary.CloudinaryImage(key).build_url(
+            width=self.AVATAR_SIZE, height=self.AVATAR_SIZE, crop='fill'
+        )
+
+
+class LocalStorage(AvatarStorage):
+    """
+    Stores avatars in a local directory, for development and tests.
+    """
+
+    def __init__(self, directory: str | Path, base_url: str):
+        self.directory = Path(directory)
+        self.base_url = base_url.rstrip('/')
+
+    def exists(self, key: str) -> bool:
+        return (self.directory / key).is_file()
+
+    def save(self, key: str, file: BinaryIO):
+        path = self.directory / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first, so a half-written avatar is never served.
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as output:
+            shutil.copyfileobj(file, output)
+
+        os.replace(output.name, path)
+
+    def get_url(self, key: str) -> str:
+        return f'{self.base_url}/{key}'
+
+
+avatar_storages = {
+    'cloudinary': CloudinaryStorage,
+    'local': lambda: LocalStorage(config.AVATAR_LOCAL_DIRECTORY, config.AVATAR_LOCAL_URL),
+}
+
+avatar_storage = avatar_storages[config.AVATAR_STORAGE]()
+
+
+def get_avatar_storage() -> AvatarStorage:
+    """
+    Returns the configured avatar storage. Used as a FastAPI dependency.
+
+    :return: The avatar storage backend.
+    :rtype: AvatarStorage
+    """
+    return avatar_storage
@@ -0,0 +1,108 @@
+import hashlib
+import time
+
+from redis.asyncio import Redis
+
+from src.config.config import config
+from src.database.cache import subscribe
+from src.services.metrics import metrics
+from src.util.ttl_cache import TTLCache
+
+
+class TokenCache:
+    """
+    In-process cache of access tokens whose signature and claims were already verified.
+
+    Entries are keyed by the SHA-256 of the token, so raw tokens are not kept in memory, and expire together
+    with the token. Revoking the tokens of a user stores the revocation time in Redis, so tokens issued before it
+    are rejected, and is published on a Redis channel so every worker drops them from the cache.
+    """
+
+    CHANNEL = "token-cache:revoke"
+    RECONNECT_DELAY_SECONDS = 1
+    # Matches the default lifetime of access tokens: older tokens are expired anyway.
+    REVOCATION_TTL_SECONDS = 24 * 60 * 60
+
+    def __init__(self):
+        self.local = TTLCache(max_size=config.ACCESS_TOKEN_CACHE_MAX_SIZE, ttl=config.ACCESS_TOKEN_CACHE_TTL)
+
+    @staticmethod
+    def get_key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    @staticmethod
+    def get_revocation_key(email: str) -> str:
+        return f"token:revoked:{email}"
+
+    def get(self, token: str) -> str | None:
+        """
+        Returns the email of a verified access token.
+
+        :param token: The bearer token.
+        :type token: str
+        :return: The email from the token subject, or None if the token was not verified yet or expired.
+        :rtype: Optional[str]
+        """
+        email = self.local.get(self.get_key(token))
+        metrics.record_cache("access_token", email is not None)
+
+        return email
+
+    def set(self, token: str, email: str, expires_at: float):
+        """
+        Caches a verified access token until its expiration.
+
+        :param token: The bearer token.
+        :type token: str
+        :param email: The email from the token subject.
+        :type email: str
+        :param expires_at: The exp claim of the token, as a Unix timestamp.
+        :type expires_at: float
+        """
+        ttl = expires_at - time.time()
+
+        if ttl > 0:
+            self.local.set(self.get_key(token), email, ttl=ttl)
+
+    def discard(self, email: str):
+        self.local.discard_where(lambda cached_email: cached_email == email)
+
+    async def is_revoked(self, email: str, issued_at: float, cache: Redis) -> bool:
+        """
+        Checks whether a token was issued before the tokens of its user were revoked.
+
+        :param email: The email from the token subject.
+        :type email: str
+        :param issued_at: The iat claim of the token, as a Unix timestamp.
+        :type issued_at: float
+        :param cache: The Redis client.
+        :type cache: Redis
+        :return: True if the token must be rejected.
+        :rtype: bool
+        """
+        revoked_at = await cache.get(self.get_revocation_key(email))
+
+        return revoked_at is not None and issued_at < int(revoked_at)
+
+    async def revoke(self, email: str, cache: Redis):
+        """
+        Revokes the access tokens issued to a user so far and drops them from the cache of every worker.
+
+        :param email: The email address of the user.
+        :type email: str
+        :param cache: The Redis client.
+        :type cache: Redis
+        """
+        self.discard(email)
+        await cache.set(self.get_revocation_key(email), int(time.time()), ex=self.REVOCATION_TTL_SECONDS)
+        await cache.publish(self.CHANNEL, email)
+
+    async def listen(self, cache: Redis):
+        """
+        Drops the tokens revoked by other workers. Runs until cancelled; the local cache is cleared while the
+        subscription is down.
+        """
+        await subscribe(cache, self.CHANNEL, self.discard, self.local.clear, self.RECONNECT_DELAY_SECONDS)
+
+
+token_cache = TokenCache()
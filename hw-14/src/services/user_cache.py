@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import math
+import random
+import secrets
+import time
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
+
+from src.config.config import config
+from src.database.cache import subscribe
+from src.database.cache_serializer import user_serializer
+from src.entity.user import User
+from src.services.metrics import metrics
+from src.util.single_flight import SingleFlight
+from src.util.ttl_cache import TTLCache
+
+# Deletes the load lock only while it holds the token of the releasing worker: once the lock has timed out and
+# another worker has taken it, the late worker must not delete it.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+
+return 0
+"""
+
+
+class UserCache:
+    """
+    Two-level cache of authenticated users: a small in-process LRU in front of Redis.
+
+    Every change to a user is published on a Redis channel so that the local caches of all workers drop it.
+
+    Misses are loaded without a thundering herd when a popular user expires: concurrent misses of a worker are
+    coalesced into one load, and across workers only the holder of a short Redis lock loads the user while the
+    others wait for it to be cached. Entries also store their expiry and how long they took to load, so a
+    request may refresh an entry shortly before it expires (probabilistic early expiration), while the other
+    requests keep using it.
+    """
+
+    CHANNEL = "user-cache:invalidate"
+    RECONNECT_DELAY_SECONDS = 1
+
+    def __init__(self):
+        self.local = TTLCache(max_size=config.USER_CACHE_LOCAL_MAX_SIZE, ttl=config.USER_CACHE_LOCAL_TTL)
+        self.loads = SingleFlight()
+        self.release_lock_sha = hashlib.sha1(RELEASE_LOCK_SCRIPT.encode()).hexdigest()
+
+    @staticmethod
+    def get_key(email: str) -> str:
+        return f"user:{email}"
+
+    @staticmethod
+    def get_lock_key(email: str) -> str:
+        return f"user:lock:{email}"
+
+    @staticmethod
+    def read_entry(data: bytes | None) -> tuple[User | None, float, float]:
+        """
+        Parses a Redis entry: ``<expires at> <load time> <snapshot>``, or a bare snapshot.
+
+        :return: The user (None if the entry is missing or outdated), the expiry as a Unix timestamp and the
+            time the user took to load, in seconds. Bare snapshots never expire early.
+        :rtype: tuple[User | None, float, float]
+        """
+        if not data:
+            return None, math.inf, 0.0
+
+        if data.startswith(b"["):
+            return user_serializer.loads(data), math.inf, 0.0
+
+        try:
+            expires_at, load_time, snapshot = data.split(b" ", 2)
+            return user_serializer.loads(snapshot), float(expires_at), float(load_time)
+        except ValueError:
+            return None, math.inf, 0.0
+
+    @staticmethod
+    def should_refresh(expires_at: float, load_time: float) -> bool:
+        # XFetch: the closer the expiry and the slower the load, the likelier an early refresh.
+        return time.time() - load_time * config.USER_CACHE_REFRESH_BETA * math.log(1 - random.random()) >= expires_at
+
+    async def get(self, email: str, cache: Redis) -> User | None:
+        """
+        Returns the cached user, looking into the local cache first and into Redis after it.
+
+        :param email: The email address of the user.
+        :type email: str
+        :param cache: The Redis client.
+        :type cache: Redis
+        :return: The cached User model, or None on a cache miss or an outdated snapshot.
+        :rtype: Optional[User]
+        """
+        user = self.local.get(email)
+        metrics.record_cache("user_local", user is not None)
+
+        if user is not None:
+            return user
+
+        user, _, _ = self.read_entry(await cache.get(self.get_key(email)))
+        metrics.record_cache("user_redis", user is not None)
+
+        if user is None:
+            return None
+
+        self.local.set(email, user)
+
+        return user
+
+    async def set(self, user: User, cache: Redis, load_time: float = 0.0):
+        """
+        Stores the user in both cache levels.
+
+        :param user: The User model to cache.
+        :type user: User
+        :param cache: The Redis client.
+        :type cache: Redis
+        :param load_time: How long loading the user took, in seconds; drives the early refresh.
+        :type load_time: float
+        """
+        expires_at = time.time() + config.USER_CACHE_TTL
+        entry = f"{expires_at:.3f} {load_time:.6f} ".encode() + user_serializer.dumps(user)
+
+        await cache.set(self.get_key(user.email), entry, ex=config.USER_CACHE_TTL)
+        self.local.set(user.email, user)
+
+    async def get_or_load(self, email: str, cache: Redis, load: Callable[[], Awaitable[User | None]]) -> User | None:
+        """
+        Returns the cached user, loading and caching it on a miss.
+
+        :param email: The email address of the user.
+        :type email: str
+        :param cache: The Redis client.
+        :type cache: Redis
+        :param load: Loads the user from the database.
+        :type load: Callable[[], Awaitable[User | None]]
+        :return: The User model, or None if the user does not exist.
+        :rtype: Optional[User]
+        """
+        user = self.local.get(email)
+        metrics.record_cache("user_local", user is not None)
+
+        if user is not None:
+            return user
+
+        return await self.loads.do(email, lambda: self.fetch(email, cache, load))
+
+    async def fetch(self, email: str, cache: Redis, load: Callable[[], Awaitable[User | None]]) -> User | None:
+        user, expires_at, load_time = self.read_entry(await cache.get(self.get_key(email)))
+        metrics.record_cache("user_redis", user is not None)
+
+        if user is not None and not self.should_refresh(expires_at, load_time):
+            self.local.set(email, user)
+            return user
+
+        lock_key = self.get_lock_key(email)
+        lock_token = secrets.token_urlsafe(16)
+
+        if await cache.set(lock_key, lock_token, nx=True, px=int(config.USER_CACHE_LOCK_TIMEOUT * 1000)):
+            try:
+                return await self.load(cache, load)
+            finally:
+                await self.release_lock(lock_key, lock_token, cache)
+
+        if user is not None:
+            # Another worker is refreshing it already.
+            self.local.set(email, user)
+            return user
+
+        deadline = time.monotonic() + config.USER_CACHE_LOCK_WAIT
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(config.USER_CACHE_LOCK_POLL_INTERVAL)
+            user, _, _ = self.read_entry(await cache.get(self.get_key(email)))
+
+            if user is not None:
+                self.local.set(email, user)
+                return user
+
+        # The lock holder is slow or gone: load it here rather than failing the request.
+        return await self.load(cache, load)
+
+    async def release_lock(self, lock_key: str, lock_token: str, cache: Redis):
+        try:
+            await cache.evalsha(self.release_lock_sha, 1, lock_key, lock_token)
+        except NoScriptError:
+            await cache.script_load(RELEASE_LOCK_SCRIPT)
+            await cache.evalsha(self.release_lock_sha, 1, lock_key, lock_token)
+
+    async def load(self, cache: Redis, load: Callable[[], Awaitable[User | None]]) -> User | None:
+        started_at = time.perf_counter()
+        user = await load()
+
+        if user is not None:
+            await self.set(user, cache, load_time=time.perf_counter() - started_at)
+
+        return user
+
+    async def invalidate(self, email: str, cache: Redis):
+        """
+        Removes the user from both cache levels and notifies the other workers.
+
+        :param email: The email address of the changed user.
+        :type email: str
+        :param cache: The Redis client.
+        :type cache: Redis
+        """
+        self.local.pop(email)
+        await cache.delete(self.get_key(email))
+        await cache.publish(self.CHANNEL, email)
+
+    async def listen(self, cache: Redis):
+        """
+        Drops users from the local cache when another worker publishes an invalidation.
+
+        Runs until cancelled. While the subscription is down the local cache is cleared, because
+        invalidations sent during that time are lost.
+        """
+        await subscribe(cache, self.CHANNEL, self.local.pop, self.local.clear, self.RECONNECT_DELAY_SECONDS)
+
+
+user_cache = UserCache()
@@ -0,0 +1,53 @@
+import base64
+import hashlib
+import hmac
+import json
+
+from src.config.config import config
+
+SIGNATURE_LENGTH = 16
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(config.JWT_SECRET_KEY.encode(), payload, hashlib.sha256).digest()[:SIGNATURE_LENGTH]
+
+
+def encode_cursor(data: dict) -> str:
+    """
+    Encodes pagination state into an opaque, signed cursor string.
+
+    :param data: The pagination state, e.g. the id of the last returned record.
+    :type data: dict
+    :return: The URL-safe cursor.
+    :rtype: str
+    """
+    payload = json.dumps(data, separators=(",", ":")).encode()
+
+    return base64.urlsafe_b64encode(payload + _sign(payload)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict | None:
+    """
+    Decodes a cursor created by encode_cursor.
+
+    :param cursor: The cursor string received from the client.
+    :type cursor: str
+    :return: The pagination state, or None if the cursor is malformed or its signature does not match.
+    :rtype: Optional[dict]
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except ValueError:
+        return None
+
+    payload, signature = raw[:-SIGNATURE_LENGTH], raw[-SIGNATURE_LENGTH:]
+
+    if not payload or not hmac.compare_digest(signature, _sign(payload)):
+        return None
+
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return None
+
+    return data if isinstance(data, dict) else None
@@ -1,10 +1,10 @@
-def get_response_data(data, *, detail=None, total=None):
+def get_response_data(data, *, detail=None, total=None, next_cursor=None, total_estimate=None):
     response = {
         "data": data,
         "detail": detail,
     }
 
-    if total is not None:
-        response["meta"] = {"total": total}
+    if total is not None or total_estimate is not None:
+        response["meta"] = {"total": total, "next_cursor": next_cursor, "total_estimate": total_estimate}
 
     return response
@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache whose entries expire after a time to live.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default=None):
+        item = self._items.get(key)
+
+        if item is None:
+            return default
+
+        expires_at, value = item
+
+        if expires_at <= time.monotonic():
+            del self._items[key]
+            return default
+
+        self._items.move_to_end(key)
+
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+
+        self._items[key] = (expires_at, value)
+        self._items.move_to_end(key)
+
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def pop(self, key: Hashable, default=None):
+        item = self._items.pop(key, None)
+
+        return default if item is None else item[1]
+
+    def discard_where(self, predicate: Callable[[Any], bool]):
+        """
+        Removes every entry whose value matches the predicate. Runs in linear time, so it is meant for rare events.
+        """
+        for key in [key for key, (_, value) in self._items.items() if predicate(value)]:
+            del self._items[key]
+
+    def clear(self):
+        self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key: Hashable):
+        return self.get(key) is not None
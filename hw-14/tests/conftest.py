@@ -1,16 +1,20 @@
 import asyncio
+from contextlib import contextmanager
+from unittest.mock import AsyncMock
 
 import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
-from sqlalchemy import StaticPool
+from sqlalchemy import StaticPool, event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from main import app
-from src.database.db import get_db
+from src.database.cache import get_cache
+from src.database.db import get_db, get_session_maker, get_session_router, SessionRouter
 from src.entity import Base, User
 from src.services.auth import auth_service
+from src.services.user_cache import user_cache
 
 DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
@@ -27,12 +31,15 @@ test_user = {
 
 @pytest.fixture(scope="module", autouse=True)
 def init_models_wrap():
+    # Users are recreated for every module, so users cached in-process by a previous module are stale.
+    user_cache.local.clear()
+
     async def init_models():
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.drop_all)
             await conn.run_sync(Base.metadata.create_all)
         async with TestingSessionLocal() as session:
-            hash_password = auth_service.get_password_hash(test_user["password"])
+            hash_password = await auth_service.get_password_hash(test_user["password"])
 
             current_user = User(email=test_user["email"], password=hash_password,
                                 is_confirmed=True, role="admin")
@@ -54,7 +61,18 @@ def client():
         finally:
             await session.close()
 
+    def override_get_cache():
+        mocked_cache = AsyncMock()
+        mocked_cache.get.return_value = None
+        mocked_cache.hget.return_value = None
+        # The rate limiter script: allowed.
+        mocked_cache.evalsha.return_value = [1, 0, 0]
+        return mocked_cache
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_cache] = override_get_cache
+    app.dependency_overrides[get_session_maker] = lambda: TestingSessionLocal
+    app.dependency_overrides[get_session_router] = lambda: SessionRouter(TestingSessionLocal)
 
     yield TestClient(app)
 
@@ -62,3 +80,29 @@ def client():
 @pytest.fixture(scope="module")
 def token():
     return auth_service.create_access_token(data={"sub": test_user["email"]})
+
+
+@pytest.fixture
+def assert_max_queries():
+    """
+    Fails the test if more than the given number of statements are executed inside the block, e.g. when a
+    listing lazy loads a relationship per row.
+    """
+    @contextmanager
+    def assert_max_queries(limit: int):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+        assert len(statements) <= limit, (
+            f"{len(statements)} statements executed, expected at most {limit}:\n" + "\n".join(statements)
+        )
+
+    return assert_max_queries
@@ -1,10 +1,18 @@
-from unittest.mock import MagicMock
+import asyncio
+from unittest.mock import AsyncMock
 
+from redis.exceptions import ConnectionError
+from sqlalchemy import select
 from starlette import status
 import pytest
 
+from main import app
 from src.config.constants import APIRoutes, Messages
+from src.database.cache import get_cache
+from src.entity import MailOutbox, RefreshTokenFamily
 import src.repository.user as user_repository
+from src.services.auth import auth_service
+from src.services.mail import EmailTypeEnum
 
 from tests.conftest import TestingSessionLocal
 
@@ -13,9 +21,39 @@ AUTH_ROUTE_PREFIX = f'{APIRoutes.API_ROUTE_PREFIX}{APIRoutes.API_AUTH_ROUTE_PREF
 user_data = {"email": "ivan@gmail.com", "password": "12345678"}
 
 
-def test_signup(client, monkeypatch):
-    monkeypatch.setattr('src.services.mail.mail_service.send_mail', MagicMock())
+@pytest.fixture
+def cache(client):
+    mocked_cache = AsyncMock()
+    mocked_cache.get.return_value = None
+    mocked_cache.hget.return_value = None
+    override_get_cache = app.dependency_overrides[get_cache]
+    app.dependency_overrides[get_cache] = lambda: mocked_cache
 
+    yield mocked_cache
+
+    app.dependency_overrides[get_cache] = override_get_cache
+
+
+def signin(client) -> str:
+    response = client.post(f'{AUTH_ROUTE_PREFIX}/signin', json=user_data)
+    assert response.status_code == status.HTTP_200_OK, response.text
+
+    return response.json()['data']['refresh_token']
+
+
+def is_family_revoked(refresh_token: str) -> bool:
+    async def get_family():
+        async with TestingSessionLocal() as session:
+            return await session.get(RefreshTokenFamily, auth_service.decode_refresh_token(refresh_token)['fid'])
+
+    return asyncio.run(get_family()).revoked_at is not None
+
+
+def refresh(client, refresh_token: str):
+    return client.post(f'{AUTH_ROUTE_PREFIX}/refresh-token', headers={'Authorization': f'Bearer {refresh_token}'})
+
+
+def test_signup(client):
     response = client.post(
         f'{AUTH_ROUTE_PREFIX}/signup',
         json=user_data
@@ -27,9 +65,16 @@ def test_signup(client, monkeypatch):
     assert 'id' in data
     assert "password" not in data
 
+    async def get_mails():
+        async with TestingSessionLocal() as session:
+            return (await session.execute(select(MailOutbox).filter_by(recipient=user_data['email']))).scalars().all()
+
+    # The confirmation email is queued in the outbox with the user.
+    assert [mail.template for mail in asyncio.run(get_mails())] == [EmailTypeEnum.CONFIRM_EMAIL.value]
+
 
 def test_signup_repeat(client, monkeypatch):
-    monkeypatch.setattr('src.services.mail.mail_service.send_mail', MagicMock())
+    monkeypatch.setattr('src.services.mail.mail_service.queue_mail', AsyncMock())
 
     response = client.post(
         f'{AUTH_ROUTE_PREFIX}/signup',
@@ -87,4 +132,66 @@ def test_signin_invalid_email(client):
 
     assert response.status_code == status.HTTP_401_UNAUTHORIZED, response.text
     message = response.json()['message']
-    assert message == Messages.INVALID_CREDENTIALS
\ No newline at end of file
+    assert message == Messages.INVALID_CREDENTIALS
+
+
+def test_refresh_token(client, cache):
+    refresh_token = signin(client)
+    cache.evalsha.return_value = [1, 3_600_000]
+
+    response = refresh(client, refresh_token)
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    new_refresh_token = response.json()['data']['refresh_token']
+    assert new_refresh_token != refresh_token
+    assert auth_service.decode_refresh_token(new_refresh_token)['fid'] == \
+        auth_service.decode_refresh_token(refresh_token)['fid']
+
+
+def test_refresh_token_family_not_in_redis(client, cache):
+    refresh_token = signin(client)
+    cache.evalsha.return_value = [0, 0]
+
+    response = refresh(client, refresh_token)
+
+    # The token may have been rotated already, Redis can not tell any more.
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED, response.text
+    assert is_family_revoked(refresh_token)
+
+
+def test_refresh_token_redis_unavailable(client, cache):
+    refresh_token = signin(client)
+    cache.evalsha.side_effect = ConnectionError('down')
+
+    response = refresh(client, refresh_token)
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED, response.text
+    assert is_family_revoked(refresh_token)
+
+
+def test_refresh_token_reused(client, cache):
+    refresh_token = signin(client)
+    cache.evalsha.return_value = [-1, 0]
+
+    response = refresh(client, refresh_token)
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED, response.text
+    assert is_family_revoked(refresh_token)
+
+
+def test_logout(client, cache):
+    refresh_token = signin(client)
+    other_device_refresh_token = signin(client)
+
+    response = client.post(f'{AUTH_ROUTE_PREFIX}/logout', headers={'Authorization': f'Bearer {refresh_token}'})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    cache.delete.assert_awaited_once_with(
+        f"refresh:family:{auth_service.decode_refresh_token(refresh_token)['fid']}"
+    )
+    assert is_family_revoked(refresh_token)
+    assert not is_family_revoked(other_device_refresh_token)
+
+    cache.evalsha.return_value = [1, 3_600_000]
+
+    assert refresh(client, other_device_refresh_token).status_code == status.HTTP_200_OK
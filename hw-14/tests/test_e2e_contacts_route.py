@@ -1,9 +1,24 @@
+import asyncio
+import json
+import shutil
 from unittest.mock import MagicMock, patch, AsyncMock
 
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from starlette import status
 import pytest
 
+from main import app
 from src.config.constants import APIRoutes
+from src.database.cache import get_cache
+from src.database.db import get_session_router, SessionRouter
+from src.entity import Contact, User
+import src.repository.contact as contact_repository
+from src.schemas.contacts import ContactBaseSchema
+from src.services.auth import auth_service
+from src.services.contacts_archiver import ContactsArchiver
+from src.services.user_cache import user_cache
+from tests.conftest import TestingSessionLocal
 
 CONTACTS_ROUTE_PREFIX = f'{APIRoutes.API_ROUTE_PREFIX}{APIRoutes.API_CONTACTS_ROUTE_PREFIX}'
 
@@ -17,14 +32,11 @@ contact_data = {
 
 contact_id = 1
 
-def test_create_contact(client, token, monkeypatch):
+def test_create_contact(client, token):
     mocked_redis = MagicMock
     mocked_redis.get = AsyncMock(return_value=None)
 
     with patch('src.database.cache.get_cache', mocked_redis):
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.redis', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.identifier', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.http_callback', AsyncMock())
         headers = {'Authorization': f'Bearer {token}'}
         response = client.post(
             CONTACTS_ROUTE_PREFIX,
@@ -41,14 +53,11 @@ def test_create_contact(client, token, monkeypatch):
         assert data['phone'] == contact_data['phone']
 
 
-def test_get_contact(client, token, monkeypatch):
+def test_get_contact(client, token):
     mocked_redis = MagicMock
     mocked_redis.get = AsyncMock(return_value=None)
 
     with patch('src.database.cache.get_cache', mocked_redis):
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.redis', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.identifier', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.http_callback', AsyncMock())
         headers = {'Authorization': f'Bearer {token}'}
         response = client.get(
             f'{CONTACTS_ROUTE_PREFIX}/{contact_id}',
@@ -61,33 +70,101 @@ def test_get_contact(client, token, monkeypatch):
         assert data['id'] == contact_id
 
 
-def test_get_contacts(client, token, monkeypatch):
+def test_get_contacts(client, token, assert_max_queries):
     mocked_redis = MagicMock
     mocked_redis.get = AsyncMock(return_value=None)
 
     with patch('src.database.cache.get_cache', mocked_redis):
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.redis', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.identifier', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.http_callback', AsyncMock())
         headers = {'Authorization': f'Bearer {token}'}
-        response = client.get(
-            CONTACTS_ROUTE_PREFIX,
-            headers=headers,
-        )
+        # The current user and the page with its total.
+        with assert_max_queries(2):
+            response = client.get(
+                CONTACTS_ROUTE_PREFIX,
+                headers=headers,
+            )
 
         assert response.status_code == status.HTTP_200_OK, response.text
         contacts = response.json()['data']
         assert contacts[0]['id'] == contact_id
+        assert response.json()['meta']['total'] == 1
+
+
+def test_get_contacts_birthday(client, token, assert_max_queries):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with assert_max_queries(2):
+        response = client.get(f'{CONTACTS_ROUTE_PREFIX}/birthday', headers=headers, params={'birthday_days': 365})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()['data'][0]['id'] == contact_id
+
+
+@pytest.mark.parametrize('birthday_days', [-1, 367, 5_000_000])
+def test_get_contacts_birthday_days_out_of_range(client, token, birthday_days):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get(f'{CONTACTS_ROUTE_PREFIX}/birthday', headers=headers,
+                          params={'birthday_days': birthday_days})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY, response.text
+
+
+def test_get_contacts_not_modified(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get(CONTACTS_ROUTE_PREFIX, headers=headers)
+    etag = response.headers['etag']
+    not_modified = client.get(CONTACTS_ROUTE_PREFIX, headers={**headers, 'If-None-Match': etag})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.headers['etag'] == etag
+    assert not_modified.content == b''
+
+
+def test_search_contacts(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get(CONTACTS_ROUTE_PREFIX, headers=headers, params={'search': 'vano'})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()['data'][0]['id'] == contact_id
+
+    response = client.get(CONTACTS_ROUTE_PREFIX, headers=headers, params={'search': 'I_an'})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()['data'] == []
+
 
+def test_get_contacts_cursor(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
 
-def test_update_contact(client, token, monkeypatch):
+    response = client.get(CONTACTS_ROUTE_PREFIX, headers=headers, params={'limit': 1})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    next_cursor = response.json()['meta']['next_cursor']
+    assert next_cursor is not None
+
+    response = client.get(CONTACTS_ROUTE_PREFIX, headers=headers, params={'limit': 1, 'cursor': next_cursor})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()['data'] == []
+    assert response.json()['meta']['next_cursor'] is None
+
+
+def test_get_contacts_invalid_cursor(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get(CONTACTS_ROUTE_PREFIX, headers=headers, params={'cursor': 'eyJpZCI6MX0'})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, response.text
+
+
+def test_update_contact(client, token):
     mocked_redis = MagicMock
     mocked_redis.get = AsyncMock(return_value=None)
 
     with patch('src.database.cache.get_cache', mocked_redis):
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.redis', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.identifier', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.http_callback', AsyncMock())
         headers = {'Authorization': f'Bearer {token}'}
 
         new_name = 'Petr'
@@ -106,14 +183,27 @@ def test_update_contact(client, token, monkeypatch):
         assert data['name'] == new_name
 
 
-def test_update_contact_not_exist(client, token, monkeypatch):
+def test_update_contact_partial(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.patch(
+        f'{CONTACTS_ROUTE_PREFIX}/{contact_id}',
+        headers=headers,
+        json={'phone': '987654321'}
+    )
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    data = response.json()['data']
+    assert data['phone'] == '987654321'
+    assert data['name'] == 'Petr'
+    assert data['surname'] == contact_data['surname']
+
+
+def test_update_contact_not_exist(client, token):
     mocked_redis = MagicMock
     mocked_redis.get = AsyncMock(return_value=None)
 
     with patch('src.database.cache.get_cache', mocked_redis):
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.redis', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.identifier', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.http_callback', AsyncMock())
         headers = {'Authorization': f'Bearer {token}'}
 
         new_name = 'Petr'
@@ -130,14 +220,11 @@ def test_update_contact_not_exist(client, token, monkeypatch):
         assert response.status_code == status.HTTP_404_NOT_FOUND, response.text
 
 
-def test_delete_contact(client, token, monkeypatch):
+def test_delete_contact(client, token):
     mocked_redis = MagicMock
     mocked_redis.get = AsyncMock(return_value=None)
 
     with patch('src.database.cache.get_cache', mocked_redis):
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.redis', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.identifier', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.http_callback', AsyncMock())
         headers = {'Authorization': f'Bearer {token}'}
         response = client.delete(
             f'{CONTACTS_ROUTE_PREFIX}/{contact_id}',
@@ -147,18 +234,211 @@ def test_delete_contact(client, token, monkeypatch):
         assert response.status_code == status.HTTP_200_OK, response.text
 
 
-def test_delete_not_exist_contact(client, token, monkeypatch):
+def test_delete_not_exist_contact(client, token):
     mocked_redis = MagicMock
     mocked_redis.get = AsyncMock(return_value=None)
 
     with patch('src.database.cache.get_cache', mocked_redis):
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.redis', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.identifier', AsyncMock())
-        monkeypatch.setattr('fastapi_limiter.FastAPILimiter.http_callback', AsyncMock())
         headers = {'Authorization': f'Bearer {token}'}
         response = client.delete(
             f'{CONTACTS_ROUTE_PREFIX}/{contact_id}',
             headers=headers,
         )
 
-        assert response.status_code == status.HTTP_404_NOT_FOUND, response.text
\ No newline at end of file
+        assert response.status_code == status.HTTP_404_NOT_FOUND, response.text
+
+def test_create_contacts_bulk_ndjson(client, token):
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/x-ndjson'}
+    body = '\n'.join([
+        json.dumps({**contact_data, 'name': 'Bulk1'}),
+        json.dumps({**contact_data, 'birthday': 'not a date'}),
+        '',
+        json.dumps({**contact_data, 'name': 'Bulk2'}),
+    ])
+
+    response = client.post(f'{CONTACTS_ROUTE_PREFIX}/bulk', headers=headers, content=body)
+
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    data = response.json()['data']
+    assert data['created'] == 2
+    assert [error['line'] for error in data['errors']] == [2]
+
+
+def test_create_contacts_bulk_csv(client, token):
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'text/csv'}
+    body = 'name,surname,email,phone,birthday\nBulk3,Ivanov,bulk3@example.com,123,2000-02-29\n'
+
+    response = client.post(f'{CONTACTS_ROUTE_PREFIX}/bulk', headers=headers, content=body)
+
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    assert response.json()['data'] == {'created': 1, 'errors': []}
+
+
+def test_create_contacts_bulk_unsupported_type(client, token):
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'text/plain'}
+
+    response = client.post(f'{CONTACTS_ROUTE_PREFIX}/bulk', headers=headers, content='name')
+
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, response.text
+
+
+def test_create_contacts_bulk_line_too_long(client, token, monkeypatch):
+    monkeypatch.setattr('src.config.config.config.CONTACTS_IMPORT_MAX_LINE_LENGTH', 200)
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/x-ndjson'}
+
+    for body in [json.dumps({**contact_data, 'name': 'x' * 200}) + '\n', 'x' * 1000]:
+        response = client.post(f'{CONTACTS_ROUTE_PREFIX}/bulk', headers=headers, content=body)
+
+        assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, response.text
+
+
+@pytest.fixture
+def export_user():
+    """
+    A user with two contacts of its own, removed after the test.
+    """
+    user = User(email='olena.export@gmail.com', password='x', is_confirmed=True)
+
+    async def create():
+        async with TestingSessionLocal() as session:
+            session.add(user)
+            await session.commit()
+
+            for name in ['Export1', 'Export2']:
+                await contact_repository.create_contact(ContactBaseSchema(**{**contact_data, 'name': name}),
+                                                        user.id, session)
+
+    async def remove():
+        async with TestingSessionLocal() as session:
+            await session.execute(delete(Contact).filter_by(user_id=user.id))
+            await session.execute(delete(User).filter_by(id=user.id))
+            await session.commit()
+
+    asyncio.run(create())
+    yield user
+    asyncio.run(remove())
+    user_cache.local.pop(user.email)
+
+
+@pytest.mark.parametrize('contacts_format, expected_lines', [('ndjson', 2), ('csv', 3)])
+def test_export_contacts(client, export_user, contacts_format, expected_lines):
+    headers = {'Authorization': f'Bearer {auth_service.create_access_token(data={"sub": export_user.email})}'}
+
+    response = client.get(f'{CONTACTS_ROUTE_PREFIX}/export', headers=headers, params={'format': contacts_format})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    lines = response.text.splitlines()
+    assert len(lines) == expected_lines
+    assert 'Export1' in lines[-2]
+    assert 'Export2' in lines[-1]
+
+
+def test_get_contacts_all(client, token, assert_max_queries):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    # The owners are joined to the page, not loaded per contact.
+    with assert_max_queries(2):
+        response = client.get(f'{CONTACTS_ROUTE_PREFIX}/all', headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    contacts = response.json()['data']
+    assert len(contacts) == 3
+    assert all(contact['user']['email'] == 'alex.ivanov@gmail.com' for contact in contacts)
+
+
+def test_restore_contact(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post(f'{CONTACTS_ROUTE_PREFIX}/{contact_id}/restore', headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()['data']['id'] == contact_id
+    assert client.get(f'{CONTACTS_ROUTE_PREFIX}/{contact_id}', headers=headers).status_code == status.HTTP_200_OK
+
+
+def test_restore_archived_contact(client, token, monkeypatch):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.delete(f'{CONTACTS_ROUTE_PREFIX}/{contact_id}', headers=headers)
+    monkeypatch.setattr('src.config.config.config.CONTACTS_ARCHIVE_RETENTION_DAYS', -1)
+    archiver = ContactsArchiver(TestingSessionLocal)
+
+    assert asyncio.run(archiver.archive()) == 1
+    assert archiver.get_stats()['archived_total'] == 1
+    assert client.get(f'{CONTACTS_ROUTE_PREFIX}/{contact_id}', headers=headers).status_code == status.HTTP_404_NOT_FOUND
+
+    response = client.post(f'{CONTACTS_ROUTE_PREFIX}/{contact_id}/restore', headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()['data']['id'] == contact_id
+    assert client.get(f'{CONTACTS_ROUTE_PREFIX}/{contact_id}', headers=headers).status_code == status.HTTP_200_OK
+
+
+def test_restore_not_deleted_contact(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post(f'{CONTACTS_ROUTE_PREFIX}/{contact_id}/restore', headers=headers)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND, response.text
+
+
+def test_get_contact_from_replica(client, token, tmp_path):
+    headers = {'Authorization': f'Bearer {token}'}
+    reader = User(email='olena.reader@gmail.com', password='x', is_confirmed=True)
+    reader_headers = {'Authorization': f'Bearer {auth_service.create_access_token(data={"sub": reader.email})}'}
+
+    async def add_reader():
+        async with TestingSessionLocal() as session:
+            session.add(reader)
+            await session.commit()
+
+    asyncio.run(add_reader())
+
+    # The replica is a snapshot of the primary taken before the contacts below are created.
+    shutil.copy('test.db', tmp_path / 'replica.db')
+    replica_engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "replica.db"}')
+    replica = async_sessionmaker(expire_on_commit=False, bind=replica_engine)
+    # Only the sticky marks are kept, everything else misses the cache.
+    sticky = {}
+
+    async def cache_set(key, value, **kwargs):
+        if key.startswith('db:sticky:'):
+            sticky[key] = value
+        return True
+
+    cache = AsyncMock()
+    cache.set.side_effect = cache_set
+    cache.get.side_effect = lambda key: sticky.get(key)
+    cache.hget.return_value = None
+    cache.evalsha.return_value = [1, 0, 0]
+    get_cache_override = app.dependency_overrides[get_cache]
+    app.dependency_overrides[get_cache] = lambda: cache
+    app.dependency_overrides[get_session_router] = lambda: SessionRouter(TestingSessionLocal, replica)
+
+    async def add_reader_contact():
+        async with TestingSessionLocal() as session:
+            contact = await contact_repository.create_contact(ContactBaseSchema(
+                name='Petro', surname='Replica', email='petro.replica@gmail.com', phone='0501234598',
+                birthday='1990-02-02',
+            ), reader.id, session)
+            return contact.id
+
+    try:
+        response = client.post(CONTACTS_ROUTE_PREFIX, json={
+            'name': 'Olena', 'surname': 'Replica', 'email': 'olena.replica@gmail.com', 'phone': '0501234599',
+            'birthday': '1990-02-01',
+        }, headers=headers)
+        new_contact_id = response.json()['data']['id']
+
+        assert response.status_code == status.HTTP_201_CREATED, response.text
+        # The writer reads its own write from the primary.
+        assert client.get(f'{CONTACTS_ROUTE_PREFIX}/{new_contact_id}', headers=headers).status_code == \
+            status.HTTP_200_OK
+
+        # The reader has not written through the API, so its reads go to the lagging replica.
+        reader_contact_id = asyncio.run(add_reader_contact())
+        assert client.get(f'{CONTACTS_ROUTE_PREFIX}/{reader_contact_id}', headers=reader_headers).status_code == \
+            status.HTTP_404_NOT_FOUND
+    finally:
+        app.dependency_overrides[get_cache] = get_cache_override
+        app.dependency_overrides[get_session_router] = lambda: SessionRouter(TestingSessionLocal)
+        asyncio.run(replica_engine.dispose())
@@ -0,0 +1,47 @@
+from unittest.mock import MagicMock
+
+import pytest
+from starlette import status
+
+from main import app
+from src.config.constants import APIRoutes
+from src.services.storage import LocalStorage, get_avatar_storage
+
+USERS_ROUTE_PREFIX = f'{APIRoutes.API_ROUTE_PREFIX}{APIRoutes.API_USERS_ROUTE_PREFIX}'
+
+image = b'\x89PNG\r\n\x1a\n' + b'avatar' * 100
+
+
+@pytest.fixture()
+def storage(tmp_path):
+    storage = LocalStorage(tmp_path, '/media')
+    app.dependency_overrides[get_avatar_storage] = lambda: storage
+    yield storage
+    del app.dependency_overrides[get_avatar_storage]
+
+
+def test_upload_avatar(client, token, storage):
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.patch(
+        f'{USERS_ROUTE_PREFIX}/avatar',
+        files={'file': ('avatar.png', image, 'image/png')},
+        headers=headers,
+    )
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    avatar = response.json()['data']['avatar']
+    assert avatar.startswith('/media/avatars/')
+    assert (storage.directory / avatar.removeprefix('/media/')).read_bytes() == image
+
+
+def test_upload_same_avatar(client, token, storage, monkeypatch):
+    headers = {'Authorization': f'Bearer {token}'}
+    files = {'file': ('avatar.png', image, 'image/png')}
+    first = client.patch(f'{USERS_ROUTE_PREFIX}/avatar', files=files, headers=headers)
+    monkeypatch.setattr(storage, 'save', MagicMock())
+
+    second = client.patch(f'{USERS_ROUTE_PREFIX}/avatar', files=files, headers=headers)
+
+    assert second.status_code == status.HTTP_200_OK, second.text
+    assert second.json()['data']['avatar'] == first.json()['data']['avatar']
+    storage.save.assert_not_called()
@@ -7,7 +7,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.entity import Contact, User
 import src.repository.contact as contact_repository
-from src.schemas.contacts import ContactBaseSchema
+from src.schemas.contacts import ContactBaseSchema, ContactSchema
 
 
 test_contact = {
@@ -50,24 +50,91 @@ class TestContactRepository(unittest.IsolatedAsyncioTestCase):
         self.session.execute.assert_awaited()
 
     async def test_get_contacts(self):
+        rows = [MagicMock(id=contact_id, total=3) for contact_id in range(1, 4)]
+
+        self.session.execute = AsyncMock()
+        self.session.execute.return_value = MagicMock()
+        self.session.execute.return_value.all.return_value = rows
+
+        [result_contacts, count] = await contact_repository.get_contacts(
+            offset=0, limit=10, search=None, user_id=str(self.user.id), db=self.session
+        )
+
+        self.assertEqual(result_contacts, rows)
+        self.assertEqual(count, len(rows))
+        self.session.execute.assert_awaited_once()
+
+    async def test_get_contacts_with_user(self):
         contacts = [
             Contact(id=1, user_id=str(self.user.id)),
             Contact(id=2, user_id=str(self.user.id)),
-            Contact(id=3, user_id=str(self.user.id))
         ]
 
         self.session.execute = AsyncMock()
         self.session.execute.return_value = MagicMock()
-        self.session.execute.return_value.scalars().all.return_value = contacts
-        self.session.execute.return_value.scalar_one_or_none.return_value = len(contacts)
+        self.session.execute.return_value.all.return_value = [MagicMock(total=2) for _ in contacts]
+        for row, contact in zip(self.session.execute.return_value.all.return_value, contacts):
+            row.__getitem__.return_value = contact
 
         [result_contacts, count] = await contact_repository.get_contacts(
-            offset=0, limit=10, search=None, user_id=str(self.user.id), db=self.session
+            offset=0, limit=10, search=None, user_id=None, db=self.session, with_user=True
         )
 
         self.assertEqual(result_contacts, contacts)
         self.assertEqual(count, len(contacts))
-        self.session.execute.assert_awaited()
+        self.session.execute.assert_awaited_once()
+
+    def test_get_contacts_page_query_columns(self):
+        query = contact_repository.get_contacts_page_query(0, 10, "", str(self.user.id))
+        query_with_user = contact_repository.get_contacts_page_query(0, 10, "", None, with_user=True)
+
+        self.assertEqual([column.name for column in query.selected_columns], list(ContactSchema.model_fields))
+        self.assertIn("JOIN users", str(query_with_user))
+
+    async def test_get_contacts_without_total(self):
+        contacts = [MagicMock(id=1)]
+
+        self.session.execute = AsyncMock()
+        self.session.execute.return_value = MagicMock()
+        self.session.execute.return_value.all.return_value = contacts
+
+        [result_contacts, count] = await contact_repository.get_contacts(
+            offset=0, limit=10, search=None, user_id=str(self.user.id), db=self.session, with_total=False
+        )
+
+        self.assertEqual(result_contacts, contacts)
+        self.assertIsNone(count)
+        self.session.execute.assert_awaited_once()
+
+    async def test_get_contacts_birthday(self):
+        contacts = [MagicMock(id=1)]
+
+        self.session.execute = AsyncMock()
+        self.session.execute.return_value = MagicMock()
+        self.session.execute.return_value.all.return_value = contacts
+
+        result = await contact_repository.get_contacts_birthday(
+            birthday_days=7, user_id=str(self.user.id), db=self.session
+        )
+
+        self.assertEqual(result, contacts)
+        self.session.execute.assert_awaited_once()
+
+    async def test_get_contacts_birthday_whole_year(self):
+        self.session.execute = AsyncMock(return_value=MagicMock())
+
+        # Past the last representable date, every birthday matches anyway.
+        await contact_repository.get_contacts_birthday(
+            birthday_days=5_000_000, user_id=str(self.user.id), db=self.session
+        )
+
+        self.session.execute.assert_awaited_once()
+
+    def test_get_month_day(self):
+        self.assertEqual(contact_repository.get_month_day(datetime.date(2024, 12, 31)), 1231)
+        self.assertEqual(contact_repository.get_month_day(datetime.date(2024, 2, 28)), 228)
+        self.assertEqual(contact_repository.get_month_day(datetime.date(2024, 2, 29)), 229)
+        self.assertEqual(contact_repository.get_month_day(datetime.date(2025, 2, 28)), 229)
 
     async def test_create_contact(self):
         contact = Contact(**test_contact,id=1, user_id=str(self.user.id))
@@ -99,6 +166,8 @@ class TestContactRepository(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(contact.email, result.email)
         self.assertEqual(contact.name, result.name)
+        self.session.execute.assert_awaited_once()
+        self.session.refresh.assert_not_awaited()
 
 
     async def test_delete_contact(self):
@@ -117,6 +186,7 @@ class TestContactRepository(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(contact.email, result.email)
         self.assertEqual(contact.name, result.name)
+        self.session.execute.assert_awaited_once()
 
 
 if __name__ == '__main__':
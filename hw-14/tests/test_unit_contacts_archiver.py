@@ -0,0 +1,39 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.config.config import config
+from src.services.contacts_archiver import ContactsArchiver
+
+
+class TestContactsArchiver(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.archiver = ContactsArchiver(MagicMock())
+
+    @patch("src.services.contacts_archiver.asyncio.sleep", new_callable=AsyncMock)
+    @patch("src.repository.contact.archive_contacts", new_callable=AsyncMock)
+    async def test_archive_in_batches(self, archive_contacts, sleep):
+        batch_size = config.CONTACTS_ARCHIVE_BATCH_SIZE
+        archive_contacts.side_effect = [batch_size, batch_size, 3]
+
+        archived = await self.archiver.archive()
+
+        self.assertEqual(archived, batch_size * 2 + 3)
+        self.assertEqual(archive_contacts.await_count, 3)
+        self.assertEqual(sleep.await_count, 2)
+
+        stats = self.archiver.get_stats()
+        self.assertEqual(stats["runs"], 1)
+        self.assertEqual(stats["batches"], 3)
+        self.assertEqual(stats["archived_total"], archived)
+        self.assertFalse(stats["running"])
+
+    @patch("src.repository.contact.archive_contacts", new_callable=AsyncMock)
+    async def test_archive_nothing(self, archive_contacts):
+        archive_contacts.return_value = 0
+
+        self.assertEqual(await self.archiver.archive(), 0)
+        self.assertEqual(self.archiver.get_stats()["batches"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
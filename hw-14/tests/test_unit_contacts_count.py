@@ -0,0 +1,38 @@
+import unittest
+from unittest.mock import AsyncMock
+
+from src.config.config import config
+from src.services.contacts_count import ContactsCountCache
+
+
+class TestContactsCountCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = AsyncMock()
+        self.count_cache = ContactsCountCache()
+
+    async def test_get(self):
+        self.cache.hget.return_value = b'42'
+
+        total = await self.count_cache.get('user-id', 'abc', 'test', self.cache)
+
+        self.assertEqual(total, 42)
+        self.cache.hget.assert_awaited_once_with('contacts:count:user-id:abc', 'test')
+
+    async def test_get_miss(self):
+        self.cache.hget.return_value = None
+
+        self.assertIsNone(await self.count_cache.get('user-id', 'abc', 'test', self.cache))
+
+    async def test_set(self):
+        await self.count_cache.set('user-id', 'abc', 'test', 42, self.cache)
+
+        self.cache.hset.assert_awaited_once_with('contacts:count:user-id:abc', 'test', 42)
+        self.cache.expire.assert_awaited_once_with('contacts:count:user-id:abc', config.CONTACTS_COUNT_CACHE_TTL,
+                                                   nx=True)
+
+    async def test_versions_do_not_share_totals(self):
+        self.assertNotEqual(ContactsCountCache.get_key('user-id', 'abc'), ContactsCountCache.get_key('user-id', 'def'))
+
+
+if __name__ == '__main__':
+    unittest.main()
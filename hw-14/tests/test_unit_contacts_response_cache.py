@@ -0,0 +1,81 @@
+import datetime
+import unittest
+from unittest.mock import AsyncMock
+
+from starlette.requests import Request
+
+from src.config.config import config
+from src.entity import Contact
+from src.schemas.serializers import contact_response_serializer
+from src.services.contacts_response_cache import ContactsResponseCache
+
+contact = Contact(id=1, name='Test', surname='Test', email='test@gmail.com', phone='1234567890',
+                  birthday=datetime.date(2000, 1, 1), created_at=datetime.datetime(2024, 1, 1),
+                  updated_at=datetime.datetime(2024, 1, 1))
+
+
+def get_request(headers: dict = None) -> Request:
+    return Request({
+        'type': 'http',
+        'method': 'GET',
+        'path': '/api/contacts/1',
+        'query_string': b'',
+        'headers': [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+    })
+
+
+class TestContactsResponseCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = AsyncMock()
+        self.response_cache = ContactsResponseCache()
+        self.load = AsyncMock(return_value={'data': contact, 'detail': None})
+
+    async def test_miss(self):
+        self.cache.get.return_value = None
+
+        response = await self.response_cache.respond(
+            get_request(), 'user-id', self.cache, self.load, contact_response_serializer.dump_single
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.load.assert_awaited_once()
+        key, entry = self.cache.set.await_args.args
+        self.assertTrue(key.startswith('contacts:response:user-id:0:'))
+        self.assertEqual(entry, response.headers['etag'].encode() + b'\n' + response.body)
+
+    async def test_hit(self):
+        self.cache.get.side_effect = [b'3', b'"etag"\n{"data":null}']
+
+        response = await self.response_cache.respond(
+            get_request(), 'user-id', self.cache, self.load, contact_response_serializer.dump_single
+        )
+
+        self.assertEqual(response.body, b'{"data":null}')
+        self.assertEqual(response.headers['etag'], '"etag"')
+        self.assertIn(':3:', self.cache.get.await_args.args[0])
+        self.load.assert_not_awaited()
+
+    async def test_not_modified(self):
+        self.cache.get.side_effect = [b'3', b'"etag"\n{"data":null}']
+
+        response = await self.response_cache.respond(
+            get_request({'If-None-Match': 'W/"other", "etag"'}), 'user-id', self.cache, self.load,
+            contact_response_serializer.dump_single
+        )
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.body, b'')
+
+    async def test_invalidate(self):
+        await self.response_cache.invalidate('user-id', self.cache)
+        await self.response_cache.invalidate('user-id', self.cache)
+
+        (key, first), options = self.cache.set.await_args_list[0]
+        (_, second), _ = self.cache.set.await_args_list[1]
+        self.assertEqual(key, ContactsResponseCache.get_version_key('user-id'))
+        self.assertNotIn(first, (second, '0'))
+        self.assertGreater(options['ex'], config.CONTACTS_RESPONSE_CACHE_TTL)
+
+
+if __name__ == '__main__':
+    unittest.main()
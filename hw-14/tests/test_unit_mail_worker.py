@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from aiosmtplib import SMTPServerDisconnected
+
+from src.config.config import config
+from src.entity import MailOutbox
+from src.services.mail import EmailTypeEnum, mail_service
+from src.services.mail_worker import MailWorker
+
+
+def get_mail(mail_id: int, attempts: int = 1) -> MailOutbox:
+    return MailOutbox(id=mail_id, recipient=f'user{mail_id}@gmail.com', subject='Confirm registration',
+                      template=EmailTypeEnum.CONFIRM_EMAIL.value, body={'host': 'http://test/', 'token': 'abc'},
+                      attempts=attempts)
+
+
+class TestMailWorker(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.session = AsyncMock()
+        session_maker = MagicMock()
+        session_maker.return_value.__aenter__.return_value = self.session
+        self.worker = MailWorker(session_maker)
+
+        self.smtp = AsyncMock()
+        self.smtp.is_connected = True
+        smtp_patcher = patch('src.services.mail_worker.SMTP', return_value=self.smtp)
+        self.smtp_class = smtp_patcher.start()
+        self.addCleanup(smtp_patcher.stop)
+
+    def test_render_message(self):
+        message = mail_service.render_message(get_mail(1))
+
+        self.assertEqual(message['To'], 'user1@gmail.com')
+        self.assertIn('http://test/api/auth/confirm-email/abc', message.get_content())
+
+    @patch('src.repository.mail.set_mails_sent', new_callable=AsyncMock)
+    @patch('src.repository.mail.claim_mails', new_callable=AsyncMock)
+    async def test_send_batch_reuses_connection(self, claim_mails, set_mails_sent):
+        claim_mails.return_value = [get_mail(1), get_mail(2), get_mail(3)]
+
+        result = await self.worker.send_batch()
+
+        self.assertEqual(result, 3)
+        self.smtp_class.assert_called_once()
+        self.smtp.connect.assert_awaited_once()
+        self.assertEqual(self.smtp.send_message.await_count, 3)
+        set_mails_sent.assert_awaited_once_with([1, 2, 3], self.session)
+
+    @patch('src.repository.mail.set_mail_failed', new_callable=AsyncMock)
+    @patch('src.repository.mail.set_mails_sent', new_callable=AsyncMock)
+    @patch('src.repository.mail.claim_mails', new_callable=AsyncMock)
+    async def test_send_batch_retries_with_backoff(self, claim_mails, set_mails_sent, set_mail_failed):
+        claim_mails.return_value = [get_mail(1, attempts=2), get_mail(2, attempts=config.MAIL_MAX_ATTEMPTS)]
+        self.smtp.send_message.side_effect = SMTPServerDisconnected('Connection lost')
+
+        await self.worker.send_batch()
+
+        retried, failed = set_mail_failed.await_args_list
+        self.assertEqual(retried.args[0], 1)
+        self.assertIsNotNone(retried.args[2])
+        self.assertEqual(failed.args[0], 2)
+        self.assertIsNone(failed.args[2])
+        set_mails_sent.assert_awaited_once_with([], self.session)
+
+    @patch('src.repository.mail.set_mail_failed', new_callable=AsyncMock)
+    @patch('src.repository.mail.set_mails_sent', new_callable=AsyncMock)
+    @patch('src.repository.mail.claim_mails', new_callable=AsyncMock)
+    async def test_send_batch_fails_unrenderable_mail(self, claim_mails, set_mails_sent, set_mail_failed):
+        unrenderable = get_mail(2)
+        unrenderable.template = 'unknown_template'
+        claim_mails.return_value = [get_mail(1), unrenderable, get_mail(3)]
+
+        await self.worker.send_batch()
+
+        self.assertEqual(self.smtp.send_message.await_count, 2)
+        set_mail_failed.assert_awaited_once()
+        self.assertEqual(set_mail_failed.await_args.args[0], 2)
+        self.assertIsNone(set_mail_failed.await_args.args[2])
+        set_mails_sent.assert_awaited_once_with([1, 3], self.session)
+
+    def test_retry_delay(self):
+        self.assertEqual(MailWorker.get_retry_delay(1), config.MAIL_RETRY_BASE_DELAY)
+        self.assertEqual(MailWorker.get_retry_delay(2), config.MAIL_RETRY_BASE_DELAY * 2)
+        self.assertEqual(MailWorker.get_retry_delay(100), config.MAIL_RETRY_MAX_DELAY)
+
+
+if __name__ == '__main__':
+    unittest.main()
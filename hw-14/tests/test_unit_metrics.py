@@ -0,0 +1,98 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import redis.asyncio as redis
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database.cache import InstrumentedRedis
+from src.services.metrics import Histogram, Metrics, MetricsMiddleware, RequestTimings, request_timings
+
+
+def create_app(metrics: Metrics) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, request_metrics=metrics)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    return app
+
+
+class TestMetrics(unittest.IsolatedAsyncioTestCase):
+    def test_histogram(self):
+        histogram = Histogram(buckets=(0.1, 1))
+
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.get_cumulative_counts(), [("0.1", 2), ("1", 3), ("+Inf", 4)])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 2.65)
+
+    def test_middleware_sampled(self):
+        metrics = Metrics(sample_rate=1)
+
+        response = TestClient(create_app(metrics)).get("/items/1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("db;dur=", response.headers["server-timing"])
+        self.assertEqual(metrics.latency["GET", "/items/{item_id}", 200].count, 1)
+        self.assertEqual(metrics.routes["GET", "/items/{item_id}"].requests, 1)
+
+    def test_middleware_not_sampled(self):
+        metrics = Metrics(sample_rate=0)
+
+        response = TestClient(create_app(metrics)).get("/items/1")
+
+        self.assertNotIn("server-timing", response.headers)
+        self.assertEqual(metrics.latency["GET", "/items/{item_id}", 200].count, 1)
+        self.assertEqual(metrics.routes, {})
+
+    async def test_instrument_engine(self):
+        metrics = Metrics()
+        engine = create_async_engine("sqlite+aiosqlite://")
+        metrics.instrument_engine(engine)
+        timings = RequestTimings()
+
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            token = request_timings.set(timings)
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(text("SELECT 2"))
+            request_timings.reset(token)
+
+        await engine.dispose()
+
+        self.assertEqual(timings.db_count, 2)
+        self.assertGreater(timings.db_time, 0)
+
+    async def test_instrumented_redis(self):
+        client = InstrumentedRedis()
+        timings = RequestTimings()
+
+        with patch.object(redis.Redis, "execute_command", AsyncMock(return_value=b"1")):
+            await client.execute_command("GET", "key")
+            token = request_timings.set(timings)
+            result = await client.execute_command("GET", "key")
+            request_timings.reset(token)
+
+        self.assertEqual(result, b"1")
+        self.assertEqual(timings.redis_count, 1)
+
+    def test_render(self):
+        metrics = Metrics()
+        metrics.observe_request("GET", "/items/{item_id}", 200, 0.02, RequestTimings())
+        metrics.record_cache("user", True)
+        metrics.record_cache("user", False)
+
+        output = metrics.render({"db_pool": {"in_use": 2}, "redis_pool": None})
+
+        self.assertIn('app_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",status="200",'
+                      'le="0.025"} 1', output)
+        self.assertIn('app_sampled_requests_total{method="GET",route="/items/{item_id}"} 1', output)
+        self.assertIn('app_cache_requests_total{cache="user",result="hit"} 1', output)
+        self.assertIn("app_db_pool_in_use 2", output)
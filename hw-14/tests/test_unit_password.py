@@ -0,0 +1,54 @@
+import asyncio
+import unittest
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from src.services.password import PasswordHasher
+
+password = '12345678'
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.password_hasher = PasswordHasher(rounds=5, max_workers=2, max_pending=1)
+
+    def tearDown(self):
+        self.password_hasher.close()
+
+    async def test_hash_and_verify(self):
+        hashed_password = await self.password_hasher.hash(password)
+
+        self.assertTrue(await self.password_hasher.verify(password, hashed_password))
+        self.assertFalse(await self.password_hasher.verify('87654321', hashed_password))
+        self.assertEqual(self.password_hasher.get_stats()['completed'], 3)
+
+    async def test_verify_and_update_current_hash(self):
+        hashed_password = await self.password_hasher.hash(password)
+
+        result = await self.password_hasher.verify_and_update(password, hashed_password)
+
+        self.assertEqual(result, (True, None))
+
+    async def test_verify_and_update_outdated_hash(self):
+        hashed_password = CryptContext(schemes=['bcrypt'], bcrypt__rounds=4).hash(password)
+
+        is_valid, new_hashed_password = await self.password_hasher.verify_and_update(password, hashed_password)
+
+        self.assertTrue(is_valid)
+        self.assertTrue(new_hashed_password.startswith('$2b$05$'))
+
+    async def test_rejects_when_queue_is_full(self):
+        results = await asyncio.gather(
+            *[self.password_hasher.hash(password) for _ in range(4)], return_exceptions=True
+        )
+
+        rejected = [result for result in results if isinstance(result, HTTPException)]
+        self.assertEqual(len(rejected), 1)
+        self.assertEqual(rejected[0].status_code, 503)
+        self.assertEqual(self.password_hasher.get_stats()['rejected'], 1)
+        self.assertEqual(self.password_hasher.get_stats()['in_flight'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
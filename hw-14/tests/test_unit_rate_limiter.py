@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fastapi import HTTPException
+from redis.exceptions import NoScriptError, ConnectionError
+
+from src.services.rate_limiter import RateLimiter, RATE_LIMIT_SCRIPT, rate_limit
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401, fakeredis runs Lua scripts with it
+except ImportError:
+    fakeredis = None
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = AsyncMock()
+        self.rate_limiter = RateLimiter({"contacts_read": (15, 30)}, "token_bucket")
+
+    async def test_allowed(self):
+        self.cache.evalsha.return_value = [1, 14, 0]
+
+        await self.rate_limiter.check("contacts_read", "user-id", self.cache)
+
+        self.cache.evalsha.assert_awaited_once_with(
+            self.rate_limiter.script_sha, 1, "rate:token_bucket:contacts_read:user-id", "token_bucket", 15, 30000
+        )
+
+    async def test_rejected_locally_until_retry(self):
+        self.cache.evalsha.return_value = [0, 0, 2500]
+
+        with patch("src.services.rate_limiter.time") as clock:
+            clock.monotonic.return_value = 100.0
+
+            with self.assertRaises(HTTPException) as error:
+                await self.rate_limiter.check("contacts_read", "user-id", self.cache)
+
+            self.assertEqual(error.exception.status_code, 429)
+            self.assertEqual(error.exception.headers["Retry-After"], "3")
+
+            # Only the time left until the block ends.
+            clock.monotonic.return_value = 101.2
+
+            with self.assertRaises(HTTPException) as error:
+                await self.rate_limiter.check("contacts_read", "user-id", self.cache)
+
+            self.assertEqual(error.exception.headers["Retry-After"], "2")
+
+        self.cache.evalsha.assert_awaited_once()
+
+    async def test_loads_script(self):
+        self.cache.evalsha.side_effect = [NoScriptError("NOSCRIPT"), [1, 14, 0]]
+
+        await self.rate_limiter.check("contacts_read", "user-id", self.cache)
+
+        self.cache.script_load.assert_awaited_once_with(RATE_LIMIT_SCRIPT)
+        self.assertEqual(self.cache.evalsha.await_count, 2)
+
+    async def test_redis_unavailable(self):
+        self.cache.evalsha.side_effect = ConnectionError("down")
+
+        await self.rate_limiter.check("contacts_read", "user-id", self.cache)
+
+    def test_invalid_configuration(self):
+        with self.assertRaises(ValueError):
+            RateLimiter({"contacts_read": (15, 30)}, "fixed_window")
+
+        with self.assertRaises(ValueError):
+            rate_limit("unknown")
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis[lua] is not installed")
+class TestRateLimitScript(unittest.IsolatedAsyncioTestCase):
+    """
+    Runs RATE_LIMIT_SCRIPT with a limit of 3 requests per 30 seconds. The script takes the time from Redis TIME,
+    which fakeredis reads from time.time, so the clock is moved by hand.
+    """
+
+    async def asyncSetUp(self):
+        self.cache = fakeredis.FakeAsyncRedis()
+        # The start of a 30 seconds window.
+        self.now = 1_699_999_980.0
+        clock = patch("time.time", lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    async def asyncTearDown(self):
+        await self.cache.aclose()
+
+    async def evaluate(self, algorithm: str) -> list[int]:
+        return await RateLimiter({"contacts_read": (3, 30)}, algorithm).evaluate("key", 3, 30, self.cache)
+
+    async def test_token_bucket(self):
+        self.assertEqual([await self.evaluate("token_bucket") for _ in range(3)], [[1, 2, 0], [1, 1, 0], [1, 0, 0]])
+        # A token is refilled every 10 seconds.
+        self.assertEqual(await self.evaluate("token_bucket"), [0, 0, 10000])
+
+        self.now += 4
+        self.assertEqual(await self.evaluate("token_bucket"), [0, 0, 6000])
+
+        self.now += 6
+        self.assertEqual(await self.evaluate("token_bucket"), [1, 0, 0])
+        self.assertEqual(await self.evaluate("token_bucket"), [0, 0, 10000])
+
+        # The bucket is full again after the period, but does not hold more than the limit.
+        self.now += 60
+        self.assertEqual(await self.evaluate("token_bucket"), [1, 2, 0])
+
+    async def test_sliding_window(self):
+        self.assertEqual([await self.evaluate("sliding_window") for _ in range(3)],
+                         [[1, 2, 0], [1, 1, 0], [1, 0, 0]])
+        # Only the current window counts, so the user waits for its end.
+        self.assertEqual(await self.evaluate("sliding_window"), [0, 0, 30000])
+
+        self.now += 15
+        self.assertEqual(await self.evaluate("sliding_window"), [0, 0, 15000])
+
+        # Half way into the next window, the 3 requests of the previous one count as 1.5.
+        self.now += 30
+        self.assertEqual(await self.evaluate("sliding_window"), [1, 0, 0])
+        # 2.5 requests: the next one is allowed once the previous window weighs 1, in 5 seconds.
+        self.assertEqual(await self.evaluate("sliding_window"), [0, 0, 5000])
+
+        self.now += 5
+        self.assertEqual(await self.evaluate("sliding_window"), [1, 0, 0])
+
+        # The previous window is forgotten after a window without requests.
+        self.now += 60
+        self.assertEqual([await self.evaluate("sliding_window") for _ in range(3)],
+                         [[1, 2, 0], [1, 1, 0], [1, 0, 0]])
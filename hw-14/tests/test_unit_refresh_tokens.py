@@ -0,0 +1,124 @@
+import datetime
+import unittest
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError, NoScriptError
+
+from src.entity import User
+from src.services.auth import auth_service
+from src.services.refresh_tokens import RefreshTokenStore, ROTATE_SCRIPT
+
+REPOSITORY = "src.services.refresh_tokens.refresh_token_repository"
+
+
+class TestRefreshTokenStore(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = AsyncMock()
+        self.db = AsyncMock()
+        self.store = RefreshTokenStore(token_ttl=60, family_ttl=3600)
+        self.user = User(id=uuid.uuid4(), email='test@gmail.com')
+        self.family = MagicMock(expires_at=datetime.datetime.utcnow() + datetime.timedelta(hours=1))
+
+    def get_token(self, family_id='family', jti='jti'):
+        return self.store.issue(self.user.email, family_id, jti, self.family.expires_at)
+
+    @patch(f"{REPOSITORY}.create_family", new_callable=AsyncMock)
+    async def test_create_family(self, create_family):
+        token = await self.store.create_family(self.user, self.db, self.cache)
+        claims = auth_service.decode_refresh_token(token)
+
+        self.assertEqual(claims['sub'], self.user.email)
+        create_family.assert_awaited_once()
+        self.cache.set.assert_awaited_once()
+        self.assertEqual(self.cache.set.await_args.args[:2], (f"refresh:family:{claims['fid']}", claims['jti']))
+
+    async def test_rotate(self):
+        self.cache.evalsha.return_value = [1, 3_600_000]
+
+        email, token = await self.store.rotate(self.get_token(), self.db, self.cache)
+        claims = auth_service.decode_refresh_token(token)
+
+        self.assertEqual(email, self.user.email)
+        self.assertEqual(claims['fid'], 'family')
+        self.assertNotEqual(claims['jti'], 'jti')
+        self.cache.evalsha.assert_awaited_once_with(
+            self.store.script_sha, 1, 'refresh:family:family', 'jti', claims['jti']
+        )
+        self.db.execute.assert_not_awaited()
+        self.db.commit.assert_not_awaited()
+
+    async def test_rotate_loads_script(self):
+        self.cache.evalsha.side_effect = [NoScriptError("NOSCRIPT"), [1, 3_600_000]]
+
+        await self.store.rotate(self.get_token(), self.db, self.cache)
+
+        self.cache.script_load.assert_awaited_once_with(ROTATE_SCRIPT)
+
+    @patch("src.services.refresh_tokens.token_cache.revoke", new_callable=AsyncMock)
+    @patch(f"{REPOSITORY}.revoke_family", new_callable=AsyncMock)
+    async def test_rotate_reused_token(self, revoke_family, revoke_access_tokens):
+        self.cache.evalsha.return_value = [-1, 0]
+
+        with self.assertRaises(HTTPException) as error:
+            await self.store.rotate(self.get_token(), self.db, self.cache)
+
+        self.assertEqual(error.exception.status_code, 401)
+        revoke_family.assert_awaited_once_with('family', self.db)
+        revoke_access_tokens.assert_awaited_once_with(self.user.email, self.cache)
+
+    @patch(f"{REPOSITORY}.revoke_family", new_callable=AsyncMock)
+    async def test_rotate_unknown_family(self, revoke_family):
+        self.cache.evalsha.return_value = [0, 0]
+
+        with self.assertRaises(HTTPException) as error:
+            await self.store.rotate(self.get_token(), self.db, self.cache)
+
+        self.assertEqual(error.exception.status_code, 401)
+        revoke_family.assert_awaited_once_with('family', self.db)
+        self.cache.set.assert_not_awaited()
+
+    @patch(f"{REPOSITORY}.revoke_family", new_callable=AsyncMock)
+    async def test_rotate_redis_unavailable(self, revoke_family):
+        self.cache.evalsha.side_effect = ConnectionError("down")
+
+        with self.assertRaises(HTTPException) as error:
+            await self.store.rotate(self.get_token(), self.db, self.cache)
+
+        self.assertEqual(error.exception.status_code, 401)
+        revoke_family.assert_awaited_once_with('family', self.db)
+
+    async def test_rotate_token_without_family(self):
+        token = auth_service.create_refresh_token({'sub': self.user.email})
+
+        with self.assertRaises(HTTPException):
+            await self.store.rotate(token, self.db, self.cache)
+
+        self.cache.evalsha.assert_not_awaited()
+
+    @patch(f"{REPOSITORY}.revoke_family", new_callable=AsyncMock)
+    async def test_revoke(self, revoke_family):
+        await self.store.revoke(self.get_token(), self.db, self.cache)
+
+        revoke_family.assert_awaited_once_with('family', self.db)
+        self.cache.delete.assert_awaited_once_with('refresh:family:family')
+
+    @patch(f"{REPOSITORY}.revoke_user_families", new_callable=AsyncMock)
+    async def test_revoke_all(self, revoke_user_families):
+        revoke_user_families.return_value = ['phone', 'laptop']
+
+        await self.store.revoke_all(self.user, self.db, self.cache)
+
+        self.cache.delete.assert_awaited_once_with('refresh:family:phone', 'refresh:family:laptop')
+
+    def test_token_expires_with_family(self):
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=10)
+
+        claims = auth_service.decode_refresh_token(self.store.issue(self.user.email, 'family', 'jti', expires_at))
+
+        self.assertLessEqual(claims['exp'] - claims['iat'], 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import datetime
+import unittest
+
+from src.entity import Contact
+from src.schemas.base import ListResponseSchema, SingleResponseSchema
+from src.schemas.contacts import ContactSchema
+from src.schemas.serializers import contact_response_serializer
+from src.util.get_response_data import get_response_data
+
+
+def get_contact(contact_id: int) -> Contact:
+    return Contact(id=contact_id, name='Test', surname='Тест', email='test@gmail.com', phone='1234567890',
+                   birthday=datetime.date(2000, 1, 1), created_at=datetime.datetime(2024, 1, 1, 12, 30),
+                   updated_at=datetime.datetime(2024, 1, 2))
+
+
+class TestResponseSerializer(unittest.TestCase):
+    def test_dump_list(self):
+        response = get_response_data([get_contact(1), get_contact(2)], total=2, next_cursor='abc')
+
+        result = contact_response_serializer.dump_list(response)
+
+        expected = ListResponseSchema[ContactSchema].model_validate(response).model_dump_json()
+        self.assertEqual(result, expected.encode())
+
+    def test_dump_single(self):
+        response = get_response_data(get_contact(1))
+
+        result = contact_response_serializer.dump_single(response)
+
+        expected = SingleResponseSchema[ContactSchema].model_validate(response).model_dump_json()
+        self.assertEqual(result, expected.encode())
+
+    def test_dump_single_not_loaded_attribute(self):
+        contact = get_contact(1)
+        del contact.updated_at
+
+        result = contact_response_serializer.dump_single(get_response_data(contact))
+
+        self.assertIn(b'"updated_at":null', result)
+
+
+if __name__ == '__main__':
+    unittest.main()
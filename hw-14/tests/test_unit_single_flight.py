@@ -0,0 +1,53 @@
+import asyncio
+import unittest
+
+from src.util.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.single_flight = SingleFlight()
+        self.calls = 0
+
+    async def load(self, result="user", delay=0.01):
+        self.calls += 1
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def test_coalesces_concurrent_calls(self):
+        results = await asyncio.gather(*(self.single_flight.do("key", self.load) for _ in range(10)))
+
+        self.assertEqual(results, ["user"] * 10)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(self.single_flight), 0)
+
+    async def test_different_keys(self):
+        await asyncio.gather(self.single_flight.do("a", self.load), self.single_flight.do("b", self.load))
+
+        self.assertEqual(self.calls, 2)
+
+    async def test_propagates_exception(self):
+        results = await asyncio.gather(
+            *(self.single_flight.do("key", lambda: self.load(ValueError("db down"))) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(self.calls, 1)
+
+    async def test_leader_cancelled(self):
+        leader = asyncio.create_task(self.single_flight.do("key", lambda: self.load(delay=1)))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(self.single_flight.do("key", self.load))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+
+        self.assertEqual(await follower, "user")
+        self.assertEqual(self.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from unittest.mock import patch
+
+from cloudinary.exceptions import NotFound, RateLimited
+
+from src.services.storage import AvatarStorage, CloudinaryStorage
+
+
+class TestCloudinaryStorage(unittest.TestCase):
+    def setUp(self):
+        self.storage = CloudinaryStorage()
+
+    def test_abstract_base(self):
+        with self.assertRaises(TypeError):
+            AvatarStorage()
+
+    @patch('cloudinary.api.resource')
+    def test_exists_remembers_known_keys(self, resource):
+        self.assertTrue(self.storage.exists('avatars/abc'))
+        self.assertTrue(self.storage.exists('avatars/abc'))
+
+        resource.assert_called_once_with('avatars/abc')
+
+    @patch('cloudinary.api.resource', side_effect=NotFound('Resource not found'))
+    def test_not_exists(self, resource):
+        self.assertFalse(self.storage.exists('avatars/abc'))
+
+    @patch('cloudinary.api.resource', side_effect=RateLimited('Rate Limit Exceeded'))
+    def test_exists_unknown_on_api_error(self, resource):
+        self.assertFalse(self.storage.exists('avatars/abc'))
+
+    @patch('cloudinary.api.resource')
+    @patch('cloudinary.uploader.upload')
+    def test_save_remembers_key(self, upload, resource):
+        self.storage.save('avatars/abc', b'image')
+
+        self.assertTrue(self.storage.exists('avatars/abc'))
+        upload.assert_called_once_with(file=b'image', public_id='avatars/abc', overwrite=False)
+        resource.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
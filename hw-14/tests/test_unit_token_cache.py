@@ -0,0 +1,50 @@
+import time
+import unittest
+from unittest.mock import AsyncMock
+
+from src.services.token_cache import TokenCache
+
+email = 'test@gmail.com'
+
+
+class TestTokenCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = AsyncMock()
+        self.token_cache = TokenCache()
+
+    def test_set_and_get(self):
+        self.token_cache.set('token', email, time.time() + 60)
+
+        self.assertEqual(self.token_cache.get('token'), email)
+        self.assertIsNone(self.token_cache.get('other token'))
+
+    def test_set_expired_token(self):
+        self.token_cache.set('token', email, time.time() - 1)
+
+        self.assertIsNone(self.token_cache.get('token'))
+
+    async def test_revoke(self):
+        self.token_cache.set('token', email, time.time() + 60)
+        self.token_cache.set('other token', 'other@gmail.com', time.time() + 60)
+
+        await self.token_cache.revoke(email, self.cache)
+
+        self.assertIsNone(self.token_cache.get('token'))
+        self.assertEqual(self.token_cache.get('other token'), 'other@gmail.com')
+        self.cache.set.assert_awaited_once()
+        self.cache.publish.assert_awaited_once_with(TokenCache.CHANNEL, email)
+
+    async def test_is_revoked(self):
+        self.cache.get.return_value = b'1000'
+
+        self.assertTrue(await self.token_cache.is_revoked(email, 999, self.cache))
+        self.assertFalse(await self.token_cache.is_revoked(email, 1000, self.cache))
+
+    async def test_is_revoked_without_revocation(self):
+        self.cache.get.return_value = None
+
+        self.assertFalse(await self.token_cache.is_revoked(email, 999, self.cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import asyncio
+import time
+import unittest
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+from src.database.cache_serializer import user_serializer
+from src.entity import User
+from src.entity.user import Role
+from src.services.user_cache import UserCache
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401, fakeredis runs Lua scripts with it
+except ImportError:
+    fakeredis = None
+
+test_user = {
+    'email': 'test@gmail.com',
+    'password': '12345678'
+}
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = AsyncMock()
+        self.user_cache = UserCache()
+        self.user = User(id=uuid.uuid4(), role=Role.user, created_at=datetime.now(), updated_at=datetime.now(),
+                         **test_user)
+
+    async def test_get_from_redis_fills_local_cache(self):
+        self.cache.get.return_value = user_serializer.dumps(self.user)
+
+        first = await self.user_cache.get(self.user.email, self.cache)
+        second = await self.user_cache.get(self.user.email, self.cache)
+
+        self.assertEqual(first.email, self.user.email)
+        self.assertIs(first, second)
+        self.cache.get.assert_awaited_once()
+
+    async def test_get_miss(self):
+        self.cache.get.return_value = None
+
+        result = await self.user_cache.get(self.user.email, self.cache)
+
+        self.assertIsNone(result)
+
+    async def test_get_outdated_snapshot(self):
+        self.cache.get.return_value = b'[0,"outdated"]'
+
+        result = await self.user_cache.get(self.user.email, self.cache)
+
+        self.assertIsNone(result)
+
+    async def test_invalidate(self):
+        await self.user_cache.set(self.user, self.cache)
+
+        await self.user_cache.invalidate(self.user.email, self.cache)
+
+        self.assertNotIn(self.user.email, self.user_cache.local)
+        self.cache.delete.assert_awaited_once_with(UserCache.get_key(self.user.email))
+        self.cache.publish.assert_awaited_once_with(UserCache.CHANNEL, self.user.email)
+
+    async def test_get_entry_with_expiry(self):
+        await self.user_cache.set(self.user, self.cache, load_time=0.002)
+        self.cache.get.return_value = self.cache.set.call_args.args[1]
+        self.user_cache.local.clear()
+
+        result = await self.user_cache.get(self.user.email, self.cache)
+
+        self.assertEqual(result.email, self.user.email)
+
+    async def test_get_or_load_coalesces_misses(self):
+        self.cache.get.return_value = None
+        load = AsyncMock(return_value=self.user)
+
+        results = await asyncio.gather(*(
+            self.user_cache.get_or_load(self.user.email, self.cache, load) for _ in range(10)
+        ))
+
+        self.assertTrue(all(result is self.user for result in results))
+        load.assert_awaited_once()
+        lock_token = self.cache.set.await_args_list[0].args[1]
+        self.cache.evalsha.assert_awaited_once_with(
+            self.user_cache.release_lock_sha, 1, UserCache.get_lock_key(self.user.email), lock_token
+        )
+
+    async def test_get_or_load_waits_for_lock_holder(self):
+        entry = f"{time.time() + 300} 0.002 ".encode() + user_serializer.dumps(self.user)
+        self.cache.get.side_effect = [None, None, entry]
+        self.cache.set.return_value = None
+        load = AsyncMock(return_value=self.user)
+
+        result = await self.user_cache.get_or_load(self.user.email, self.cache, load)
+
+        self.assertEqual(result.email, self.user.email)
+        load.assert_not_awaited()
+
+    async def test_get_or_load_refreshes_early(self):
+        entry = f"{time.time() + 300} 0.002 ".encode() + user_serializer.dumps(self.user)
+        self.cache.get.return_value = entry
+        load = AsyncMock(return_value=self.user)
+
+        with patch.object(UserCache, "should_refresh", return_value=False):
+            await self.user_cache.get_or_load(self.user.email, self.cache, load)
+        load.assert_not_awaited()
+
+        self.user_cache.local.clear()
+        with patch.object(UserCache, "should_refresh", return_value=True):
+            await self.user_cache.get_or_load(self.user.email, self.cache, load)
+        load.assert_awaited_once()
+
+    def test_should_refresh(self):
+        self.assertFalse(UserCache.should_refresh(time.time() + 300, 0.002))
+        self.assertTrue(UserCache.should_refresh(time.time() - 1, 0.002))
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis[lua] is not installed")
+class TestReleaseLockScript(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cache = fakeredis.FakeAsyncRedis()
+        self.user_cache = UserCache()
+
+    async def asyncTearDown(self):
+        await self.cache.aclose()
+
+    async def test_releases_own_lock(self):
+        await self.cache.set("user:lock:test@gmail.com", "token", px=5000)
+
+        await self.user_cache.release_lock("user:lock:test@gmail.com", "token", self.cache)
+
+        self.assertIsNone(await self.cache.get("user:lock:test@gmail.com"))
+
+    async def test_keeps_lock_taken_over_by_another_worker(self):
+        await self.cache.set("user:lock:test@gmail.com", "other-token", px=5000)
+
+        await self.user_cache.release_lock("user:lock:test@gmail.com", "token", self.cache)
+
+        self.assertEqual(await self.cache.get("user:lock:test@gmail.com"), b"other-token")
+
+
+if __name__ == '__main__':
+    unittest.main()